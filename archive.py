@@ -0,0 +1,281 @@
+import os
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+
+import numpy as np
+from dotenv import load_dotenv
+from pydantic import BaseModel
+
+from metrics import METRICS, SNAPSHOT, STUDY_KINDS, book_infos, study_infos
+from models import GR, BasicInfo, BookInfo, StudyInfo
+from site_config import CACHE_DIR
+
+load_dotenv()
+
+ARCHIVE_PATH = CACHE_DIR / "archive.sqlite3"
+BASIC_FIELDS = tuple(BasicInfo.model_fields)
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS months (
+    s_id TEXT NOT NULL,
+    month TEXT NOT NULL,
+    closed INTEGER NOT NULL,
+    {", ".join(
+        f"{metric} INTEGER" + ("" if snapshot else " NOT NULL")
+        for metric, snapshot in zip(METRICS, SNAPSHOT)
+    )},
+    PRIMARY KEY (s_id, month)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS months_by_month ON months (month, s_id);
+CREATE TABLE IF NOT EXISTS basic_info (
+    s_id TEXT NOT NULL,
+    month TEXT NOT NULL,
+    time_end TEXT NOT NULL,
+    time_start TEXT NOT NULL,
+    lexile INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    school TEXT NOT NULL,
+    grade INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    level TEXT NOT NULL,
+    PRIMARY KEY (s_id, month)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS basic_info_by_month ON basic_info (month, level);
+CREATE TABLE IF NOT EXISTS gr (
+    s_id TEXT NOT NULL,
+    month TEXT NOT NULL,
+    gr_num TEXT NOT NULL,
+    right_count INTEGER NOT NULL,
+    total_count INTEGER NOT NULL,
+    PRIMARY KEY (s_id, month, gr_num)
+) WITHOUT ROWID;
+"""
+
+
+class ArchivedMonth(BaseModel):
+    s_id: str
+    month: str
+    # Months before the report month are final; the report month is
+    # replaced on every run until it closes.
+    closed: bool
+    # False if the page's running totals could not be parsed; they are NULL
+    # in the archive and 0 in book_info and study_info.
+    totals: bool
+    basic_info: BasicInfo | None
+    book_info: BookInfo
+    study_info: dict[str, StudyInfo]
+    GR_list: list[GR]
+
+
+class MonthPage(BaseModel):
+    # One parsed report page, as get_student_infos hands it over.
+    model_config = {"arbitrary_types_allowed": True}
+
+    row: np.ndarray
+    closed: bool
+    # False: the running totals in `row` are 0 only because they could not
+    # be parsed, and are stored as NULL.
+    totals: bool = True
+    basic_info: BasicInfo | None = None
+    GR_list: list[GR] = []
+
+
+class MonthArchive:
+    # Every crawled month of every student, keyed by (s_id, YYYYMM): the
+    # METRICS vector in `months`, BasicInfo fields in `basic_info` and one
+    # `gr` row per GR level. A student's months are written in one
+    # transaction, so a crash never leaves half a student behind.
+    def __init__(self, path: Path = ARCHIVE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        # Crawl workers share the connection; the lock serializes them.
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self._migrate()
+        self.connection.executescript(SCHEMA)
+
+    def _migrate(self) -> None:
+        # Archives from before running totals became nullable: rebuild
+        # `months` with the current schema, keeping its rows.
+        columns = self.connection.execute("PRAGMA table_info(months)").fetchall()
+        if not any(name == "total" and notnull for _, name, _, notnull, *_ in columns):
+            return
+        self.connection.execute("ALTER TABLE months RENAME TO months_old")
+        self.connection.execute("DROP INDEX months_by_month")
+        self.connection.executescript(SCHEMA)
+        self.connection.execute("INSERT INTO months SELECT * FROM months_old")
+        self.connection.execute("DROP TABLE months_old")
+        self.connection.commit()
+
+    def record(self, s_id: str, pages: dict[str, MonthPage]) -> None:
+        months = [
+            (
+                s_id,
+                month,
+                page.closed,
+                *(
+                    None if snapshot and not page.totals else value
+                    for value, snapshot in zip(page.row.tolist(), SNAPSHOT)
+                ),
+            )
+            for month, page in pages.items()
+        ]
+        basics = [
+            (s_id, month, *(getattr(page.basic_info, f) for f in BASIC_FIELDS))
+            for month, page in pages.items()
+            if page.basic_info is not None
+        ]
+        grs = [
+            (s_id, month, gr.GR_num, gr.right, gr.total)
+            for month, page in pages.items()
+            for gr in page.GR_list
+        ]
+        with self.lock, self.connection:
+            self.connection.executemany(
+                f"INSERT OR REPLACE INTO months VALUES "
+                f"({', '.join('?' * (3 + len(METRICS)))})",
+                months,
+            )
+            self.connection.executemany(
+                f"INSERT OR REPLACE INTO basic_info (s_id, month, "
+                f"{', '.join(BASIC_FIELDS)}) VALUES "
+                f"({', '.join('?' * (2 + len(BASIC_FIELDS)))})",
+                basics,
+            )
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO gr VALUES (?, ?, ?, ?, ?)", grs
+            )
+
+    def history(
+        self, s_id: str, start: str = "000000", end: str = "999999"
+    ) -> list[ArchivedMonth]:
+        # One student's months from start to end (YYYYMM, inclusive), oldest
+        # first.
+        return self._select(
+            "m.s_id = ? AND m.month BETWEEN ? AND ?", (s_id, start, end)
+        )
+
+    def roster(self, month: str, level: str | None = None) -> list[ArchivedMonth]:
+        # Every archived student for one month, optionally one level only.
+        if level is None:
+            return self._select("m.month = ?", (month,))
+        return self._select("m.month = ? AND b.level = ?", (month, level))
+
+    def series(
+        self,
+        metric: str,
+        start: str = "000000",
+        end: str = "999999",
+        s_ids: list[str] | None = None,
+    ) -> dict[str, dict[str, int | None]]:
+        # {s_id: {month: value}} of one METRICS column, e.g. "curr_month"
+        # or "quiz_curr_count", straight from the month index. Running
+        # totals are None for months whose page lacked them.
+        if metric not in METRICS:
+            raise ValueError(f"unknown metric {metric!r}")
+        query = f"SELECT s_id, month, {metric} FROM months WHERE month BETWEEN ? AND ?"
+        params = [start, end]
+        if s_ids is not None:
+            query += f" AND s_id IN ({', '.join('?' * len(s_ids))})"
+            params += s_ids
+        series: dict[str, dict[str, int | None]] = {}
+        with self.lock:
+            rows = self.connection.execute(query + " ORDER BY s_id, month", params)
+            for s_id, month, value in rows.fetchall():
+                series.setdefault(s_id, {})[month] = value
+        return series
+
+    def months(self) -> list[str]:
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT DISTINCT month FROM months ORDER BY month"
+            ).fetchall()
+        return [month for (month,) in rows]
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def _select(self, where: str, params: tuple) -> list[ArchivedMonth]:
+        columns = ", ".join(f"m.{metric}" for metric in METRICS)
+        basic = ", ".join(f"b.{field}" for field in BASIC_FIELDS)
+        with self.lock:
+            rows = self.connection.execute(
+                f"SELECT m.s_id, m.month, m.closed, b.name IS NOT NULL, {basic}, "
+                f"{columns} FROM months m LEFT JOIN basic_info b "
+                f"ON b.s_id = m.s_id AND b.month = m.month "
+                f"WHERE {where} ORDER BY m.s_id, m.month",
+                params,
+            ).fetchall()
+            grs: dict[tuple[str, str], list[GR]] = {}
+            for s_id, month, gr_num, right, total in self.connection.execute(
+                f"SELECT g.* FROM gr g JOIN months m "
+                f"ON g.s_id = m.s_id AND g.month = m.month "
+                f"LEFT JOIN basic_info b ON b.s_id = m.s_id AND b.month = m.month "
+                f"WHERE {where} ORDER BY g.s_id, g.month, g.gr_num",
+                params,
+            ):
+                grs.setdefault((s_id, month), []).append(
+                    GR(GR_num=gr_num, right=right, total=total)
+                )
+        if not rows:
+            return []
+
+        # Rates are derived from the weighted sums for all rows at once.
+        first = 4 + len(BASIC_FIELDS)
+        values = [row[first:] for row in rows]
+        sums = np.array(
+            [[value or 0 for value in row] for row in values], dtype=np.int64
+        )
+        books = book_infos(sums)
+        studies = {kind: study_infos(sums, kind) for kind in STUDY_KINDS}
+
+        archived = []
+        for i, row in enumerate(rows):
+            s_id, month, closed, has_basic = row[:4]
+            archived.append(
+                ArchivedMonth(
+                    s_id=s_id,
+                    month=month,
+                    closed=closed,
+                    totals=None not in values[i],
+                    basic_info=(
+                        BasicInfo(**dict(zip(BASIC_FIELDS, row[4:first])))
+                        if has_basic
+                        else None
+                    ),
+                    book_info=books[i],
+                    study_info={kind: studies[kind][i] for kind in STUDY_KINDS},
+                    GR_list=grs.get((s_id, month), []),
+                )
+            )
+        return archived
+
+
+def default_archive() -> MonthArchive | None:
+    if os.getenv("READANDTALK_ARCHIVE", "1") == "0":
+        return None
+    return MonthArchive()
+
+
+if __name__ == "__main__":
+    # python archive.py <s_id> [YYYYMM] [YYYYMM]  -> one student's months
+    # python archive.py --month YYYYMM            -> every student that month
+    archive = MonthArchive()
+    if sys.argv[1:2] == ["--month"]:
+        archived = archive.roster(sys.argv[2])
+    else:
+        archived = archive.history(*sys.argv[1:4])
+    for entry in archived:
+        level = entry.basic_info.level if entry.basic_info is not None else ""
+        rates = " ".join(
+            f"{kind} {study_info.curr_count}/{study_info.curr_rate}%"
+            for kind, study_info in entry.study_info.items()
+        )
+        print(
+            f"{entry.s_id} {entry.month}{'' if entry.closed else '*'} {level} "
+            f"books {entry.book_info.curr_month} {rates}"
+        )
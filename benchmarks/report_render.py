@@ -0,0 +1,97 @@
+# Per-report render time and allocations, from scratch vs. from the template.
+#   python -m benchmarks.report_render [count]
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from models import GR, BasicInfo, BookInfo, StudentInfo, StudyInfo
+from report import ReportTemplate, create_learning_report
+
+
+def sample_student(i: int) -> StudentInfo:
+    def study(n: int) -> list[StudyInfo]:
+        return [
+            StudyInfo(
+                curr_count=n * (w + 1) + i,
+                curr_rate=(70 + i + w) % 100,
+                total_count=n * 20 + i,
+                total_rate=(80 + i) % 100,
+            )
+            for w in range(2)
+        ]
+
+    return StudentInfo(
+        basic_info=BasicInfo(
+            time_start="202607",
+            time_end="202609",
+            lexile=400 + i,
+            name=f"학생{i:04d}",
+            school="리드앤톡초",
+            grade=i % 6 + 1,
+            count=i % 50,
+            level=f"RG {i % 9}",
+        ),
+        book_info=[
+            BookInfo(
+                intensive=i % 12,
+                extensive=i % 30,
+                classics=i % 3,
+                curr_month=i % 25,
+                total=i * 7,
+            )
+            for _ in range(2)
+        ],
+        word_info=study(500),
+        puzzle_info=study(100),
+        dictation_info=study(80),
+        writing_info=study(40),
+        quiz_info=study(20),
+        GR_list=[GR(GR_num=f"GR{n}", right=n, total=10) for n in range(1, 6)],
+    )
+
+
+def render(students: list[StudentInfo], directory: Path, template) -> None:
+    for student_info in students:
+        create_learning_report(
+            student_info, "코멘트 " * 40, dir=directory, template=template
+        )
+
+
+def peak_memory(students: list[StudentInfo], directory: Path, template) -> float:
+    # Average peak of memory allocated while building and saving one report.
+    peaks = []
+    tracemalloc.start()
+    for student_info in students:
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        render([student_info], directory, template)
+        _, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - base)
+    tracemalloc.stop()
+    return sum(peaks) / len(peaks)
+
+
+def run(label: str, students: list[StudentInfo], directory: Path, template=None):
+    start = time.perf_counter()
+    render(students, directory, template)
+    elapsed = time.perf_counter() - start
+    # Traced separately: tracemalloc slows everything down.
+    peak = peak_memory(students[:20], directory, template)
+    print(
+        f"{label:>8}: {elapsed / len(students) * 1000:7.2f} ms/report, "
+        f"{peak / 1024:7.0f} KiB allocated/report"
+    )
+    return elapsed
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    students = [sample_student(i) for i in range(count)]
+    with tempfile.TemporaryDirectory() as directory:
+        directory = Path(directory)
+        scratch = run("scratch", students, directory)
+        template = ReportTemplate()
+        fast = run("template", students, directory, template)
+    print(f"{scratch / fast:.2f}x faster with the template")
@@ -0,0 +1,270 @@
+# Offline benchmarks for every stage: roster and report pages come from the
+# saved fixtures, comments from a stub LLM with a fixed latency.
+#   python -m benchmarks.suite [--sizes 10,100,1000] [--llm-latency 0.2] [--out F]
+# Results are written as JSON so two runs can be compared.
+import argparse
+import asyncio
+import json
+import platform
+import re
+import statistics
+import tempfile
+import time
+import types
+from datetime import datetime
+from pathlib import Path
+
+from cohort import attach_cohorts
+from comment_cache import CommentCache
+from comments import CommentGenerator
+from crawling import (
+    get_student_infos,
+    parse_basic_info,
+    parse_book_info,
+    parse_dictation_info,
+    parse_gr_info,
+    parse_month_row,
+    parse_puzzle_info,
+    parse_quiz_info,
+    parse_word_info,
+    parse_writing_info,
+    tables_from_html,
+)
+from metrics import MetricsStore
+from models import StudentInfo
+from report import ReportTemplate, create_learning_report
+from roster import parse_roster_page
+from windows import QUARTERLY
+
+FIXTURES = Path(__file__).parent / "fixtures"
+RESULTS_DIR = Path(".cache") / "benchmarks"
+
+PARSERS = {
+    "basic": parse_basic_info,
+    "book": lambda tables: parse_book_info(tables, True),
+    "word": lambda tables: parse_word_info(tables, True),
+    "puzzle": lambda tables: parse_puzzle_info(tables, True),
+    "dictation": lambda tables: parse_dictation_info(tables, True),
+    "writing": lambda tables: parse_writing_info(tables, True),
+    "quiz": lambda tables: parse_quiz_info(tables, True),
+    "gr": parse_gr_info,
+}
+
+
+def fixture(name: str) -> str:
+    return (FIXTURES / name).read_text(encoding="utf-8")
+
+
+def member_list(size: int) -> str:
+    # The saved member list with its first row repeated for `size` students.
+    html = fixture("member_list.php.html")
+    rows = re.findall(r"[ \t]*<tr class=.*?</tr>\n", html, re.S)
+    template = rows[0]
+    generated = "".join(
+        template.replace("student0001", f"student{i:04d}") for i in range(1, size + 1)
+    )
+    return html.replace("".join(rows), generated)
+
+
+def timings(seconds: list[float]) -> dict[str, float]:
+    ordered = sorted(seconds)
+    return {
+        "count": len(ordered),
+        "total_s": sum(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": ordered[len(ordered) // 2] * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+    }
+
+
+def bench_roster(size: int) -> dict:
+    html = member_list(size)
+    start = time.perf_counter()
+    rows = parse_roster_page(html).rows
+    elapsed = time.perf_counter() - start
+    assert len(rows) == size
+    return {"students": size, "total_s": elapsed}
+
+
+def bench_parse(size: int) -> dict:
+    # One report page per student: the HTML walk, then every table parser.
+    html = fixture("report_mini.php.html")
+    pages, per_table = [], {name: [] for name in PARSERS}
+    for _ in range(size):
+        start = time.perf_counter()
+        tables = tables_from_html(html)
+        pages.append(time.perf_counter() - start)
+        for name, parse in PARSERS.items():
+            start = time.perf_counter()
+            parse(tables)
+            per_table[name].append(time.perf_counter() - start)
+    return {
+        "html": timings(pages),
+        "tables": {name: timings(seconds) for name, seconds in per_table.items()},
+    }
+
+
+def bench_crawl(size: int, fetch_latency: float) -> tuple[dict, list[StudentInfo]]:
+    # get_student_infos end to end over the saved page, as the http backend
+    # sees it; fetch_latency stands in for the network round trip.
+    html = fixture("report_mini.php.html")
+
+    def fetch_tables(url: str):
+        if fetch_latency:
+            time.sleep(fetch_latency)
+        return tables_from_html(html)
+
+    latencies, students = [], []
+    for i in range(size):
+        start = time.perf_counter()
+        student_info = get_student_infos(
+            fetch_tables, f"student{i:04d}", None, [QUARTERLY]
+        )[0]
+        latencies.append(time.perf_counter() - start)
+        # Distinct names, so comments and file names differ per student.
+        basic_info = student_info.basic_info.model_copy(update={"name": f"학생{i:04d}"})
+        students.append(student_info.model_copy(update={"basic_info": basic_info}))
+    return timings(latencies), students
+
+
+def bench_aggregate(size: int) -> dict:
+    # Six months per student into the store, then both quarterly windows.
+    tables = tables_from_html(fixture("report_mini.php.html"))
+    row = parse_month_row(tables, True)
+    months = [f"2026{m:02d}" for m in range(4, 10)]
+    student_ids = [f"student{i:04d}" for i in range(size)]
+
+    start = time.perf_counter()
+    store = MetricsStore(student_ids, months)
+    for s_id in student_ids:
+        for month in months:
+            store.set(s_id, month, row)
+    store.windowed([months[3:], months[:3]])
+    elapsed = time.perf_counter() - start
+    return {
+        "students": size,
+        "total_s": elapsed,
+        "per_student_ms": elapsed / size * 1000,
+    }
+
+
+def bench_cohort(students: list[StudentInfo]) -> dict:
+    start = time.perf_counter()
+    attach_cohorts(students)
+    elapsed = time.perf_counter() - start
+    return {
+        "students": len(students),
+        "total_s": elapsed,
+        "per_student_ms": elapsed / len(students) * 1000,
+    }
+
+
+class StubModels:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def generate_content(self, model, contents, config):
+        await asyncio.sleep(self.latency)
+        return types.SimpleNamespace(
+            text="꾸준히 학습하고 있습니다. " * 20,
+            usage_metadata=types.SimpleNamespace(
+                prompt_token_count=len(contents),
+                cached_content_token_count=0,
+                candidates_token_count=300,
+                total_token_count=len(contents) + 300,
+            ),
+        )
+
+
+def stub_client(latency: float):
+    return types.SimpleNamespace(aio=types.SimpleNamespace(models=StubModels(latency)))
+
+
+def bench_comments(
+    students: list[StudentInfo], latency: float, concurrency: int
+) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        generator = CommentGenerator(
+            stub_client(latency),
+            concurrency=concurrency,
+            rpm=1e12,
+            tpm=1e12,
+            context_cache=False,
+            # refresh: every student is a miss, like a first run.
+            comment_cache=CommentCache(Path(directory), refresh=True),
+        )
+        start = time.perf_counter()
+        comments, failures = generator.generate_all(students)
+        elapsed = time.perf_counter() - start
+    return {
+        "students": len(students),
+        "failures": len(failures),
+        "total_s": elapsed,
+        "per_second": len(students) / elapsed,
+        "llm_latency_s": latency,
+        "concurrency": concurrency,
+    }
+
+
+def bench_render(students: list[StudentInfo]) -> dict:
+    template = ReportTemplate()
+    seconds = []
+    with tempfile.TemporaryDirectory() as directory:
+        for student_info in students:
+            start = time.perf_counter()
+            create_learning_report(
+                student_info, "코멘트 " * 40, dir=Path(directory), template=template
+            )
+            seconds.append(time.perf_counter() - start)
+    return timings(seconds)
+
+
+def run(sizes: list[int], args: argparse.Namespace) -> dict:
+    results = {}
+    for size in sizes:
+        crawl, students = bench_crawl(size, args.fetch_latency)
+        results[str(size)] = {
+            "roster": bench_roster(size),
+            "parse": bench_parse(size),
+            "crawl": crawl,
+            "aggregate": bench_aggregate(size),
+            "cohort": bench_cohort(students),
+            "comments": bench_comments(students, args.llm_latency, args.concurrency),
+            "render": bench_render(students),
+        }
+        size_results = results[str(size)]
+        print(
+            f"{size:>5} students: crawl {size_results['crawl']['mean_ms']:.2f} ms, "
+            f"page parse {size_results['parse']['html']['mean_ms']:.2f} ms, "
+            f"comments {size_results['comments']['per_second']:.1f}/s, "
+            f"render {size_results['render']['mean_ms']:.2f} ms per student"
+        )
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10,100,1000")
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--fetch-latency", type=float, default=0)
+    parser.add_argument("--out", type=Path)
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    started = datetime.now()
+    output = {
+        "created": started.isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "llm_latency_s": args.llm_latency,
+            "concurrency": args.concurrency,
+            "fetch_latency_s": args.fetch_latency,
+        },
+        "sizes": run(sizes, args),
+    }
+    out = args.out or RESULTS_DIR / f"suite-{started:%Y%m%d-%H%M%S}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(output, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"Results written to {out}")
@@ -0,0 +1,150 @@
+import numpy as np
+
+from models import Cohort, CohortMetric, StudentInfo
+
+COHORT_KINDS = ("quiz", "word", "dictation")
+GR_NUMS = tuple(f"GR{i + 1}" for i in range(5))
+# Current-window count and rate per kind, then each GR level's right/total
+# in percent. Higher is better for all of them.
+COHORT_METRICS = (
+    tuple(f"{kind}_{field}" for kind in COHORT_KINDS for field in ("count", "rate"))
+    + GR_NUMS
+)
+
+
+def cohort_key(student_info: StudentInfo) -> tuple:
+    basic_info = student_info.basic_info
+    return (
+        basic_info.time_start,
+        basic_info.time_end,
+        basic_info.level,
+        basic_info.grade,
+    )
+
+
+def cohort_matrix(student_infos: list[StudentInfo]) -> np.ndarray:
+    # students x COHORT_METRICS; NaN where the metric does not apply (a rate
+    # without any attempts, a GR level without questions).
+    rows = []
+    for student_info in student_infos:
+        row = []
+        for kind in COHORT_KINDS:
+            study_info = getattr(student_info, f"{kind}_info")[0]
+            row.append(study_info.curr_count)
+            row.append(study_info.curr_rate if study_info.curr_count else np.nan)
+        gr_list = {gr.GR_num: gr for gr in student_info.GR_list}
+        for gr_num in GR_NUMS:
+            gr = gr_list.get(gr_num)
+            row.append(gr.right / gr.total * 100 if gr and gr.total else np.nan)
+        rows.append(row)
+    return np.array(rows, dtype=np.float64).reshape(-1, len(COHORT_METRICS))
+
+
+def column_stats(
+    population: np.ndarray,
+    population_groups: np.ndarray,
+    values: np.ndarray,
+    groups: np.ndarray,
+    group_count: int,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # One metric for every cohort at once: per-group mean and median, and
+    # each value's percentile rank within its group. The population is
+    # sorted by (group, value) a single time; medians are read off the
+    # sorted array and ranks come from two binary searches per value.
+    valid = ~np.isnan(population)
+    ordered_groups = population_groups[valid]
+    ordered = population[valid]
+    order = np.lexsort((ordered, ordered_groups))
+    ordered_groups, ordered = ordered_groups[order], ordered[order]
+
+    count = np.bincount(ordered_groups, minlength=group_count)
+    start = np.cumsum(count) - count
+    has = count > 0
+    mean = np.where(
+        has,
+        np.bincount(ordered_groups, weights=ordered, minlength=group_count)
+        / np.maximum(count, 1),
+        np.nan,
+    )
+    if len(ordered):
+        last = len(ordered) - 1
+        low = ordered[np.minimum(start + (count - 1) // 2, last)]
+        high = ordered[np.minimum(start + count // 2, last)]
+        median = np.where(has, (low + high) / 2, np.nan)
+    else:
+        median = np.full(group_count, np.nan)
+
+    # Values are never negative, so group * offset + value sorts like
+    # (group, value) and one searchsorted finds a value within its group.
+    offset = np.nanmax(np.concatenate([ordered, values, [0.0]])) + 1
+    keys = ordered_groups * offset + ordered
+    targets = groups * offset + np.nan_to_num(values)
+    below = np.searchsorted(keys, targets, "left")
+    equal = np.searchsorted(keys, targets, "right") - below
+    size = count[groups]
+    ranks = np.where(
+        (size > 0) & ~np.isnan(values),
+        (below - start[groups] + equal / 2) / np.maximum(size, 1) * 100,
+        np.nan,
+    )
+    return mean, median, ranks
+
+
+def attach_cohorts(
+    student_infos: list[StudentInfo], population: list[StudentInfo] | None = None
+) -> list[StudentInfo]:
+    # Each student with its cohort statistics. The cohorts are drawn from
+    # `population` (default: the students themselves), e.g. everyone crawled
+    # this period when this run only covers some of them.
+    if not student_infos:
+        return []
+    if population is None:
+        population = student_infos
+
+    keys: dict[tuple, int] = {}
+    population_groups = np.array(
+        [keys.setdefault(cohort_key(s), len(keys)) for s in population], dtype=np.int64
+    )
+    groups = np.array(
+        [keys.setdefault(cohort_key(s), len(keys)) for s in student_infos],
+        dtype=np.int64,
+    )
+    sizes = np.bincount(population_groups, minlength=len(keys))
+    population_matrix = cohort_matrix(population)
+    matrix = cohort_matrix(student_infos)
+
+    stats = [
+        column_stats(
+            population_matrix[:, i], population_groups, matrix[:, i], groups, len(keys)
+        )
+        for i in range(len(COHORT_METRICS))
+    ]
+
+    # Rounded once as arrays; NaN (nothing to compare) becomes None.
+    def listed(values: np.ndarray, decimals: int) -> list:
+        rounded = np.round(values, decimals)
+        return np.where(np.isnan(rounded), None, rounded).tolist()
+
+    means = listed(np.stack([mean for mean, _, _ in stats], axis=1), 1)
+    medians = listed(np.stack([median for _, median, _ in stats], axis=1), 1)
+    percentiles = listed(np.stack([ranks for _, _, ranks in stats], axis=1), 0)
+
+    attached = []
+    for i, student_info in enumerate(student_infos):
+        group = groups[i]
+        metrics = {
+            metric: CohortMetric(
+                mean=means[group][m],
+                median=medians[group][m],
+                percentile=percentiles[i][m],
+            )
+            for m, metric in enumerate(COHORT_METRICS)
+        }
+        cohort = Cohort(
+            level=student_info.basic_info.level,
+            grade=student_info.basic_info.grade,
+            size=int(sizes[group]),
+            metrics=metrics,
+        )
+        attached.append(student_info.model_copy(update={"cohort": cohort}))
+    return attached
@@ -0,0 +1,79 @@
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from site_config import CACHE_DIR
+
+load_dotenv()
+
+COMMENTS_DIR = CACHE_DIR / "comments"
+MAX_AGE_DAYS = float(os.getenv("COMMENT_CACHE_MAX_AGE_DAYS", "90"))
+MAX_ENTRIES = int(os.getenv("COMMENT_CACHE_MAX_ENTRIES", "20000"))
+
+
+class CommentCache:
+    # Generated comments addressed by a hash of everything that shapes them:
+    # model, generation config and the full prompt (template + student data).
+    # Any change to one of those is a miss.
+    def __init__(self, directory: Path = COMMENTS_DIR, refresh: bool = False):
+        self.directory = Path(directory)
+        # With refresh every lookup misses, but new comments are still stored.
+        self.refresh = refresh
+
+    @staticmethod
+    def key(model: str, config: str, prompt: str) -> str:
+        payload = json.dumps([model, config, prompt], ensure_ascii=False)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> str | None:
+        if self.refresh:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                comment = json.load(f)["comment"]
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            return None
+        # Touch on hit so size-based eviction drops the least recently used.
+        os.utime(path)
+        return comment
+
+    def put(self, key: str, comment: str) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"comment": comment, "created": time.time()}, f)
+        os.replace(tmp, path)
+
+    def evict(
+        self, max_age_days: float = MAX_AGE_DAYS, max_entries: int = MAX_ENTRIES
+    ) -> int:
+        entries = []
+        for path in self.directory.glob("*/*.json"):
+            try:
+                entries.append((path.stat().st_mtime, path))
+            except FileNotFoundError:
+                continue
+        entries.sort(reverse=True)
+
+        cutoff = time.time() - max_age_days * 86400
+        evicted = 0
+        for i, (mtime, path) in enumerate(entries):
+            if i >= max_entries or mtime < cutoff:
+                path.unlink(missing_ok=True)
+                evicted += 1
+        return evicted
+
+
+def default_comment_cache() -> CommentCache | None:
+    if os.getenv("COMMENT_CACHE", "1") == "0":
+        return None
+    return CommentCache(refresh=os.getenv("COMMENT_CACHE_REFRESH", "0") == "1")
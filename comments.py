@@ -0,0 +1,409 @@
+import asyncio
+import os
+import random
+import re
+import threading
+import time
+
+from dotenv import load_dotenv
+from google import genai
+from google.genai import errors, types
+
+from comment_cache import CommentCache, default_comment_cache
+from crawling import StudentInfo
+from tracing import span
+
+load_dotenv()
+
+MODEL = "gemini-2.0-flash"
+GENERATION_CONFIG = types.GenerateContentConfig(temperature=0.3)
+
+# Quota defaults match the free tier of gemini-2.0-flash.
+GEMINI_RPM = float(os.getenv("GEMINI_RPM", "15"))
+GEMINI_TPM = float(os.getenv("GEMINI_TPM", "1000000"))
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "5"))
+GEMINI_CONTEXT_CACHE = os.getenv("GEMINI_CONTEXT_CACHE", "1") == "1"
+GEMINI_CACHE_TTL = os.getenv("GEMINI_CACHE_TTL", "3600s")
+# The smallest prefix MODEL accepts for an explicit context cache.
+GEMINI_CACHE_MIN_TOKENS = int(os.getenv("GEMINI_CACHE_MIN_TOKENS", "4096"))
+# The context cache is extended once less than this share of its TTL is
+# left, so calls in flight never reach an expired cache.
+CACHE_REFRESH_SHARE = 0.1
+RETRYABLE_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class CommentError(Exception):
+    def __init__(self, name: str, cause: Exception):
+        super().__init__(f"Comment for {name} failed: {cause}")
+        self.name = name
+        self.cause = cause
+
+
+# Everything but the student data is the same for every call, so it goes
+# first: once it is long enough to be held in a cached context, only the
+# student block is sent per student.
+STATIC_PROMPT = """
+    <Role>
+    You are an experienced English teacher, who carefully uses data and experience to guide students.
+    </Role>
+
+    <Task>
+    You are given information about a student. Generate one paragraph of teacher comments on this student's performance.
+    First, write an overall review of the performance, focusing on the Quiz scores.
+    Second, point out some areas where this student could improve.
+    </Task>
+
+    <Info>
+    "GR1": "문장형식, 동사용법",
+    "GR2": "수, 시제, 태, 병렬구조",
+    "GR3": "준동사, 명사구, 형용사구, 부사구",
+    "GR4": "명사절, 형용사절, 부사절",
+    "GR5": "가정법, 분사구문, 특수구문, 기타"
+    </Info>
+    
+    <Rules>
+    1. Only output in Korean.
+    2. Do not make up facts.
+    </Rules>
+
+    <Example>   
+    1. 연조는 다독 마빈을 2권 남겨두고 있고, 정독 8단계를 퀴즈값 평균 90점으로 잘 마무리짓고 정독 9-1 학습에 들어갔습니다. 8단계 학습까지 큰 산을 넘었기에 이제 정독학습은 쓱쓱 잘 해냅니다. 문법은 RG 7단계로 정독단계를 넘어서 학습하고 있습니다. 하루에 2페이지 숙제를 당연하게 생각하고 성실하게 해오니까 문법 진도가 빠릅니다. 이달에는 중고등 VOCA 3-5단계를 클래스카드로 반복학습해서 보다 수준높은 어휘를 공부중입니다. 연조가 단어에 시간소모를 많이 하고 어려워하기도 하는데 클래스카드로 3일정도 다양하게 반복하니까 잘 받아들이는 것 같습니다. 
+    2.  예린이는 정독 6단계를 퀴즈값 84점으로 마무리짓고 정독 7단계에 진입하여 학습중입니다. 다독 Fly Guy 시리즈도 퀴즈값 74점으로 마치고, Froggy 시리즈를 학습하고 있습니다. 문법은 어느새 RG 5를 공부하고 있습니다. 단계가 높아졌음에도 리뷰학습까지 하루에 한 권학습을 꼬박꼬박 해내는 것을 보면 갈수록 예린이가 학습에 대한 몰입이 좋아지고 자기주도 학습을 잘 해낸다는 것을 알 수 있습니다. 지난달엔 Fly Guy로 다독을 처음 경험해서 적응기간을 거쳤는데 Froggy는 적응이 완료되어 스토리를 이해하면서 읽는 것이 보입니다.
+    3. 리율이는 정독 5단계와  문법 RG 3를 학습중입니다. 개학하고 여러모로 피곤해서인지 리율이는 이달에 학습의 편차가 심했습니다. 학습속도는 리안이와 비슷하거나 오히려 조금 빠르지만 퀴즈값은 평균 10점 가까이 차이가 나고 학습레포트를 보면 학습과정에서 집중하기 어려워했음을 알 수 있습니다. 컨디션과 기분에 영향을 많이 받는 것 같아서 조금 안타깝습니다. 한번 등원할 때마다 문법숙제를 딱 2페이지만 해오게하는데 학교에서 휘리릭해오다보니 오답이 많고 내용숙지도 어려워합니다. 되도록 가정에서 숙제를 할 수 있게 시간과 환경조성을 도와주시면 큰 도움이 될 것 같습니다. 
+    </Example>
+    
+    """
+
+
+def build_student_prompt(student_info: StudentInfo) -> str:
+    if student_info.cohort is None:
+        # Same prompt (and comment cache key) as before cohorts existed.
+        return f"""
+    <Student Data>
+    {student_info.model_dump_json(exclude={"cohort"})}
+    </Student Data>
+    """
+    return f"""
+    <Student Data>
+    {student_info.model_dump_json()}
+    </Student Data>
+
+    <Cohort>
+    "cohort" compares this student with the {student_info.cohort.size} students of the same level and grade in the current period: mean and median of the group, and the percentile of this student (0-100, higher is better). Mention how the student compares, without naming other students.
+    </Cohort>
+    """
+
+
+def build_prompt(student_info: StudentInfo) -> str:
+    return STATIC_PROMPT + build_student_prompt(student_info)
+
+
+class TokenBucket:
+    # Allows `per_minute` units per minute, refilled continuously.
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.tokens = per_minute
+        self.rate = per_minute / 60
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1) -> None:
+        amount = min(amount, self.capacity)
+        async with self.lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def adjust(self, amount: float) -> None:
+        # Settle an estimate once the real usage is known; may go negative.
+        self._refill()
+        self.tokens -= amount
+
+
+class TokenUsage:
+    def __init__(self):
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.output_tokens = 0
+
+    def add(self, usage: types.GenerateContentResponseUsageMetadata | None) -> None:
+        self.requests += 1
+        if usage is None:
+            return
+        self.prompt_tokens += usage.prompt_token_count or 0
+        self.cached_tokens += usage.cached_content_token_count or 0
+        self.output_tokens += usage.candidates_token_count or 0
+
+    def summary(self) -> str:
+        requests = max(self.requests, 1)
+        fresh = self.prompt_tokens - self.cached_tokens
+        return (
+            f"{self.requests} comments: "
+            f"{self.prompt_tokens / requests:.0f} input tokens/comment "
+            f"({self.cached_tokens / requests:.0f} cached, "
+            f"{fresh / requests:.0f} uncached), "
+            f"{self.output_tokens / requests:.0f} output tokens/comment"
+        )
+
+
+class CommentGenerator:
+    # Runs the async Gemini client on its own event loop thread, so both
+    # coroutines and plain worker threads (see pipeline.staged) can share one
+    # concurrency cap and one pair of RPM/TPM buckets.
+    def __init__(
+        self,
+        client: genai.Client,
+        concurrency: int = int(os.getenv("COMMENT_WORKERS", "4")),
+        rpm: float = GEMINI_RPM,
+        tpm: float = GEMINI_TPM,
+        max_retries: int = GEMINI_MAX_RETRIES,
+        context_cache: bool = GEMINI_CONTEXT_CACHE,
+        comment_cache: CommentCache | None = None,
+    ):
+        self.client = client
+        self.concurrency = concurrency
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_retries = max_retries
+        self.usage = TokenUsage()
+        self.comment_cache = (
+            comment_cache if comment_cache is not None else default_comment_cache()
+        )
+        self.cache_hits = 0
+        # None until the first call tries to create it; False if unavailable.
+        self.cached_content = None if context_cache else False
+        self.cache_expires = 0.0
+        self.cache_lock = None
+        self.loop = asyncio.new_event_loop()
+        self.semaphore = None
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def generate(self, student_info: StudentInfo) -> str:
+        future = asyncio.run_coroutine_threadsafe(
+            self.agenerate(student_info), self.loop
+        )
+        return future.result()
+
+    def generate_all(
+        self, student_infos: list[StudentInfo]
+    ) -> tuple[list[str | None], list[CommentError]]:
+        # Comments in input order, None where generation failed.
+        future = asyncio.run_coroutine_threadsafe(
+            self._agenerate_all(student_infos), self.loop
+        )
+        return future.result()
+
+    async def _agenerate_all(self, student_infos):
+        results = await asyncio.gather(
+            *(self.agenerate(s) for s in student_infos), return_exceptions=True
+        )
+        comments, failures = [], []
+        for result in results:
+            if isinstance(result, CommentError):
+                comments.append(None)
+                failures.append(result)
+            elif isinstance(result, BaseException):
+                raise result
+            else:
+                comments.append(result)
+        return comments, failures
+
+    def close(self) -> None:
+        if self.comment_cache is not None:
+            self.comment_cache.evict()
+        if self.cached_content:
+            try:
+                self.client.caches.delete(name=self.cached_content)
+            except Exception as e:
+                print(e)
+            self.cached_content = None
+        if not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+            self.loop.close()
+
+    async def _context_cache(self) -> str | None:
+        # Created by whichever call gets here first, and extended before its
+        # TTL runs out, however long the run takes.
+        if self.cache_lock is None:
+            self.cache_lock = asyncio.Lock()
+        ttl = cache_ttl_seconds()
+        async with self.cache_lock:
+            if self.cached_content and (
+                self.cache_expires - time.monotonic() < ttl * CACHE_REFRESH_SHARE
+            ):
+                try:
+                    await self.client.aio.caches.update(
+                        name=self.cached_content,
+                        config=types.UpdateCachedContentConfig(ttl=GEMINI_CACHE_TTL),
+                    )
+                    self.cache_expires = time.monotonic() + ttl
+                except Exception as e:
+                    print(f"Context cache could not be extended, recreating: {e}")
+                    self.cached_content = None
+            if self.cached_content is None and not await self._cacheable():
+                self.cached_content = False
+            if self.cached_content is None:
+                try:
+                    cache = await self.client.aio.caches.create(
+                        model=MODEL,
+                        config=types.CreateCachedContentConfig(
+                            contents=[STATIC_PROMPT], ttl=GEMINI_CACHE_TTL
+                        ),
+                    )
+                    self.cached_content = cache.name
+                    self.cache_expires = time.monotonic() + ttl
+                except Exception as e:
+                    print(f"Context cache unavailable, sending full prompt: {e}")
+                    self.cached_content = False
+        return self.cached_content or None
+
+    async def _cacheable(self) -> bool:
+        # caches.create rejects a prefix below the model's minimum, and the
+        # static prompt alone is well below it for gemini-2.0-flash.
+        try:
+            response = await self.client.aio.models.count_tokens(
+                model=MODEL, contents=STATIC_PROMPT
+            )
+        except Exception as e:
+            print(f"Could not count the static prompt, trying the cache anyway: {e}")
+            return True
+        tokens = response.total_tokens or 0
+        if tokens < GEMINI_CACHE_MIN_TOKENS:
+            print(
+                f"Context cache skipped: the static prompt is {tokens} tokens, "
+                f"below the {GEMINI_CACHE_MIN_TOKENS} {MODEL} needs to cache it; "
+                "sending the full prompt"
+            )
+            return False
+        return True
+
+    def _drop_context_cache(self, name: str) -> None:
+        # The server no longer knows the cache (expired or deleted); the next
+        # call creates a new one.
+        if self.cached_content == name:
+            self.cached_content = None
+
+    async def agenerate(self, student_info: StudentInfo) -> str:
+        # Unchanged student, prompt, model and config: reuse the last comment
+        # without touching the API at all.
+        key = None
+        if self.comment_cache is not None:
+            key = CommentCache.key(
+                MODEL,
+                GENERATION_CONFIG.model_dump_json(exclude_none=True),
+                build_prompt(student_info),
+            )
+            comment = self.comment_cache.get(key)
+            if comment is not None:
+                self.cache_hits += 1
+                return comment
+
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.concurrency)
+        cached_content = await self._context_cache()
+        if cached_content:
+            prompt = build_student_prompt(student_info)
+            config = GENERATION_CONFIG.model_copy(
+                update={"cached_content": cached_content}
+            )
+        else:
+            prompt = build_prompt(student_info)
+            config = GENERATION_CONFIG
+        name = student_info.basic_info.name if student_info.basic_info else "?"
+
+        async with self.semaphore:
+            attempt = 0
+            while True:
+                # Cached tokens still count toward the TPM quota.
+                estimate = estimate_tokens(build_prompt(student_info))
+                await self.requests.acquire()
+                await self.tokens.acquire(estimate)
+                try:
+                    with span(
+                        "generate_content", is_async=True, student=name, attempt=attempt
+                    ):
+                        response = await self.client.aio.models.generate_content(
+                            model=MODEL,
+                            contents=prompt,
+                            config=config,
+                        )
+                except errors.APIError as e:
+                    if cached_content and is_cache_error(e):
+                        # Resend with the full prompt; not counted as a retry.
+                        print(
+                            f"Context cache failed for {name}, sending full prompt: {e}"
+                        )
+                        self._drop_context_cache(cached_content)
+                        cached_content = None
+                        prompt = build_prompt(student_info)
+                        config = GENERATION_CONFIG
+                        continue
+                    if e.code not in RETRYABLE_CODES or attempt == self.max_retries:
+                        raise CommentError(name, e) from e
+                    await asyncio.sleep(retry_delay(e, attempt))
+                    attempt += 1
+                    continue
+                except Exception as e:
+                    raise CommentError(name, e) from e
+
+                usage = response.usage_metadata
+                self.usage.add(usage)
+                if usage is not None and usage.total_token_count:
+                    self.tokens.adjust(usage.total_token_count - estimate)
+                if not response.text:
+                    raise CommentError(name, ValueError("empty response"))
+                if key is not None:
+                    self.comment_cache.put(key, response.text)
+                return response.text
+
+
+def cache_ttl_seconds() -> float:
+    # GEMINI_CACHE_TTL is in the API's duration format, e.g. "3600s".
+    return float(GEMINI_CACHE_TTL.rstrip("s"))
+
+
+def is_cache_error(error: errors.APIError) -> bool:
+    # A 4xx naming the cached content, e.g. once it expired on the server.
+    text = f"{error.message} {error.status}".lower()
+    return 400 <= (error.code or 0) < 500 and "cache" in text
+
+
+def estimate_tokens(prompt: str) -> int:
+    # Korean text runs close to one token per character; English ~4 chars.
+    # Overestimating keeps the bucket on the safe side until usage arrives.
+    return len(prompt) + 1024
+
+
+def retry_delay(error: errors.APIError, attempt: int) -> float:
+    hint = retry_hint(error)
+    if hint is not None:
+        return hint + random.uniform(0, 1)
+    return min(2**attempt * 2, 60) * random.uniform(0.8, 1.2)
+
+
+def retry_hint(error: errors.APIError) -> float | None:
+    # Prefer the server's own hint: RetryInfo in the error body, or a
+    # Retry-After header.
+    details = (error.details or {}).get("error", {}).get("details", [])
+    for detail in details:
+        if detail.get("@type", "").endswith("RetryInfo"):
+            match = re.match(r"([\d.]+)s", str(detail.get("retryDelay", "")))
+            if match:
+                return float(match.group(1))
+
+    headers = getattr(error.response, "headers", None) or {}
+    retry_after = headers.get("retry-after")
+    if retry_after and retry_after.isdigit():
+        return float(retry_after)
+    return None
@@ -1,146 +1,510 @@
-from re import S
-from playwright.sync_api import sync_playwright, Page
+from html.parser import HTMLParser
+from playwright.sync_api import sync_playwright, Browser, BrowserContext, Page
 from dotenv import load_dotenv
 import os
-from pydantic import BaseModel
+import json
+import time
+from urllib.parse import urlsplit
+from models import BasicInfo, BookInfo, StudyInfo, GR, StudentInfo
 from datetime import datetime, timedelta
-from dateutil.relativedelta import relativedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+from queue import Queue, Empty
+from typing import TYPE_CHECKING, Callable, Iterator
+from month_cache import MonthCache, default_month_cache
+from archive import MonthArchive, MonthPage, default_archive
+from request_filter import RequestFilter
+from journal import CrawlJournal, default_journal
+from metrics import MetricsStore, month_row
+from windows import QUARTERLY, ReportWindow, default_windows
+from tracing import span
+from site_config import BASE_URL, CACHE_DIR
+import numpy as np
+
+if TYPE_CHECKING:
+    # selection imports roster, which imports this module.
+    from selection import CrawlSelection
 
 load_dotenv()
 
-MAIN_URL = "https://www.englishplatform.co.kr/elp_login.php"
-ADMIN_URL = "https://www.englishplatform.co.kr/adm/member_list.php?teaid=&branid=&sfl=mb_level&stx=3"
-REPORT_URL_TEMPLATE = (
-    "https://www.englishplatform.co.kr/adm/report_mini.php?mb_date1={date}&mb_id={s_id}"
-)
+MAIN_URL = f"{BASE_URL}/elp_login.php"
+ADMIN_URL = f"{BASE_URL}/adm/member_list.php?teaid=&branid=&sfl=mb_level&stx=3"
+REPORT_URL_TEMPLATE = BASE_URL + "/adm/report_mini.php?mb_date1={date}&mb_id={s_id}"
+
+# Rows of cell text for every "#print > table" on a report page
+Tables = list[list[list[str]]]
+
+SESSION_PATH = CACHE_DIR / "session.json"
+
+
+def open_readandtalk(
+    workers: int = int(os.getenv("READANDTALK_WORKERS", "1")),
+    backend: str = os.getenv("READANDTALK_BACKEND", "browser"),
+    cache: MonthCache | None = None,
+    request_filter: RequestFilter | None = None,
+    journal: CrawlJournal | None = None,
+    windows: list[ReportWindow] | None = None,
+    selection: "CrawlSelection | None" = None,
+    archive: MonthArchive | None = None,
+) -> list[StudentInfo]:
+    return list(
+        iter_readandtalk(
+            workers,
+            backend,
+            cache,
+            request_filter,
+            journal,
+            windows,
+            selection,
+            archive,
+        )
+    )
 
 
-class BasicInfo(BaseModel):
-    time_end: str
-    time_start: str
-    lexile: int
-    name: str
-    school: str
-    grade: int
-    count: int
-    level: str
-
-
-class BookInfo(BaseModel):
-    intensive: int
-    extensive: int
-    classics: int
-    curr_month: int
-    # prev_month: int
-    total: int
-
-    def __add__(self, other):
-        return BookInfo(
-            intensive=self.intensive + other.intensive,
-            extensive=self.extensive + other.extensive,
-            classics=self.classics + other.classics,
-            curr_month=self.curr_month + other.curr_month,
-            total=self.total + other.total,
-        )
+def iter_readandtalk(
+    workers: int = int(os.getenv("READANDTALK_WORKERS", "1")),
+    backend: str = os.getenv("READANDTALK_BACKEND", "browser"),
+    cache: MonthCache | None = None,
+    request_filter: RequestFilter | None = None,
+    journal: CrawlJournal | None = None,
+    windows: list[ReportWindow] | None = None,
+    selection: "CrawlSelection | None" = None,
+    archive: MonthArchive | None = None,
+) -> Iterator[StudentInfo]:
+    # Yields each student as soon as it is crawled, so later stages can
+    # start before the whole roster is done. Students restored from the
+    # journal come first; failed students are skipped. With several report
+    # windows each student yields one StudentInfo per window. Only the
+    # roster students picked by `selection` are crawled.
+    if windows is None:
+        windows = default_windows()
+    if cache is None:
+        cache = default_month_cache()
+    if request_filter is None:
+        request_filter = default_request_filter()
+    period = crawl_period(windows)
+    if journal is None:
+        journal = default_journal(period)
+    if selection is None:
+        from selection import default_selection
+
+        selection = default_selection(period)
+    if archive is None:
+        archive = default_archive()
+
+    # Students already in this period's journal are not crawled again.
+    completed = journal.completed() if journal is not None else {}
+    crawl = partial(
+        crawl_student,
+        cache=cache,
+        journal=journal,
+        windows=windows,
+        archive=archive,
+    )
 
+    if backend == "http":
+        from http_fetch import HttpSession
+
+        session = HttpSession()
+        with span("login"):
+            session.login()
+        with span("roster"):
+            roster = selection.select(session.roster())
+        print(selection.summary())
+        student_ids = [row.s_id for row in roster]
+        yield from _restored(student_ids, completed, selection)
+        pending_ids = [
+            s_id
+            for s_id in student_ids
+            if s_id not in completed or selection.stale(s_id)
+        ]
+
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+            futures = {
+                executor.submit(crawl, session.fetch_tables, s_id): s_id
+                for s_id in pending_ids
+            }
+            for future in as_completed(futures):
+                yield from _selected(selection, futures[future], future.result())
+        selection.save()
+        return
 
-class StudyInfo(BaseModel):
-    curr_count: int
-    curr_rate: int
-    # prev_count: int
-    # prev_rate: int
-    total_count: int
-    total_rate: int
-
-    def __add__(self, other):
-        return StudyInfo(
-            curr_count=self.curr_count + other.curr_count,
-            curr_rate=int(
-                (self.curr_rate * self.curr_count + other.curr_rate * other.curr_count)
-                / (self.curr_count + other.curr_count)
-                if self.curr_count + other.curr_count != 0
-                else 0
-            ),
-            total_count=self.total_count + other.total_count,
-            total_rate=int(
-                (
-                    self.total_rate * self.total_count
-                    + other.total_rate * other.total_count
-                )
-                / (self.total_count + other.total_count)
-                if self.total_count + other.total_count != 0
-                else 0
-            ),
-        )
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        with span("login"):
+            context = new_session_context(browser)
+        if request_filter is not None:
+            request_filter.install(context)
+        page = context.new_page()
 
+        # The member list is server-rendered, so its pages are fetched over
+        # plain HTTP with the browser's cookies, several at a time.
+        from http_fetch import HttpSession
+
+        session = HttpSession()
+        session.load_storage_state(context.storage_state())
+        with span("roster"):
+            roster = selection.select(session.roster())
+        print(selection.summary())
+        student_ids = [row.s_id for row in roster]
+        yield from _restored(student_ids, completed, selection)
+        pending_ids = [
+            s_id
+            for s_id in student_ids
+            if s_id not in completed or selection.stale(s_id)
+        ]
 
-class GR(BaseModel):
-    GR_num: str
-    right: int
-    total: int
+        # ITERATE TO GET REPORTS
+        if workers <= 1:
+            fetch_tables = page_fetcher(page, request_filter)
+            crawled = ((s_id, crawl(fetch_tables, s_id)) for s_id in pending_ids)
+        else:
+            storage_state = context.storage_state()
+            crawled = crawl_concurrently(
+                pending_ids, storage_state, workers, crawl, request_filter, journal
+            )
+
+        for s_id, student_infos in crawled:
+            yield from _selected(selection, s_id, student_infos)
+
+        browser.close()
+    selection.save()
+
+    if request_filter is not None:
+        print(request_filter.summary())
+
+
+def crawl_period(windows: list[ReportWindow]) -> str:
+    # Names this run's journal and snapshot entries: the report month and
+    # the windows reported on.
+    return "_".join(
+        [report_month().strftime("%Y%m")] + [window.name for window in windows]
+    )
 
-class StudentInfo(BaseModel):
-    basic_info: BasicInfo | None
-    book_info: list[BookInfo, BookInfo]
-    word_info: list[StudyInfo, StudyInfo]
-    puzzle_info: list[StudyInfo, StudyInfo]
-    dictation_info: list[StudyInfo, StudyInfo]
-    writing_info: list[StudyInfo, StudyInfo]
-    quiz_info: list[StudyInfo, StudyInfo]
-    GR_list: list[GR]
 
+def _restored(
+    student_ids: list[str],
+    completed: dict[str, list[StudentInfo]],
+    selection: "CrawlSelection",
+) -> Iterator[StudentInfo]:
+    restored = [
+        s_id for s_id in student_ids if s_id in completed and not selection.stale(s_id)
+    ]
+    if restored:
+        print(f"{len(restored)} students restored from journal")
+    # Not recorded in the snapshot: the roster row may have changed since
+    # the journal entry was crawled, and the snapshot has to keep the row
+    # from crawl time for changed-only runs to notice.
+    for s_id in restored:
+        yield from (s for s in completed[s_id] if selection.keep(s))
+
+
+def _selected(
+    selection: "CrawlSelection", s_id: str, student_infos: list[StudentInfo] | None
+) -> list[StudentInfo]:
+    selection.record(s_id, student_infos)
+    return [s for s in student_infos or [] if selection.keep(s)]
+
+
+def crawl_student(
+    fetch_tables: Callable[[str], Tables],
+    s_id: str,
+    cache: MonthCache | None = None,
+    journal: CrawlJournal | None = None,
+    windows: list[ReportWindow] | None = None,
+    archive: MonthArchive | None = None,
+) -> list[StudentInfo] | None:
+    try:
+        with span("student", s_id=s_id):
+            student_infos = get_student_infos(
+                fetch_tables, s_id, cache, windows, archive
+            )
+    except Exception as e:
+        print(e)
+        if journal is not None:
+            journal.record_failure(s_id, e)
+        return None
 
-def open_readandtalk() -> list[StudentInfo]:
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context()
-        page = context.new_page()
-        page.goto(MAIN_URL)
+    if journal is not None:
+        journal.record(s_id, student_infos)
+    return student_infos
 
-        # LOGIN
-        input_id = page.locator("input.the-signin-account")
-        input_pw = page.locator("input.the-signin-password")
-        login_btn = page.locator("#normal-login")
 
-        input_id.fill(os.getenv("READANDTALK_ID"))
-        input_pw.fill(os.getenv("READANDTALK_PW"))
-        login_btn.click()
+def login(page: Page) -> None:
+    page.goto(MAIN_URL)
 
-        page.wait_for_load_state("load")
+    # LOGIN
+    input_id = page.locator("input.the-signin-account")
+    input_pw = page.locator("input.the-signin-password")
+    login_btn = page.locator("#normal-login")
 
-        page.goto(ADMIN_URL)
+    input_id.fill(os.getenv("READANDTALK_ID"))
+    input_pw.fill(os.getenv("READANDTALK_PW"))
+    login_btn.click()
 
-        # GET LIST
-        student_ids = []
+    page.wait_for_load_state("load")
 
-        student_infos = list()
-        student_list = page.locator("tbody > tr td[headers='mb_list_id']").all()
 
-        for student in student_list:
-            student_ids.append(student.inner_text())
+def default_request_filter() -> RequestFilter | None:
+    block = os.getenv("READANDTALK_BLOCK_REQUESTS", "0") == "1"
+    if not block and os.getenv("READANDTALK_REQUEST_STATS", "0") != "1":
+        return None
+    return RequestFilter(urlsplit(MAIN_URL).hostname, block=block)
 
-        # ITERATE TO GET REPORTS
-        for s_id in student_ids:
-            try:
-                student_infos.append(get_student_info(page, s_id = s_id))
-            except Exception as e:
-                print(e)
-        return student_infos
-
-
-def get_basic_info(page: Page) -> BasicInfo:
-    basic_table = page.locator("#print > table").nth(1)
-    time = basic_table.locator("tr").locator("td").nth(1).inner_text()
-    lexile = int(
-        basic_table.locator("tr").locator("td").nth(4).inner_text().split("L")[0]
+
+def new_session_context(browser: Browser) -> BrowserContext:
+    # Reuse the last run's cookies while the site still accepts them and
+    # only go through the login form once they have expired.
+    state = load_session_state()
+    if state is not None:
+        context = browser.new_context(storage_state=state)
+        if session_is_valid(context):
+            return context
+        context.close()
+
+    context = browser.new_context()
+    page = context.new_page()
+    login(page)
+    page.close()
+    save_session_state(context.storage_state())
+    return context
+
+
+def session_is_valid(context: BrowserContext) -> bool:
+    # A bare request shares the context's cookies but skips rendering.
+    response = context.request.get(ADMIN_URL)
+    return response.ok and not is_login_page(response.url, response.text())
+
+
+def is_login_page(url: str, html: str) -> bool:
+    return urlsplit(url).path == urlsplit(MAIN_URL).path or "the-signin-account" in html
+
+
+def load_session_state() -> dict | None:
+    try:
+        with open(SESSION_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def save_session_state(state: dict) -> None:
+    SESSION_PATH.parent.mkdir(parents=True, exist_ok=True)
+    # The file holds live session cookies; keep it private to the user.
+    fd = os.open(SESSION_PATH, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with open(fd, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+
+
+def crawl_concurrently(
+    student_ids: list[str],
+    storage_state: dict,
+    workers: int,
+    crawl: Callable = crawl_student,
+    request_filter: RequestFilter | None = None,
+    journal: CrawlJournal | None = None,
+) -> Iterator[tuple[str, list[StudentInfo] | None]]:
+    # Playwright's sync API is bound to the thread that started it, so every
+    # worker drives its own browser: N workers are N Chromium processes, not
+    # N contexts of one. They all load the same storage state and therefore
+    # share the single authenticated session.
+    pending = Queue()
+    for s_id in student_ids:
+        pending.put(s_id)
+
+    done = Queue()
+    errors: list[Exception] = []
+    workers = min(workers, len(student_ids))
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        for _ in range(workers):
+            executor.submit(
+                _crawl_worker,
+                pending,
+                done,
+                storage_state,
+                crawl,
+                request_filter,
+                errors,
+            )
+
+        # Each worker ends with a None, even if its browser failed to start.
+        finished = 0
+        while finished < workers:
+            result = done.get()
+            if result is None:
+                finished += 1
+            else:
+                yield result
+
+    # Left over only if every browser died: failed like any other student
+    # rather than missing from the run.
+    error = errors[-1] if errors else RuntimeError("No crawl worker left")
+    while True:
+        try:
+            s_id = pending.get_nowait()
+        except Empty:
+            break
+        print(f"{s_id} not crawled: {error}")
+        if journal is not None:
+            journal.record_failure(s_id, error)
+        yield s_id, None
+
+
+def _crawl_worker(
+    pending: Queue,
+    done: Queue,
+    storage_state: dict,
+    crawl: Callable,
+    request_filter: RequestFilter | None,
+    errors: list[Exception],
+) -> None:
+    try:
+        with sync_playwright() as p:
+            browser = p.chromium.launch(headless=True)
+            context = browser.new_context(storage_state=storage_state)
+            if request_filter is not None:
+                request_filter.install(context)
+            page = context.new_page()
+            fetch_tables = page_fetcher(page, request_filter)
+
+            while True:
+                try:
+                    s_id = pending.get_nowait()
+                except Empty:
+                    break
+                done.put((s_id, crawl(fetch_tables, s_id)))
+
+            browser.close()
+    except Exception as e:
+        print(e)
+        errors.append(e)
+    finally:
+        done.put(None)
+
+
+# Every "#print > table" on a report page as rows of <td> text, in one
+# round trip instead of one locator call per cell.
+SNAPSHOT_SCRIPT = """
+() => Array.from(document.querySelectorAll("#print > table"), (table) =>
+    Array.from(table.querySelectorAll("tr"), (row) =>
+        Array.from(row.querySelectorAll("td"), (cell) => cell.innerText)
     )
+)
+"""
+
 
-    student_table = page.locator("#print > table").nth(2)
-    name = student_table.locator("tr").nth(0).locator("td").nth(1).inner_text()
-    school = student_table.locator("tr").nth(0).locator("td").nth(3).inner_text()
-    grade = int(student_table.locator("tr").nth(0).locator("td").nth(5).inner_text())
-    count = int(student_table.locator("tr").nth(1).locator("td").nth(1).inner_text())
-    level = student_table.locator("tr").nth(1).locator("td").nth(3).inner_text()
+def snapshot_tables(page: Page) -> Tables:
+    return [
+        [[_normalize(cell) for cell in row] for row in table]
+        for table in page.evaluate(SNAPSHOT_SCRIPT)
+    ]
+
+
+class _TableParser(HTMLParser):
+    VOID_TAGS = {
+        "area",
+        "base",
+        "br",
+        "col",
+        "embed",
+        "hr",
+        "img",
+        "input",
+        "link",
+        "meta",
+        "source",
+        "track",
+        "wbr",
+    }
+
+    def __init__(self):
+        super().__init__()
+        self.tables: Tables = []
+        self.stack: list[str] = []
+        self.print_depth = None
+        self.table_depth = None
+        self.cell = None
+        self.skip_depth = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "br" and self.cell is not None:
+            self.cell.append("\n")
+        if tag in self.VOID_TAGS:
+            return
+
+        if self.table_depth is not None:
+            if tag in ("tr", "td", "th") and self.cell is not None:
+                self._close_cell()
+            if tag == "tr":
+                self.tables[-1].append([])
+            elif tag == "td" and self.tables[-1]:
+                self.cell = []
+        elif tag == "table" and self.print_depth == len(self.stack):
+            self.tables.append([])
+            self.table_depth = len(self.stack)
+
+        if tag in ("script", "style") and self.skip_depth is None:
+            self.skip_depth = len(self.stack)
+        if self.print_depth is None and dict(attrs).get("id") == "print":
+            self.print_depth = len(self.stack) + 1
+        self.stack.append(tag)
+
+    def handle_endtag(self, tag):
+        if tag not in self.stack:
+            return
+        while self.stack:
+            closed = self.stack.pop()
+            depth = len(self.stack)
+            if closed in ("td", "tr") and self.cell is not None:
+                self._close_cell()
+            if depth == self.skip_depth:
+                self.skip_depth = None
+            if depth == self.table_depth:
+                self.table_depth = None
+            if self.print_depth is not None and depth < self.print_depth:
+                self.print_depth = -1
+            if closed == tag:
+                break
+
+    def handle_data(self, data):
+        if self.cell is not None and self.skip_depth is None:
+            self.cell.append(data)
+
+    def _close_cell(self):
+        self.tables[-1][-1].append(_normalize("".join(self.cell)))
+        self.cell = None
+
+
+def tables_from_html(html: str) -> Tables:
+    # Same shape as snapshot_tables, for server-rendered or saved pages.
+    parser = _TableParser()
+    parser.feed(html)
+    parser.close()
+    return parser.tables
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split())
+
+
+def _cell(tables: Tables, table: int, row: int, column: int) -> str:
+    return tables[table][row][column]
+
+
+def _number(text: str, unit: str) -> int:
+    return int(text.split(unit)[0].replace(",", ""))
+
+
+def parse_basic_info(tables: Tables) -> BasicInfo:
+    basic_cells = [cell for row in tables[1] for cell in row]
+    time = basic_cells[1]
+    lexile = _number(basic_cells[4], "L")
+
+    name = _cell(tables, 2, 0, 1)
+    school = _cell(tables, 2, 0, 3)
+    grade = int(_cell(tables, 2, 0, 5))
+    count = int(_cell(tables, 2, 1, 1))
+    level = _cell(tables, 2, 1, 3)
 
     basic_info = BasicInfo(
         time_end=time,
@@ -155,556 +519,243 @@ def get_basic_info(page: Page) -> BasicInfo:
     return basic_info
 
 
-def get_book_info(page: Page, current: bool = False) -> BookInfo:
-    book_table = page.locator("#print > table").nth(3)
-    intensive = int(
-        book_table.locator("tr")
-        .nth(1)
-        .locator("td")
-        .nth(0)
-        .inner_text()
-        .split(" ")[1]
-        .split("권")[0]
-        .replace(",", "")
-    )
-    extensive = int(
-        book_table.locator("tr")
-        .nth(1)
-        .locator("td")
-        .nth(1)
-        .inner_text()
-        .split(" ")[1]
-        .split("권")[0]
-        .replace(",", "")
-    )
-    classics = int(
-        book_table.locator("tr")
-        .nth(1)
-        .locator("td")
-        .nth(3)
-        .inner_text()
-        .split(" ")[1]
-        .split("권")[0]
-        .replace(",", "")
-    )
-    curr_month = int(
-        book_table.locator("tr")
-        .nth(1)
-        .locator("td")
-        .nth(4)
-        .inner_text()
-        .split(" ")[1]
-        .split("권")[0]
-    )
-
-    # prev_month_locator = "#chart_div1 svg > g:nth-of-type(3) > g:nth-of-type(1) > g:nth-of-type(2) rect:nth-of-type(1)[x='200']"
-    # if page.locator(prev_month_locator).get_attribute("height") == "0.5":
-    #     prev_month = 0
-    # else:
-    #     page.click(prev_month_locator)
-    #     page.wait_for_timeout(500)
-    #     try:
-    #         prev_month = int(
-    #             page.locator("#chart_div1 > div > div[aria-hidden='true']").inner_text()
-    #         )
-    #     except Exception:
-    #         prev_month = 0
-
-    if current:
-        total = int(
-            book_table.locator("tr")
-            .nth(1)
-            .locator("td")
-            .nth(5)
-            .inner_text()
-            .split(" ")[1]
-            .split("권")[0]
-        )
-    else:
-        total = 0
+def parse_book_info(tables: Tables, current: bool = False) -> BookInfo:
+    # Cells read like "정독 12권"
+    def books(column: int) -> int:
+        return _number(_cell(tables, 3, 1, column).split(" ")[1], "권")
 
     book_info = BookInfo(
-        intensive=intensive,
-        extensive=extensive,
-        classics=classics,
-        curr_month=curr_month,
-        # prev_month=prev_month,
-        total=total,
+        intensive=books(0),
+        extensive=books(1),
+        classics=books(3),
+        curr_month=books(4),
+        total=books(5) if current else 0,
     )
     return book_info
 
 
-def get_word_info(page: Page, current: bool = False) -> StudyInfo:
-    word_table = page.locator("#print > table").nth(5)
-    curr_count = int(
-        word_table.locator("tr")
-        .nth(1)
-        .locator("td")
-        .nth(0)
-        .inner_text()
-        .split("개")[0]
-        .replace(",", "")
-    )
-    curr_rate = int(
-        word_table.locator("tr").nth(1).locator("td").nth(1).inner_text().split("%")[0]
-    )
-    # prev_count = int(
-    #     word_table.locator("tr")
-    #     .nth(1)
-    #     .locator("td")
-    #     .nth(2)
-    #     .inner_text()
-    #     .split("개")[0]
-    #     .replace(",", "")
-    # )
-    # prev_rate = int(
-    #     word_table.locator("tr").nth(1).locator("td").nth(3).inner_text().split("%")[0]
-    # )
+def parse_study_info(tables: Tables, table: int, current: bool = False) -> StudyInfo:
+    # Columns: this month count/rate, last month count/rate, total count/rate
+    curr_count = _number(_cell(tables, table, 1, 0), "개")
+    curr_rate = _number(_cell(tables, table, 1, 1), "%")
 
     if current:
-        total_count = int(
-            word_table.locator("tr")
-            .nth(1)
-            .locator("td")
-            .nth(4)
-            .inner_text()
-            .split("개")[0]
-            .replace(",", "")
-        )
-        total_rate = int(
-            word_table.locator("tr")
-            .nth(1)
-            .locator("td")
-            .nth(5)
-            .inner_text()
-            .split("%")[0]
-        )
+        total_count = _number(_cell(tables, table, 1, 4), "개")
+        total_rate = _number(_cell(tables, table, 1, 5), "%")
     else:
         total_count, total_rate = 0, 0
 
-    word_info = StudyInfo(
+    return StudyInfo(
         curr_count=curr_count,
         curr_rate=curr_rate,
-        # prev_count=prev_count,
-        # prev_rate=prev_rate,
         total_count=total_count,
         total_rate=total_rate,
     )
-    return word_info
-
-
-def get_puzzle_info(page: Page, current: bool = False) -> StudyInfo:
-    # Puzzle Info
-    puzzle_table = page.locator("#print > table").nth(7)
-    curr_count = int(
-        puzzle_table.locator("tr")
-        .nth(1)
-        .locator("td")
-        .nth(0)
-        .inner_text()
-        .split("개")[0]
-        .replace(",", "")
-    )
-    curr_rate = int(
-        puzzle_table.locator("tr")
-        .nth(1)
-        .locator("td")
-        .nth(1)
-        .inner_text()
-        .split("%")[0]
-    )
-    # prev_count = int(
-    #     puzzle_table.locator("tr")
-    #     .nth(1)
-    #     .locator("td")
-    #     .nth(2)
-    #     .inner_text()
-    #     .split("개")[0]
-    #     .replace(",", "")
-    # )
-    # prev_rate = int(
-    #     puzzle_table.locator("tr")
-    #     .nth(1)
-    #     .locator("td")
-    #     .nth(3)
-    #     .inner_text()
-    #     .split("%")[0]
-    # )
 
-    if current:
-        total_count = int(
-            puzzle_table.locator("tr")
-            .nth(1)
-            .locator("td")
-            .nth(4)
-            .inner_text()
-            .split("개")[0]
-            .replace(",", "")
-        )
-        total_rate = int(
-            puzzle_table.locator("tr")
-            .nth(1)
-            .locator("td")
-            .nth(5)
-            .inner_text()
-            .split("%")[0]
-        )
-    else:
-        total_count, total_rate = 0, 0
 
-    puzzle_info = StudyInfo(
-        curr_count=curr_count,
-        curr_rate=curr_rate,
-        # prev_count=prev_count,
-        # prev_rate=prev_rate,
-        total_count=total_count,
-        total_rate=total_rate,
-    )
-    return puzzle_info
-
-
-def get_dictation_info(page: Page, current: bool = False) -> StudyInfo:
-    # Dication Info
-    dictation_table = page.locator("#print > table").nth(9)
-    curr_count = int(
-        dictation_table.locator("tr")
-        .nth(1)
-        .locator("td")
-        .nth(0)
-        .inner_text()
-        .split("개")[0]
-        .replace(",", "")
-    )
-    curr_rate = int(
-        dictation_table.locator("tr")
-        .nth(1)
-        .locator("td")
-        .nth(1)
-        .inner_text()
-        .split("%")[0]
-    )
-    # prev_count = int(
-    #     dictation_table.locator("tr")
-    #     .nth(1)
-    #     .locator("td")
-    #     .nth(2)
-    #     .inner_text()
-    #     .split("개")[0]
-    #     .replace(",", "")
-    # )
-    # prev_rate = int(
-    #     dictation_table.locator("tr")
-    #     .nth(1)
-    #     .locator("td")
-    #     .nth(3)
-    #     .inner_text()
-    #     .split("%")[0]
-    # )
+def parse_word_info(tables: Tables, current: bool = False) -> StudyInfo:
+    return parse_study_info(tables, 5, current)
 
-    if current:
-        total_count = int(
-            dictation_table.locator("tr")
-            .nth(1)
-            .locator("td")
-            .nth(4)
-            .inner_text()
-            .split("개")[0]
-            .replace(",", "")
-        )
-        total_rate = int(
-            dictation_table.locator("tr")
-            .nth(1)
-            .locator("td")
-            .nth(5)
-            .inner_text()
-            .split("%")[0]
-        )
-    else:
-        total_count, total_rate = 0, 0
 
-    dictation_info = StudyInfo(
-        curr_count=curr_count,
-        curr_rate=curr_rate,
-        # prev_count=prev_count,
-        # prev_rate=prev_rate,
-        total_count=total_count,
-        total_rate=total_rate,
-    )
-    return dictation_info
-
-
-def get_writing_info(page: Page, current: bool = False) -> StudyInfo:
-    writing_table = page.locator("#print > table").nth(11)
-    curr_count = int(
-        writing_table.locator("tr")
-        .nth(1)
-        .locator("td")
-        .nth(0)
-        .inner_text()
-        .split("개")[0]
-        .replace(",", "")
-    )
-    curr_rate = int(
-        writing_table.locator("tr")
-        .nth(1)
-        .locator("td")
-        .nth(1)
-        .inner_text()
-        .split("%")[0]
-    )
-    # prev_count = int(
-    #     writing_table.locator("tr")
-    #     .nth(1)
-    #     .locator("td")
-    #     .nth(2)
-    #     .inner_text()
-    #     .split("개")[0]
-    #     .replace(",", "")
-    # )
-    # prev_rate = int(
-    #     writing_table.locator("tr")
-    #     .nth(1)
-    #     .locator("td")
-    #     .nth(3)
-    #     .inner_text()
-    #     .split("%")[0]
-    # )
+def parse_puzzle_info(tables: Tables, current: bool = False) -> StudyInfo:
+    return parse_study_info(tables, 7, current)
 
-    if current:
-        total_count = int(
-            writing_table.locator("tr")
-            .nth(1)
-            .locator("td")
-            .nth(4)
-            .inner_text()
-            .split("개")[0]
-            .replace(",", "")
-        )
-        total_rate = int(
-            writing_table.locator("tr")
-            .nth(1)
-            .locator("td")
-            .nth(5)
-            .inner_text()
-            .split("%")[0]
-        )
-    else:
-        total_count, total_rate = 0, 0
 
-    writing_info = StudyInfo(
-        curr_count=curr_count,
-        curr_rate=curr_rate,
-        # prev_count=prev_count,
-        # prev_rate=prev_rate,
-        total_count=total_count,
-        total_rate=total_rate,
-    )
-    return writing_info
-
-
-def get_quiz_info(page: Page, current: bool = False) -> StudyInfo:
-    quiz_table = page.locator("#print > table").nth(13)
-    curr_count = int(
-        quiz_table.locator("tr")
-        .nth(1)
-        .locator("td")
-        .nth(0)
-        .inner_text()
-        .split("개")[0]
-        .replace(",", "")
-    )
-    curr_rate = int(
-        quiz_table.locator("tr").nth(1).locator("td").nth(1).inner_text().split("%")[0]
-    )
-    # prev_count = int(
-    #     quiz_table.locator("tr")
-    #     .nth(1)
-    #     .locator("td")
-    #     .nth(2)
-    #     .inner_text()
-    #     .split("개")[0]
-    #     .replace(",", "")
-    # )
-    # prev_rate = int(
-    #     quiz_table.locator("tr").nth(1).locator("td").nth(3).inner_text().split("%")[0]
-    # )
+def parse_dictation_info(tables: Tables, current: bool = False) -> StudyInfo:
+    return parse_study_info(tables, 9, current)
 
-    if current:
-        total_count = int(
-            quiz_table.locator("tr")
-            .nth(1)
-            .locator("td")
-            .nth(4)
-            .inner_text()
-            .split("개")[0]
-            .replace(",", "")
-        )
-        total_rate = int(
-            quiz_table.locator("tr")
-            .nth(1)
-            .locator("td")
-            .nth(5)
-            .inner_text()
-            .split("%")[0]
-        )
-    else:
-        total_count, total_rate = 0, 0
 
-    quiz_info = StudyInfo(
-        curr_count=curr_count,
-        curr_rate=curr_rate,
-        # prev_count=prev_count,
-        # prev_rate=prev_rate,
-        total_count=total_count,
-        total_rate=total_rate,
-    )
-    return quiz_info
-
-def get_gr_info(page: Page) -> list[GR]:
-    gr_table = page.locator("#print > table").nth(15)
-    GR1 = list(
-        map(
-            int,
-            tuple(
-                gr_table.locator("tr")
-                .nth(1)
-                .locator("td")
-                .nth(1)
-                .inner_text()
-                .split("/")
-            ),
-        )
-    )
-    GR2 = list(
-        map(
-            int,
-            tuple(
-                gr_table.locator("tr")
-                .nth(1)
-                .locator("td")
-                .nth(3)
-                .inner_text()
-                .split("/")
-            ),
-        )
-    )
-    GR3 = list(
-        map(
-            int,
-            tuple(
-                gr_table.locator("tr")
-                .nth(1)
-                .locator("td")
-                .nth(5)
-                .inner_text()
-                .split("/")
-            ),
-        )
-    )
-    GR4 = list(
-        map(
-            int,
-            tuple(
-                gr_table.locator("tr")
-                .nth(1)
-                .locator("td")
-                .nth(7)
-                .inner_text()
-                .split("/")
-            ),
-        )
-    )
-    GR5 = list(
-        map(
-            int,
-            tuple(
-                gr_table.locator("tr")
-                .nth(1)
-                .locator("td")
-                .nth(9)
-                .inner_text()
-                .split("/")
-            ),
-        )
-    )
-    return [
-        GR(GR_num="GR1", right=GR1[0], total=GR1[1]),
-        GR(GR_num="GR2", right=GR2[0], total=GR2[1]),
-        GR(GR_num="GR3", right=GR3[0], total=GR3[1]),
-        GR(GR_num="GR4", right=GR4[0], total=GR4[1]),
-        GR(GR_num="GR5", right=GR5[0], total=GR5[1]),
-    ]
+def parse_writing_info(tables: Tables, current: bool = False) -> StudyInfo:
+    return parse_study_info(tables, 11, current)
+
+
+def parse_quiz_info(tables: Tables, current: bool = False) -> StudyInfo:
+    return parse_study_info(tables, 13, current)
+
+
+def parse_gr_info(tables: Tables) -> list[GR]:
+    # GR cells sit at odd columns and read like "12/15"
+    gr_list = []
+    for i, column in enumerate([1, 3, 5, 7, 9]):
+        right, total = map(int, _cell(tables, 15, 1, column).split("/"))
+        gr_list.append(GR(GR_num=f"GR{i + 1}", right=right, total=total))
+    return gr_list
+
+
+def page_fetcher(
+    page: Page, request_filter: RequestFilter | None = None
+) -> Callable[[str], Tables]:
+    def fetch_tables(url: str) -> Tables:
+        started = time.perf_counter()
+        with span("page.goto"):
+            if request_filter is not None and request_filter.block:
+                # The tables are server-rendered, so there is no need to wait
+                # for the chart scripts and images behind the full "load" event.
+                page.goto(url, wait_until="domcontentloaded")
+                page.wait_for_selector("#print > table", state="attached")
+            else:
+                page.goto(url)
+        with span("page.snapshot"):
+            tables = snapshot_tables(page)
+
+        if request_filter is not None:
+            request_filter.record_page(started)
+        return tables
+
+    return fetch_tables
+
 
 def get_student_info(
-    page: Page, s_id: str
+    fetch_tables: Callable[[str], Tables],
+    s_id: str,
+    cache: MonthCache | None = None,
 ) -> StudentInfo:
+    return get_student_infos(fetch_tables, s_id, cache, [QUARTERLY])[0]
+
+
+def get_student_infos(
+    fetch_tables: Callable[[str], Tables],
+    s_id: str,
+    cache: MonthCache | None = None,
+    windows: list[ReportWindow] | None = None,
+    archive: MonthArchive | None = None,
+) -> list[StudentInfo]:
+    # One StudentInfo per window. Every month page is fetched once, however
+    # many windows it falls into, and windows are summed from the months.
+    # With an archive every month's basic info, GR scores and running
+    # totals are parsed too (best-effort outside window ends), and all the
+    # months are archived together.
+    if windows is None:
+        windows = default_windows()
+
+    current_month = report_month()
+    report_key = current_month.strftime("%Y%m")
+    spans = [
+        (window.current(current_month), window.previous(current_month))
+        for window in windows
+    ]
+    ends = {current[0] for current, _ in spans}
+    months_list = sorted({m for span in spans for months in span for m in months})
+
+    # A store per student, not per roster: students stream on to comments
+    # and rendering as soon as they are crawled, so a roster-wide array
+    # would only be complete after the last one.
+    store = MetricsStore([s_id], months_list)
+    end_pages = {}
+    pages = {}
+    for date in reversed(months_list):
+        with span("month", s_id=s_id, month=date):
+            closed = date < report_key
+            tables = fetch_month(fetch_tables, s_id, date, cache, closed=closed)
+
+            # Basic info, GR scores and running totals come from a window's
+            # last month
+            is_end = date in ends
+            if is_end:
+                with span("parse.basic"):
+                    basic_info = parse_basic_info(tables)
+                with span("parse.gr"):
+                    end_pages[date] = (basic_info, parse_gr_info(tables))
+
+            row = parse_month_row(tables, is_end)
+            store.set(s_id, date, row)
+            if archive is not None:
+                pages[date] = archived_page(tables, row, closed, end_pages.get(date))
+
+    if archive is not None:
+        with span("archive"):
+            archive.record(s_id, pages)
+
+    fields = store.windowed([months for span in spans for months in span])[0]
+    student_infos = []
+    for i, (current, _) in enumerate(spans):
+        basic_info, gr_list = end_pages[current[0]]
+        student_infos.append(
+            StudentInfo(
+                basic_info=basic_info.model_copy(update={"time_start": current[-1]}),
+                GR_list=gr_list,
+                # [current window, previous window]
+                **{key: values[2 * i : 2 * i + 2] for key, values in fields.items()},
+            )
+        )
+    return student_infos
+
+
+def archived_page(
+    tables: Tables,
+    row: np.ndarray,
+    closed: bool,
+    end_page: tuple[BasicInfo, list[GR]] | None,
+) -> MonthPage:
+    if end_page is not None:
+        basic_info, gr_list = end_page
+        return MonthPage(row=row, closed=closed, basic_info=basic_info, GR_list=gr_list)
+
+    # Inside a window the report never reads basic info, GR scores or running
+    # totals; only the archive keeps them. A page that lacks one stores NULL
+    # for it instead of failing the student.
+    page = MonthPage(row=row, closed=closed, totals=False)
+    with span("parse.archive"):
+        try:
+            page.row = parse_month_row(tables, True)
+            page.totals = True
+        except (ValueError, IndexError):
+            pass
+        try:
+            page.basic_info = parse_basic_info(tables)
+        except (ValueError, IndexError):
+            pass
+        try:
+            page.GR_list = parse_gr_info(tables)
+        except (ValueError, IndexError):
+            pass
+    return page
+
+
+def parse_month_row(tables: Tables, current: bool = False) -> np.ndarray:
+    with span("parse.book"):
+        book_info = parse_book_info(tables, current)
+    study_infos = {}
+    for kind, parse in STUDY_PARSERS.items():
+        with span(f"parse.{kind}"):
+            study_infos[kind] = parse(tables, current)
+    return month_row(book_info, study_infos)
+
+
+STUDY_PARSERS = {
+    "word": parse_word_info,
+    "puzzle": parse_puzzle_info,
+    "dictation": parse_dictation_info,
+    "writing": parse_writing_info,
+    "quiz": parse_quiz_info,
+}
+
+
+def report_month() -> datetime:
+    # A week into a month we still report on the month that just ended.
+    return datetime.now() - timedelta(days=7)
+
+
+def fetch_month(
+    fetch_tables: Callable[[str], Tables],
+    s_id: str,
+    date: str,
+    cache: MonthCache | None = None,
+    closed: bool = False,
+) -> Tables:
+    # Only months before the report month are final and safe to cache;
+    # the report month also carries running totals and is always refetched.
+    if cache is not None and closed:
+        tables = cache.get(s_id, date)
+        if tables is not None:
+            return tables
+
+    with span("fetch"):
+        tables = fetch_tables(REPORT_URL_TEMPLATE.format(date=date, s_id=s_id))
+    if cache is not None and closed:
+        cache.put(s_id, date, tables)
+    return tables
 
-    basic_info = None
-    gr_list = None
-
-    book_infos_curr = []
-    word_infos_curr = []
-    puzzle_infos_curr = []
-    dictation_infos_curr = []
-    writing_infos_curr = []
-    quiz_infos_curr = []
-
-    book_infos_prev = []
-    word_infos_prev = []
-    puzzle_infos_prev = []
-    dictation_infos_prev = []
-    writing_infos_prev = []
-    quiz_infos_prev = []
-
-    current_month = datetime.now() - timedelta(days=7)
-    months_list = []
-    for i in range(6):
-        months_list.append((current_month - relativedelta(months=i)).strftime("%Y%m"))
-
-    for date in months_list[:3]:
-        page.goto(REPORT_URL_TEMPLATE.format(date=date, s_id=s_id))
-        is_current = (date == current_month.strftime("%Y%m"))
-
-        if is_current:
-            basic_info = get_basic_info(page)
-            basic_info.time_start = (current_month - relativedelta(months=2)).strftime("%Y%m")
-            gr_list = get_gr_info(page)
-
-        book_infos_curr.append(get_book_info(page, is_current))
-        word_infos_curr.append(get_word_info(page, is_current))
-        puzzle_infos_curr.append(get_puzzle_info(page, is_current))
-        dictation_infos_curr.append(get_dictation_info(page, is_current))
-        writing_infos_curr.append(get_writing_info(page, is_current))
-        quiz_infos_curr.append(get_quiz_info(page, is_current))
-
-    for date in months_list[3:]:
-        page.goto(REPORT_URL_TEMPLATE.format(date=date, s_id=s_id))
-
-        book_infos_prev.append(get_book_info(page))
-        word_infos_prev.append(get_word_info(page))
-        puzzle_infos_prev.append(get_puzzle_info(page))
-        dictation_infos_prev.append(get_dictation_info(page))
-        writing_infos_prev.append(get_writing_info(page))
-        quiz_infos_prev.append(get_quiz_info(page))
-
-    return StudentInfo(
-        basic_info=basic_info,
-        book_info=[getsum(book_infos_curr), getsum(book_infos_prev)],
-        word_info=[getsum(word_infos_curr), getsum(word_infos_prev)],
-        puzzle_info=[getsum(puzzle_infos_curr), getsum(puzzle_infos_prev)],
-        dictation_info=[getsum(dictation_infos_curr), getsum(dictation_infos_prev)],
-        writing_info=[getsum(writing_infos_curr), getsum(writing_infos_prev)],
-        quiz_info=[getsum(quiz_infos_curr), getsum(quiz_infos_prev)],
-        GR_list=gr_list,
-    )
-
-def getsum(list_of_objects):
-    if len(list_of_objects) == 0:
-        return None
-    elif len(list_of_objects) == 1:
-        return list_of_objects[0]
-    else:
-        return list_of_objects[0] + getsum(list_of_objects[1:])
 
 if __name__ == "__main__":
     x = open_readandtalk()
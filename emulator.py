@@ -0,0 +1,397 @@
+import argparse
+import random
+import secrets
+import threading
+import time
+from collections import Counter
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from pydantic import BaseModel
+
+# A local stand-in for englishplatform.co.kr: the login form, the member
+# list and report_mini.php with the same "#print > table" layout the
+# crawler parses, filled with synthetic data that only depends on the seed.
+#   python emulator.py --students 500 --latency 0.05 --error-rate 0.01
+#   READANDTALK_BASE_URL=http://127.0.0.1:8765 python main.py
+
+SURNAMES = "김이박최정강조윤장임한오서신권황안송류홍"
+GIVEN_NAMES = "민서준지우현도윤하은수아예진성호영유나연"
+SCHOOLS = ["서울초등학교", "한빛초등학교", "새솔초등학교", "푸른중학교", "다온중학교"]
+
+LOGIN_PAGE = """<!DOCTYPE html>
+<html lang="ko"><head><meta charset="utf-8"><title>로그인</title></head>
+<body>
+<form name="flogin" action="/login_check.php" method="post">
+  <input type="hidden" name="url" value="/">
+  <input type="text" name="mb_id" class="the-signin-account form">
+  <input type="password" name="mb_password" class="the-signin-password form">
+  <button type="submit" id="normal-login">로그인</button>
+</form>
+</body></html>
+"""
+
+
+class EmulatorConfig(BaseModel):
+    students: int = 100
+    seed: int = 0
+    # Every response waits latency + uniform(0, jitter) seconds.
+    latency: float = 0.0
+    jitter: float = 0.0
+    # Share of logged-in page requests answered with a 500.
+    error_rate: float = 0.0
+    # Sessions older than this many seconds are sent back to the login form.
+    session_ttl: float | None = None
+    # (id, password) to accept; None accepts any.
+    account: tuple[str, str] | None = None
+    # Member list rows per page, and how students are spread over branch
+    # and teacher filters (student i: branch i % branches, teacher
+    # i % (branches * teachers)).
+    page_size: int = 15
+    branches: int = 1
+    teachers: int = 1
+
+
+class Emulator:
+    def __init__(self, config: EmulatorConfig, host: str = "127.0.0.1", port: int = 0):
+        self.config = config
+        self.sessions: dict[str, float] = {}
+        self.hits = Counter()
+        self.lock = threading.Lock()
+        self.random = random.Random(config.seed)
+        self.student_ids = [f"student{i:04d}" for i in range(1, config.students + 1)]
+        # Last-activity times set by touch(), over the seeded ones.
+        self.activity: dict[str, str] = {}
+        self.server = ThreadingHTTPServer((host, port), _handler(self))
+        self.server.daemon_threads = True
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> str:
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self.base_url
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def record(self, path: str) -> None:
+        with self.lock:
+            self.hits[path] += 1
+
+    def expire_sessions(self) -> None:
+        with self.lock:
+            self.sessions.clear()
+
+    def login(self, account: str, password: str) -> str | None:
+        if (
+            self.config.account is not None
+            and (account, password) != self.config.account
+        ):
+            return None
+        token = secrets.token_hex(16)
+        with self.lock:
+            self.sessions[token] = time.monotonic()
+        return token
+
+    def is_valid(self, token: str | None) -> bool:
+        with self.lock:
+            created = self.sessions.get(token)
+        if created is None:
+            return False
+        ttl = self.config.session_ttl
+        return ttl is None or time.monotonic() - created < ttl
+
+    def should_fail(self) -> bool:
+        with self.lock:
+            return self.random.random() < self.config.error_rate
+
+    def delay(self) -> None:
+        with self.lock:
+            jitter = self.random.uniform(0, self.config.jitter)
+        if self.config.latency or jitter:
+            time.sleep(self.config.latency + jitter)
+
+    def member_list(self, query: dict[str, list[str]]) -> str:
+        branch = query.get("branid", [""])[0]
+        teacher = query.get("teaid", [""])[0]
+        page = int(query.get("page", ["1"])[0] or 1)
+        size = self.config.page_size
+        teachers = self.config.branches * self.config.teachers
+
+        listed = [
+            (i, s_id)
+            for i, s_id in enumerate(self.student_ids)
+            if (not branch or branch == f"b{i % self.config.branches}")
+            and (not teacher or teacher == f"t{i % teachers}")
+        ]
+        rows = "".join(
+            f'<tr class="bg{i % 2}">'
+            f'<td headers="mb_list_chk"><input type="checkbox" name="chk[]" value="{i}"></td>'
+            f'<td headers="mb_list_id"> {s_id} </td>'
+            f'<td headers="mb_list_name">{student_name(self.config.seed, s_id)}</td>'
+            f'<td headers="mb_list_lastcall">{self.last_activity(s_id)}</td>'
+            "</tr>\n"
+            for i, s_id in listed[(page - 1) * size : page * size]
+        )
+
+        def options(name: str, values: list[str], selected: str) -> str:
+            return (
+                f'<select name="{name}"><option value="">전체</option>'
+                + "".join(
+                    f'<option value="{value}"{" selected" if value == selected else ""}>'
+                    f"{value}</option>"
+                    for value in values
+                )
+                + "</select>"
+            )
+
+        last_page = max(1, -(-len(listed) // size))
+        link = f"./member_list.php?teaid={teacher}&branid={branch}&sfl=mb_level&stx=3&page="
+        pager = (
+            "".join(
+                f'<a href="{link}{p}" class="pg_page">{p}</a>'
+                for p in range(1, min(last_page, 10) + 1)
+                if p != page
+            )
+            + f'<a href="{link}{last_page}" class="pg_page pg_end">맨끝</a>'
+        )
+
+        return (
+            '<!DOCTYPE html><html lang="ko"><head><meta charset="utf-8">'
+            "<title>회원관리</title></head><body>"
+            '<form id="fsearch" method="get">'
+            + options("branid", [f"b{b}" for b in range(self.config.branches)], branch)
+            + options("teaid", [f"t{t}" for t in range(teachers)], teacher)
+            + "</form><table><thead><tr>"
+            '<th id="mb_list_chk">선택</th><th id="mb_list_id">아이디</th>'
+            '<th id="mb_list_name">이름</th><th id="mb_list_lastcall">최종접속</th>'
+            "</tr></thead>\n"
+            f"<tbody>\n{rows}</tbody></table>"
+            f'<nav class="pg_wrap"><span class="pg">{pager}</span></nav></body></html>'
+        )
+
+    def last_activity(self, s_id: str) -> str:
+        return self.activity.get(s_id) or last_activity(self.config.seed, s_id)
+
+    def touch(self, s_id: str) -> None:
+        # The student logs in now, as a changed-since-last-run test needs.
+        self.activity[s_id] = time.strftime("%Y-%m-%d %H:%M:%S")
+
+    def report(self, s_id: str, month: str) -> str | None:
+        if s_id not in self.student_ids or not (len(month) == 6 and month.isdigit()):
+            return None
+        return report_page(self.config.seed, s_id, month)
+
+
+def student_name(seed: int, s_id: str) -> str:
+    rng = random.Random(f"{seed}:{s_id}")
+    return rng.choice(SURNAMES) + rng.choice(GIVEN_NAMES) + rng.choice(GIVEN_NAMES)
+
+
+def last_activity(seed: int, s_id: str) -> str:
+    rng = random.Random(f"{seed}:{s_id}:lastcall")
+    return f"2026-{rng.randint(1, 9):02d}-{rng.randint(1, 28):02d} {rng.randint(9, 21):02d}:00:00"
+
+
+def report_page(seed: int, s_id: str, month: str) -> str:
+    # Monthly figures are random per (seed, student, month); running totals
+    # grow with the month so later months never report less than earlier.
+    student = random.Random(f"{seed}:{s_id}")
+    rng = random.Random(f"{seed}:{s_id}:{month}")
+    months_in = (int(month[:4]) - 2020) * 12 + int(month[4:])
+
+    name = student_name(seed, s_id)
+    school = student.choice(SCHOOLS)
+    grade = student.randint(1, 6)
+    level = f"RG {student.randint(1, 9)}"
+    lexile = student.randint(200, 1200) + months_in * 5
+
+    def table(rows: list[list[str]], css: str = "tbl_report") -> str:
+        body = "".join(
+            "<tr>" + "".join(f"<td>{cell}</td>" for cell in row) + "</tr>\n"
+            for row in rows
+        )
+        return f'<table class="{css}">\n{body}</table>\n'
+
+    def title(text: str) -> str:
+        return f'<table class="tbl_title"><tr><td><h3>{text}</h3></td></tr></table>\n'
+
+    def study(text: str, scale: int) -> str:
+        count = rng.randint(0, scale)
+        total = count + months_in * scale // 2
+        return title(text) + table(
+            [
+                [
+                    "이번달 학습량",
+                    "정답률",
+                    "지난달 학습량",
+                    "정답률",
+                    "누적 학습량",
+                    "누적 정답률",
+                ],
+                [
+                    f"{count:,}개",
+                    f"{rng.randint(50, 100) if count else 0}%",
+                    f"{rng.randint(0, scale):,}개",
+                    f"{rng.randint(50, 100)}%",
+                    f"{total:,}개",
+                    f"{student.randint(60, 100)}%",
+                ],
+            ]
+        )
+
+    gr = []
+    for i in range(1, 6):
+        total = rng.randint(0, 20)
+        gr += [f"GR{i}", f"{rng.randint(0, total)}/{total}"]
+
+    tables = [
+        table([["<img src='/img/logo.png' alt='Read and Talk'>"]], "tbl_logo"),
+        table([["리포트 기간", month], ["예상 Lexile", "기준", f"{lexile:,}L"]]),
+        table(
+            [
+                ["이름", name, "학교", school, "학년", str(grade)],
+                ["수업차수", str(months_in * 8), "학습단계", level],
+            ]
+        ),
+        table(
+            [
+                ["정독", "다독", "", "인문고전", "당월", "누적"],
+                [
+                    f"정독 {rng.randint(0, 8)}권",
+                    f"다독 {rng.randint(0, 20)}권",
+                    "-",
+                    f"인문 {rng.randint(0, 3)}권",
+                    f"당월 {rng.randint(0, 25)}권",
+                    f"총 {months_in * 12:,}권",
+                ],
+            ]
+        ),
+        study("Word", 2000),
+        study("Puzzle", 400),
+        study("Dictation", 300),
+        study("Writing", 150),
+        study("Quiz", 60),
+        title("GR"),
+        table([[""] * 10, gr]),
+    ]
+    return (
+        '<!DOCTYPE html><html lang="ko"><head><meta charset="utf-8">'
+        "<title>리드앤톡 학습 리포트</title>"
+        '<script src="https://cdn.jsdelivr.net/npm/chart.js"></script></head>'
+        f'<body><div id="print">\n{"".join(tables)}</div></body></html>'
+    )
+
+
+def _handler(emulator: Emulator) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body go out as separate writes; without this, delayed
+        # ACKs add ~40 ms to every keep-alive response.
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, body: str = "", headers: dict | None = None):
+            data = body.encode()
+            self.send_response(status)
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _token(self) -> str | None:
+            cookie = SimpleCookie(self.headers.get("Cookie") or "")
+            return cookie["PHPSESSID"].value if "PHPSESSID" in cookie else None
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            emulator.record(url.path)
+            emulator.delay()
+
+            if url.path == "/elp_login.php":
+                return self._send(200, LOGIN_PAGE)
+            if not emulator.is_valid(self._token()):
+                return self._send(302, headers={"Location": "/elp_login.php"})
+            if emulator.should_fail():
+                return self._send(500, "<h1>500 Internal Server Error</h1>")
+
+            if url.path == "/":
+                return self._send(200, "<html><body>main</body></html>")
+            if url.path == "/adm/member_list.php":
+                return self._send(200, emulator.member_list(parse_qs(url.query)))
+            if url.path == "/adm/report_mini.php":
+                query = parse_qs(url.query)
+                html = emulator.report(
+                    query.get("mb_id", [""])[0], query.get("mb_date1", [""])[0]
+                )
+                if html is not None:
+                    return self._send(200, html)
+            self._send(404, "<h1>404 Not Found</h1>")
+
+        def do_POST(self):
+            url = urlsplit(self.path)
+            emulator.record(url.path)
+            emulator.delay()
+            length = int(self.headers.get("Content-Length") or 0)
+            form = parse_qs(self.rfile.read(length).decode())
+            if url.path != "/login_check.php":
+                return self._send(404, "<h1>404 Not Found</h1>")
+
+            token = emulator.login(
+                form.get("mb_id", [""])[0], form.get("mb_password", [""])[0]
+            )
+            if token is None:
+                return self._send(302, headers={"Location": "/elp_login.php"})
+            self._send(
+                302,
+                headers={
+                    "Location": form.get("url", ["/"])[0],
+                    "Set-Cookie": f"PHPSESSID={token}; path=/; HttpOnly",
+                },
+            )
+
+    return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--students", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--session-ttl", type=float)
+    parser.add_argument("--page-size", type=int, default=15)
+    parser.add_argument("--branches", type=int, default=1)
+    parser.add_argument("--teachers", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    emulator = Emulator(
+        EmulatorConfig(
+            students=args.students,
+            seed=args.seed,
+            latency=args.latency,
+            jitter=args.jitter,
+            error_rate=args.error_rate,
+            session_ttl=args.session_ttl,
+            page_size=args.page_size,
+            branches=args.branches,
+            teachers=args.teachers,
+        ),
+        port=args.port,
+    )
+    print(f"READANDTALK_BASE_URL={emulator.base_url}")
+    try:
+        emulator.server.serve_forever()
+    except KeyboardInterrupt:
+        emulator.server.server_close()
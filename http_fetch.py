@@ -0,0 +1,231 @@
+import gzip
+import os
+import threading
+from html.parser import HTMLParser
+from http.client import HTTPConnection, HTTPSConnection, HTTPException
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urljoin, urlsplit
+
+from dotenv import load_dotenv
+
+from roster import ROSTER_WORKERS, RosterRow, enumerate_roster
+from tracing import span
+
+from crawling import (
+    ADMIN_URL,
+    MAIN_URL,
+    Tables,
+    is_login_page,
+    load_session_state,
+    save_session_state,
+    tables_from_html,
+)
+
+load_dotenv()
+
+MAX_REDIRECTS = 5
+
+
+class HttpSession:
+    # One keep-alive connection per thread, all sharing the login cookies.
+    def __init__(self, base_url: str = MAIN_URL):
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme
+        self.host = parts.netloc
+        self.cookies = SimpleCookie()
+        self.cookie_lock = threading.Lock()
+        self.local = threading.local()
+
+    def _connection(self) -> HTTPConnection:
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection_class = (
+                HTTPSConnection if self.scheme == "https" else HTTPConnection
+            )
+            connection = connection_class(self.host, timeout=30)
+            self.local.connection = connection
+        return connection
+
+    def _reset(self) -> None:
+        connection = getattr(self.local, "connection", None)
+        if connection is not None:
+            connection.close()
+        self.local.connection = None
+
+    def _cookie_header(self) -> str:
+        with self.cookie_lock:
+            return "; ".join(f"{k}={m.value}" for k, m in self.cookies.items())
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        body: dict | None = None,
+        raise_for_status: bool = True,
+    ) -> tuple[str, str]:
+        # Returns (final_url, html) after following redirects.
+        for _ in range(MAX_REDIRECTS + 1):
+            parts = urlsplit(url)
+            path = parts.path + ("?" + parts.query if parts.query else "")
+            headers = {
+                "Accept-Encoding": "gzip",
+                "Connection": "keep-alive",
+                "Cookie": self._cookie_header(),
+            }
+            payload = None
+            if body is not None:
+                payload = urlencode(body).encode()
+                headers["Content-Type"] = "application/x-www-form-urlencoded"
+
+            # A pooled connection may have been dropped by the server while
+            # idle; retry once on a fresh one.
+            for attempt in range(2):
+                try:
+                    connection = self._connection()
+                    connection.request(method, path, body=payload, headers=headers)
+                    response = connection.getresponse()
+                    data = response.read()
+                    break
+                except (HTTPException, OSError):
+                    self._reset()
+                    if attempt == 1:
+                        raise
+
+            with self.cookie_lock:
+                for header in response.headers.get_all("Set-Cookie") or []:
+                    self.cookies.load(header)
+
+            if response.status in (301, 302, 303, 307, 308):
+                url = urljoin(url, response.headers["Location"])
+                if response.status in (301, 302, 303):
+                    method, body = "GET", None
+                continue
+
+            if response.status >= 400 and raise_for_status:
+                raise RuntimeError(f"{method} {url} returned {response.status}")
+
+            if response.headers.get("Content-Encoding") == "gzip":
+                data = gzip.decompress(data)
+            charset = response.headers.get_content_charset() or "utf-8"
+            return url, data.decode(charset, errors="replace")
+
+        raise RuntimeError(f"Too many redirects for {url}")
+
+    def get(self, url: str) -> str:
+        return self.request("GET", url)[1]
+
+    def fetch_tables(self, url: str) -> Tables:
+        with span("http.get"):
+            html = self.get(url)
+        with span("parse.html"):
+            return tables_from_html(html)
+
+    def login(self) -> None:
+        state = load_session_state()
+        if state is not None:
+            self.load_storage_state(state)
+            if self.is_logged_in():
+                return
+            self.cookies = SimpleCookie()
+
+        self._form_login()
+        if not self.is_logged_in():
+            raise RuntimeError("Login failed")
+        save_session_state(self.storage_state())
+
+    def load_storage_state(self, state: dict) -> None:
+        # Cookies from a Playwright storage state, e.g. the browser's login.
+        # Only this host's: a state saved for another site must not be sent
+        # here, and its cookies could shadow ours under the same name.
+        hostname = urlsplit(f"{self.scheme}://{self.host}").hostname
+        with self.cookie_lock:
+            for cookie in state.get("cookies", []):
+                if _domain_matches(hostname, cookie.get("domain") or ""):
+                    self.cookies[cookie["name"]] = cookie["value"]
+
+    def is_logged_in(self) -> bool:
+        url, html = self.request("GET", ADMIN_URL, raise_for_status=False)
+        return not is_login_page(url, html)
+
+    def storage_state(self) -> dict:
+        # Playwright's storage state format, so both backends share the file.
+        domain = urlsplit(f"{self.scheme}://{self.host}").hostname
+        with self.cookie_lock:
+            cookies = [
+                {
+                    "name": name,
+                    "value": morsel.value,
+                    "domain": domain,
+                    "path": morsel["path"] or "/",
+                    "expires": -1,
+                    "httpOnly": bool(morsel["httponly"]),
+                    "secure": self.scheme == "https",
+                    "sameSite": "Lax",
+                }
+                for name, morsel in self.cookies.items()
+            ]
+        return {"cookies": cookies, "origins": []}
+
+    def _form_login(self) -> None:
+        login_url, html = self.request("GET", MAIN_URL)
+        form = _LoginFormParser()
+        form.feed(html)
+        if form.account_field is None or form.password_field is None:
+            raise RuntimeError("Login form not found on " + login_url)
+
+        fields = dict(form.fields)
+        fields[form.account_field] = os.getenv("READANDTALK_ID")
+        fields[form.password_field] = os.getenv("READANDTALK_PW")
+        # Where the site lands after login does not matter, only the cookies.
+        self.request(
+            "POST",
+            urljoin(login_url, form.action or ""),
+            body=fields,
+            raise_for_status=False,
+        )
+
+    def roster(self, workers: int = ROSTER_WORKERS) -> list[RosterRow]:
+        return enumerate_roster(self.get, workers)
+
+
+def _domain_matches(hostname: str, domain: str) -> bool:
+    # Cookie domain matching as browsers do it: ".example.com" and
+    # "example.com" both cover www.example.com.
+    domain = domain.lstrip(".").lower()
+    return bool(domain) and (hostname == domain or hostname.endswith("." + domain))
+
+
+class _LoginFormParser(HTMLParser):
+    # Collects the form holding the sign-in inputs the browser flow fills.
+    def __init__(self):
+        super().__init__()
+        self.action = None
+        self.fields: dict[str, str] = {}
+        self.account_field = None
+        self.password_field = None
+        self._form_action = None
+        self._form_fields: dict[str, str] = {}
+        self._found = False
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "form":
+            self._form_action = attrs.get("action")
+            self._form_fields = {}
+            self._found = False
+        elif tag == "input" and attrs.get("name"):
+            classes = (attrs.get("class") or "").split()
+            name = attrs["name"]
+            if "the-signin-account" in classes:
+                self.account_field = name
+                self._found = True
+            elif "the-signin-password" in classes:
+                self.password_field = name
+                self._found = True
+            elif attrs.get("type") not in ("submit", "button", "checkbox"):
+                self._form_fields[name] = attrs.get("value") or ""
+
+    def handle_endtag(self, tag):
+        if tag == "form" and self._found and self.action is None:
+            self.action = self._form_action
+            self.fields = self._form_fields
@@ -0,0 +1,117 @@
+import json
+import os
+import threading
+import traceback
+from datetime import datetime
+from pathlib import Path
+
+from dotenv import load_dotenv
+from pydantic import BaseModel
+
+from models import StudentInfo
+from site_config import CACHE_DIR
+
+load_dotenv()
+
+JOURNAL_DIR = CACHE_DIR / "journal"
+
+
+class CrawlFailure(BaseModel):
+    s_id: str
+    error: str
+    time: str
+
+
+class CrawlJournal:
+    # Append-only record of one reporting period's crawl. Every finished
+    # student is flushed as soon as it is parsed, so a crash loses at most
+    # the students that were in flight.
+    def __init__(self, period: str, directory: Path = JOURNAL_DIR):
+        self.directory = Path(directory)
+        self.path = self.directory / f"{period}.jsonl"
+        self.failure_path = self.directory / f"{period}.failures.jsonl"
+        self.lock = threading.Lock()
+        # Files already checked for a line cut short by a crash.
+        self.checked: set[Path] = set()
+
+    def completed(self) -> dict[str, list[StudentInfo]]:
+        student_infos = {}
+        for entry in self._read(self.path):
+            student_infos[entry["s_id"]] = [
+                StudentInfo.model_validate(student_info)
+                for student_info in entry["student_infos"]
+            ]
+        return student_infos
+
+    def failures(self) -> dict[str, CrawlFailure]:
+        # Later lines win, so a student that failed twice keeps its last error.
+        failures = {}
+        for entry in self._read(self.failure_path):
+            failures[entry["s_id"]] = CrawlFailure.model_validate(entry)
+        return failures
+
+    def record(self, s_id: str, student_infos: list[StudentInfo]) -> None:
+        dumped = ", ".join(s.model_dump_json() for s in student_infos)
+        line = f'{{"s_id": {json.dumps(s_id)}, "student_infos": [{dumped}]}}\n'
+        self._append(self.path, line)
+
+    def record_failure(self, s_id: str, error: Exception) -> None:
+        failure = CrawlFailure(
+            s_id=s_id,
+            error="".join(traceback.format_exception_only(error)).strip(),
+            time=datetime.now().isoformat(timespec="seconds"),
+        )
+        self._append(self.failure_path, failure.model_dump_json() + "\n")
+
+    def reset(self) -> None:
+        self.path.unlink(missing_ok=True)
+        self.failure_path.unlink(missing_ok=True)
+
+    def _append(self, path: Path, line: str) -> None:
+        with self.lock:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if path not in self.checked:
+                # Start after a cut-off last line instead of extending it,
+                # which would lose this entry too.
+                self.checked.add(path)
+                if not _ends_with_newline(path):
+                    line = "\n" + line
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    @staticmethod
+    def _read(path: Path) -> list[dict]:
+        entries = []
+        try:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        # A line cut short by a crash; that student is redone.
+                        continue
+        except FileNotFoundError:
+            pass
+        return entries
+
+
+def _ends_with_newline(path: Path) -> bool:
+    try:
+        with open(path, "rb") as f:
+            if f.seek(0, os.SEEK_END) == 0:
+                return True
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+    except FileNotFoundError:
+        return True
+
+
+def default_journal(period: str) -> CrawlJournal | None:
+    if os.getenv("READANDTALK_JOURNAL", "1") == "0":
+        return None
+    journal = CrawlJournal(period)
+    if os.getenv("READANDTALK_RESET_JOURNAL", "0") == "1":
+        journal.reset()
+    return journal
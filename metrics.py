@@ -0,0 +1,105 @@
+from typing import Iterable
+
+import numpy as np
+
+from models import BookInfo, StudyInfo
+
+BOOK_FIELDS = ("intensive", "extensive", "classics", "curr_month", "total")
+STUDY_KINDS = ("word", "puzzle", "dictation", "writing", "quiz")
+# Rates are kept as rate * count, so the rate of any window is a single
+# division of two exact integer sums instead of a chain of rounded averages.
+STUDY_FIELDS = ("curr_count", "curr_weighted", "total_count", "total_weighted")
+
+METRICS = BOOK_FIELDS + tuple(
+    f"{kind}_{field}" for kind in STUDY_KINDS for field in STUDY_FIELDS
+)
+INDEX = {metric: i for i, metric in enumerate(METRICS)}
+# Running totals are a snapshot, not a monthly amount: a window takes them
+# from its last month instead of summing.
+SNAPSHOT = np.array([metric == "total" or "_total_" in metric for metric in METRICS])
+
+
+def month_row(book_info: BookInfo, study_infos: dict[str, StudyInfo]) -> np.ndarray:
+    # One report page flattened into a METRICS vector.
+    row = np.zeros(len(METRICS), dtype=np.int64)
+    for field in BOOK_FIELDS:
+        row[INDEX[field]] = getattr(book_info, field)
+    for kind, study_info in study_infos.items():
+        row[INDEX[f"{kind}_curr_count"]] = study_info.curr_count
+        row[INDEX[f"{kind}_curr_weighted"]] = (
+            study_info.curr_rate * study_info.curr_count
+        )
+        row[INDEX[f"{kind}_total_count"]] = study_info.total_count
+        row[INDEX[f"{kind}_total_weighted"]] = (
+            study_info.total_rate * study_info.total_count
+        )
+    return row
+
+
+class MetricsStore:
+    # Per-month metrics for a roster as one students x months x METRICS
+    # integer array. Aggregating a window is a sum over the month axis.
+    def __init__(self, student_ids: Iterable[str], months: Iterable[str]):
+        self.student_ids = list(student_ids)
+        self.months = list(months)
+        self.student_index = {s_id: i for i, s_id in enumerate(self.student_ids)}
+        self.month_index = {month: i for i, month in enumerate(self.months)}
+        self.data = np.zeros(
+            (len(self.student_ids), len(self.months), len(METRICS)), dtype=np.int64
+        )
+
+    def set(self, s_id: str, month: str, row: np.ndarray) -> None:
+        self.data[self.student_index[s_id], self.month_index[month]] = row
+
+    def window(self, months: Iterable[str]) -> np.ndarray:
+        # students x METRICS sums over the given months
+        months = list(months)
+        columns = [self.month_index[month] for month in months]
+        sums = self.data[:, columns, :].sum(axis=1)
+        last = self.data[:, self.month_index[max(months)], :]
+        sums[:, SNAPSHOT] = last[:, SNAPSHOT]
+        return sums
+
+    def windowed(self, windows: list[list[str]]) -> list[dict[str, list]]:
+        # For each student, {"book_info": [...], "word_info": [...], ...} with
+        # one entry per window, in the shape StudentInfo expects.
+        sums = [self.window(months) for months in windows]
+        books = [book_infos(s) for s in sums]
+        studies = {kind: [study_infos(s, kind) for s in sums] for kind in STUDY_KINDS}
+
+        fields = []
+        for i in range(len(self.student_ids)):
+            student = {"book_info": [window[i] for window in books]}
+            for kind in STUDY_KINDS:
+                student[f"{kind}_info"] = [window[i] for window in studies[kind]]
+            fields.append(student)
+        return fields
+
+
+def book_infos(sums: np.ndarray) -> list[BookInfo]:
+    columns = sums[:, [INDEX[field] for field in BOOK_FIELDS]].tolist()
+    return [BookInfo(**dict(zip(BOOK_FIELDS, values))) for values in columns]
+
+
+def study_infos(sums: np.ndarray, kind: str) -> list[StudyInfo]:
+    count = sums[:, INDEX[f"{kind}_curr_count"]]
+    total_count = sums[:, INDEX[f"{kind}_total_count"]]
+    curr_rate = rates(sums[:, INDEX[f"{kind}_curr_weighted"]], count)
+    total_rate = rates(sums[:, INDEX[f"{kind}_total_weighted"]], total_count)
+
+    return [
+        StudyInfo(
+            curr_count=values[0],
+            curr_rate=values[1],
+            total_count=values[2],
+            total_rate=values[3],
+        )
+        for values in np.stack(
+            [count, curr_rate, total_count, total_rate], axis=1
+        ).tolist()
+    ]
+
+
+def rates(weighted: np.ndarray, count: np.ndarray) -> np.ndarray:
+    # Weighted average rate, truncated to an int; 0 without attempts.
+    return np.where(count > 0, weighted // np.maximum(count, 1), 0)
@@ -0,0 +1,63 @@
+from pydantic import BaseModel
+
+
+class BasicInfo(BaseModel):
+    time_end: str
+    time_start: str
+    lexile: int
+    name: str
+    school: str
+    grade: int
+    count: int
+    level: str
+
+
+class BookInfo(BaseModel):
+    intensive: int
+    extensive: int
+    classics: int
+    curr_month: int
+    # prev_month: int
+    total: int
+
+
+class StudyInfo(BaseModel):
+    curr_count: int
+    curr_rate: int
+    # prev_count: int
+    # prev_rate: int
+    total_count: int
+    total_rate: int
+
+
+class GR(BaseModel):
+    GR_num: str
+    right: int
+    total: int
+
+
+class CohortMetric(BaseModel):
+    mean: float | None
+    median: float | None
+    # Share of the cohort below the student, ties counting half (0-100).
+    percentile: int | None
+
+
+class Cohort(BaseModel):
+    # Students of the same report window, level and grade.
+    level: str
+    grade: int
+    size: int
+    metrics: dict[str, CohortMetric]
+
+
+class StudentInfo(BaseModel):
+    basic_info: BasicInfo | None
+    book_info: list[BookInfo, BookInfo]
+    word_info: list[StudyInfo, StudyInfo]
+    puzzle_info: list[StudyInfo, StudyInfo]
+    dictation_info: list[StudyInfo, StudyInfo]
+    writing_info: list[StudyInfo, StudyInfo]
+    quiz_info: list[StudyInfo, StudyInfo]
+    GR_list: list[GR]
+    cohort: Cohort | None = None
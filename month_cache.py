@@ -0,0 +1,66 @@
+import json
+import os
+import shutil
+import sys
+from pathlib import Path
+from urllib.parse import quote
+
+from dotenv import load_dotenv
+
+from site_config import CACHE_DIR
+
+load_dotenv()
+
+MONTHS_DIR = CACHE_DIR / "months"
+
+
+class MonthCache:
+    # Table snapshots of closed report months, one JSON file per
+    # (student, YYYYMM). Open months are never written, so a cached month
+    # is always final.
+    def __init__(self, directory: Path = MONTHS_DIR):
+        self.directory = Path(directory)
+
+    def _path(self, s_id: str, month: str) -> Path:
+        return self.directory / quote(s_id, safe="") / f"{month}.json"
+
+    def get(self, s_id: str, month: str) -> list | None:
+        try:
+            with open(self._path(s_id, month), encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def put(self, s_id: str, month: str, tables: list) -> None:
+        path = self._path(s_id, month)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.{id(tables)}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(tables, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    def invalidate(self, s_id: str | None = None, month: str | None = None) -> None:
+        if s_id is None and month is None:
+            shutil.rmtree(self.directory, ignore_errors=True)
+        elif month is None:
+            shutil.rmtree(self.directory / quote(s_id, safe=""), ignore_errors=True)
+        elif s_id is None:
+            for path in self.directory.glob(f"*/{month}.json"):
+                path.unlink(missing_ok=True)
+        else:
+            self._path(s_id, month).unlink(missing_ok=True)
+
+
+def default_month_cache() -> MonthCache | None:
+    if os.getenv("READANDTALK_MONTH_CACHE", "1") == "0":
+        return None
+    cache = MonthCache()
+    if os.getenv("READANDTALK_REFRESH_CACHE", "0") == "1":
+        cache.invalidate()
+    return cache
+
+
+if __name__ == "__main__":
+    # python month_cache.py [s_id] [YYYYMM]  -> drop cached months
+    args = sys.argv[1:] + [None, None]
+    MonthCache().invalidate(s_id=args[0], month=args[1])
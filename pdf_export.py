@@ -0,0 +1,215 @@
+import asyncio
+import html
+import os
+import time
+import traceback
+from pathlib import Path
+
+from dotenv import load_dotenv
+from playwright.async_api import Page, async_playwright
+from playwright.sync_api import Browser
+from pydantic import BaseModel
+
+from models import StudentInfo
+from report import SECTIONS, report_values, section_headings, section_row
+
+load_dotenv()
+
+PDF_PAGES = int(os.getenv("PDF_PAGES", "4"))
+PDF_OPTIONS = {"format": "A4", "print_background": True}
+
+# The same layout as report.build_report: a 7 column table of label cells,
+# value cells and per-section bar charts (previous period orange, current
+# period blue), then the teacher's comment.
+STYLE = """
+@page { size: A4; margin: 12mm; }
+body { font-family: "Malgun Gothic", "Noto Sans CJK KR", sans-serif; font-size: 10pt; }
+table { border-collapse: collapse; width: 100%; table-layout: fixed; }
+td { border: 1px solid #000; text-align: center; vertical-align: middle;
+     white-space: pre-line; padding: 3px; height: 18px; }
+.title { font-size: 18pt; font-weight: bold; border: none; height: 36px; }
+.grey { background: #D9D9D9; }
+.blue { background: #4472C4; color: #FFF; font-weight: bold; }
+.orange { background: #ED7D31; color: #FFF; font-weight: bold; }
+.block { border: 2px solid #000; }
+.chart { border: none; height: 56px; text-align: left; }
+.bar { height: 18px; margin: 4px 0; color: #000; font-size: 8pt; line-height: 18px; }
+.bar span { display: inline-block; height: 100%; vertical-align: top; }
+.comment { text-align: left; height: 160px; }
+"""
+
+
+class PdfResult(BaseModel):
+    name: str
+    path: Path | None = None
+    seconds: float = 0
+    error: str | None = None
+
+
+def report_html(student_info: StudentInfo, comments: str) -> str:
+    values = report_values(student_info, comments)
+
+    def cell(value, css="", colspan=1, rowspan=1):
+        text = html.escape(f"{value:,}" if isinstance(value, int) else str(value))
+        return f'<td class="{css}" colspan="{colspan}" rowspan="{rowspan}">{text}</td>'
+
+    rows = [
+        f"<tr>{cell('Individual Learning Reports', 'title', 7)}</tr>",
+        "<tbody class='block'><tr>"
+        + cell("학습 기간", "grey")
+        + cell(values["B2"], colspan=3)
+        + cell("예상 Lexile", "grey")
+        + cell(values["F2"], colspan=2)
+        + "</tr><tr>"
+        + cell("이름", "grey")
+        + cell(values["B3"])
+        + cell("학교", "grey")
+        + cell(values["D3"])
+        + cell("학년", "grey")
+        + cell(values["F3"], colspan=2)
+        + "</tr><tr>"
+        + cell("수업차수", "grey")
+        + cell(values["B4"])
+        + cell("학습단계", "grey")
+        + cell(values["D4"], colspan=4)
+        + "</tr></tbody>",
+    ]
+
+    for title, headings, start_row, flag in SECTIONS:
+        data = section_row(values, start_row)
+        # Same columns as create_section: current / previous period.
+        curr, prev = (3, 4) if flag else (1, 3)
+        scale = 25 if flag else 100
+        cells = ""
+        for i, value in enumerate(data):
+            css = "blue" if i == curr else "orange" if i == prev else ""
+            cells += cell(value, css)
+        rows.append(
+            "<tbody class='block'><tr>"
+            + cell(title, "grey", rowspan=2)
+            + "".join(
+                cell(heading, "grey")
+                for heading in section_headings(values, headings, start_row)
+            )
+            + f"</tr><tr>{cells}</tr></tbody>"
+            + f"<tr><td class='chart' colspan='7'>{bar(data[prev], scale, '#ED7D31')}"
+            + f"{bar(data[curr], scale, '#4472C4')}</td></tr>"
+        )
+
+    rows.append(
+        "<tbody class='block'><tr>"
+        + cell("Teacher's Comments", "grey title", 7)
+        + "</tr></tbody>"
+    )
+    rows.append(f"<tr>{cell(values['A30'], 'comment', 7)}</tr>")
+    return (
+        f"<!DOCTYPE html><html><head><meta charset='utf-8'><style>{STYLE}</style>"
+        f"</head><body><table>{''.join(rows)}</table></body></html>"
+    )
+
+
+def bar(value: int, scale: int, color: str) -> str:
+    width = max(0, min(value / scale, 1)) * 85
+    return (
+        f"<div class='bar'><span style='width:{width:.1f}%;background:{color}'>"
+        f"</span> {value:,}</div>"
+    )
+
+
+def export_pdfs(
+    reports: list[tuple[StudentInfo, str, Path]], pages: int = PDF_PAGES
+) -> list[PdfResult]:
+    if not reports:
+        return []
+    try:
+        return asyncio.run(_export_pdfs(reports, pages))
+    except Exception as e:
+        # No browser, e.g. `playwright install chromium` never ran: every PDF
+        # fails, but the xlsx reports and the rest of the run still stand.
+        error = "".join(traceback.format_exception_only(e)).strip().splitlines()[0]
+        return [
+            PdfResult(name=student_info.basic_info.name, error=error)
+            for student_info, _, _ in reports
+        ]
+
+
+def print_pdfs(
+    browser: Browser, reports: list[tuple[StudentInfo, str, Path]]
+) -> list[PdfResult]:
+    # On a browser that is already running, e.g. the service's crawl browser,
+    # from the thread that owns it: one tab, one report after another.
+    if not reports:
+        return []
+    context = browser.new_context()
+    page = context.new_page()
+    results = []
+    for student_info, comments, path in reports:
+        name = student_info.basic_info.name
+        start = time.perf_counter()
+        try:
+            page.set_content(report_html(student_info, comments))
+            path.parent.mkdir(parents=True, exist_ok=True)
+            page.pdf(path=str(path), **PDF_OPTIONS)
+        except Exception as e:
+            results.append(PdfResult(name=name, error=_error(e)))
+            continue
+        results.append(
+            PdfResult(name=name, path=path, seconds=time.perf_counter() - start)
+        )
+    context.close()
+    return results
+
+
+def pdf_summary(results: list[PdfResult], seconds: float) -> str:
+    done = [result.seconds for result in results if result.error is None]
+    line = f"{len(done)} PDFs in {seconds:.1f}s"
+    if done:
+        line += f", per report avg {sum(done) / len(done):.2f}s / max {max(done):.2f}s"
+    return line
+
+
+async def _export_pdfs(
+    reports: list[tuple[StudentInfo, str, Path]], pages: int
+) -> list[PdfResult]:
+    # One Chromium and one context for the whole roster; `pages` tabs take
+    # reports off a shared queue, so at most that many render at once. This
+    # is a second browser: main.py's crawl browser has closed by the time
+    # reports exist (the service prints on its own with print_pdfs).
+    queue = asyncio.Queue()
+    for i, report in enumerate(reports):
+        queue.put_nowait((i, report))
+    results: list[PdfResult | None] = [None] * len(reports)
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        context = await browser.new_context()
+
+        async def work(page: Page):
+            while not queue.empty():
+                i, (student_info, comments, path) = queue.get_nowait()
+                results[i] = await _print(page, student_info, comments, path)
+            await page.close()
+
+        tabs = [await context.new_page() for _ in range(min(pages, len(reports)))]
+        await asyncio.gather(*(work(page) for page in tabs))
+        await context.close()
+        await browser.close()
+    return results
+
+
+async def _print(
+    page: Page, student_info: StudentInfo, comments: str, path: Path
+) -> PdfResult:
+    name = student_info.basic_info.name
+    start = time.perf_counter()
+    try:
+        await page.set_content(report_html(student_info, comments))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        await page.pdf(path=str(path), **PDF_OPTIONS)
+    except Exception as e:
+        return PdfResult(name=name, error=_error(e))
+    return PdfResult(name=name, path=path, seconds=time.perf_counter() - start)
+
+
+def _error(e: Exception) -> str:
+    return "".join(traceback.format_exception_only(e)).strip()
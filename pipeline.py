@@ -0,0 +1,53 @@
+import threading
+from queue import Queue
+from typing import Callable, Iterable, Iterator
+
+_DONE = object()
+
+
+def staged(
+    items: Iterable, func: Callable, workers: int = 1, queue_size: int = 8
+) -> Iterator:
+    # Runs func over items on background threads and yields results as they
+    # finish. The bounded queues keep a fast stage from running far ahead of
+    # a slow one. Chaining staged() calls gives a pipeline whose total time
+    # approaches that of its slowest stage.
+    inbox = Queue(maxsize=queue_size)
+    outbox = Queue(maxsize=queue_size)
+    errors = []
+
+    def feed():
+        try:
+            for item in items:
+                inbox.put(item)
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            for _ in range(workers):
+                inbox.put(_DONE)
+
+    def work():
+        while (item := inbox.get()) is not _DONE:
+            # After a failure keep draining so the feeder never blocks.
+            if errors:
+                continue
+            try:
+                outbox.put(func(item))
+            except BaseException as e:
+                errors.append(e)
+        outbox.put(_DONE)
+
+    threading.Thread(target=feed, daemon=True).start()
+    for _ in range(workers):
+        threading.Thread(target=work, daemon=True).start()
+
+    finished = 0
+    while finished < workers:
+        result = outbox.get()
+        if result is _DONE:
+            finished += 1
+        else:
+            yield result
+
+    if errors:
+        raise errors[0]
@@ -0,0 +1,148 @@
+import hashlib
+import os
+import traceback
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Iterable
+
+from dotenv import load_dotenv
+from pydantic import BaseModel
+
+import tracing
+from models import StudentInfo
+from report import ReportTemplate, create_learning_report, report_filename
+
+load_dotenv()
+
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", "0")) or os.cpu_count() or 1
+
+# One template per worker process, built when the process starts.
+_template: ReportTemplate | None = None
+
+
+class RenderResult(BaseModel):
+    name: str
+    path: Path | None = None
+    error: str | None = None
+    # Trace spans recorded in the worker, merged into the main process.
+    spans: list[dict] = []
+
+
+def render_reports(
+    reports: Iterable[tuple[StudentInfo, str]],
+    dir: Path,
+    workers: int = RENDER_WORKERS,
+    template: bool = True,
+) -> list[RenderResult]:
+    # Renders (student, comment) pairs on a process pool as they arrive.
+    # A failed file is reported in its result instead of stopping the batch.
+    dir = Path(dir)
+    names = ReportNames(dir)
+    if workers <= 1:
+        # The in-process template is kept for later calls, e.g. service jobs.
+        if template != (_template is not None):
+            _init_worker(template)
+        results = [
+            _render(student_info, comment, names.assign(student_info, comment))
+            for student_info, comment in reports
+        ]
+    else:
+        # spawn: the parent runs crawler and API client threads, which a
+        # forked child would inherit mid-flight.
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(template,),
+        ) as executor:
+            futures: list[tuple[str, Future]] = []
+            for student_info, comment in reports:
+                path = names.assign(student_info, comment)
+                futures.append(
+                    (
+                        student_info.basic_info.name,
+                        executor.submit(_render, student_info, comment, path),
+                    )
+                )
+            results = []
+            for name, future in futures:
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    # The worker process itself died, not just the render.
+                    results.append(_failed(name, e))
+    for result in results:
+        tracing.extend(result.spans)
+        result.spans = []
+    return names.finish(results)
+
+
+def _init_worker(template: bool) -> None:
+    global _template
+    _template = ReportTemplate() if template else None
+
+
+def _render(student_info: StudentInfo, comment: str, path: Path) -> RenderResult:
+    name = student_info.basic_info.name
+    try:
+        create_learning_report(
+            student_info,
+            comment,
+            dir=path.parent,
+            filename=path.name,
+            template=_template,
+        )
+    except Exception as e:
+        return _failed(name, e)
+    return RenderResult(name=name, path=path, spans=tracing.drain())
+
+
+def _failed(name: str, error: Exception) -> RenderResult:
+    return RenderResult(
+        name=name, error="".join(traceback.format_exception_only(error)).strip()
+    )
+
+
+class ReportNames:
+    # Output names follow report_filename, which two students with the same
+    # name and period share. Every report in such a group is named with a
+    # digest of its own content instead, so which file gets which name does
+    # not depend on the order in which students finished.
+    def __init__(self, dir: Path):
+        self.dir = dir
+        self.taken: dict[str, Path] = {}
+        self.shared: set[str] = set()
+        self.used: set[Path] = set()
+
+    def assign(self, student_info: StudentInfo, comment: str) -> Path:
+        filename = report_filename(student_info)
+        digest = hashlib.sha256(
+            (student_info.model_dump_json() + comment).encode()
+        ).hexdigest()[:8]
+        stem, suffix = filename.rsplit(".", 1)
+        unique = self.dir / f"{stem}_{digest}.{suffix}"
+        # Same name, period, data and comment: the files are identical, so
+        # numbering them in arrival order still names each one consistently.
+        copies = 1
+        while unique in self.used:
+            copies += 1
+            unique = self.dir / f"{stem}_{digest}_{copies}.{suffix}"
+        self.used.add(unique)
+
+        if filename not in self.taken:
+            self.taken[filename] = unique
+            return self.dir / filename
+        # The first report of the group already went out under the plain
+        # name; finish() moves it to its own digest name.
+        self.shared.add(filename)
+        return unique
+
+    def finish(self, results: list[RenderResult]) -> list[RenderResult]:
+        for result in results:
+            if result.path is None or result.path.name not in self.shared:
+                continue
+            unique = self.taken[result.path.name]
+            os.replace(result.path, unique)
+            result.path = unique
+        return results
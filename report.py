@@ -1,9 +1,18 @@
-from crawling import StudentInfo
+from models import StudentInfo
 from openpyxl.chart.axis import ChartLines
 from openpyxl.chart.label import DataLabelList
 from openpyxl import Workbook
 from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
 from openpyxl.chart import BarChart, Reference
+from openpyxl.chart._chart import ChartBase
+from openpyxl.cell.cell import Cell, MergedCell
+from openpyxl.utils.indexed_list import IndexedList
+from openpyxl.worksheet.merge import MergedCellRange
+from collections import defaultdict
+from copy import copy
+from functools import lru_cache
+from tracing import span
+from windows import window_labels
 
 grey_fill = PatternFill(fill_type="solid", start_color="D9D9D9", end_color="D9D9D9")
 blue_fill = PatternFill(fill_type="solid", start_color="4472C4", end_color="4472C4")
@@ -22,8 +31,198 @@ thin_border = Border(
 
 thick_side = Side(style="thick")
 
-
-def create_learning_report(student_info: StudentInfo, comments: str, dir="/"):
+# Styles are immutable once assigned, so every cell can share these instead
+# of allocating its own.
+default_font = Font(size=10)
+highlight_font = Font(bold=True, size=10, color="FFFFFF")
+title_font = Font(bold=True, size=18)
+comment_alignment = Alignment(horizontal="left", vertical="center", wrap_text=True)
+
+DATA_COLUMNS = ["B", "C", "D", "E", "F", "G"]
+# (title, headings, start row, flag); flag marks the book section, whose
+# columns and chart scale differ from the study sections. {current} and
+# {previous} are filled in per student from the report window.
+SECTIONS = [
+    (
+        "원서 학습량",
+        [
+            "정독(권)",
+            "다독(권)",
+            "인문고전(권)",
+            "{current}(권)",
+            "{previous}(권)",
+            "총 학습량(권)",
+        ],
+        6,
+        True,
+    ),
+    (
+        "Word 학습량\n정답률",
+        [
+            "{current}(개)",
+            "정답률(%)",
+            "{previous}(개)",
+            "정답률(%)",
+            "총학습량(개)",
+            "정답률(%)",
+        ],
+        10,
+        False,
+    ),
+    (
+        "Puzzle 학습량\n정답률",
+        [
+            "{current}(문장)",
+            "정답률(%)",
+            "{previous}(문장)",
+            "정답률(%)",
+            "총학습량(문장)",
+            "정답률(%)",
+        ],
+        14,
+        False,
+    ),
+    (
+        "Dictation 학습량\n정답률",
+        [
+            "{current}(문장)",
+            "정답률(%)",
+            "{previous}(문장)",
+            "정답률(%)",
+            "총학습량(문장)",
+            "정답률(%)",
+        ],
+        18,
+        False,
+    ),
+    (
+        "Writing 학습량\n정답률",
+        [
+            "{current}(문장)",
+            "정답률(%)",
+            "{previous}(문장)",
+            "정답률(%)",
+            "총학습량(문장)",
+            "정답률(%)",
+        ],
+        22,
+        False,
+    ),
+    (
+        "Quiz 학습량\n정답률",
+        [
+            "{current}(문제)",
+            "정답률(%)",
+            "{previous}(문제)",
+            "정답률(%)",
+            "총학습량(문제)",
+            "정답률(%)",
+        ],
+        26,
+        False,
+    ),
+]
+STUDY_SECTIONS = {"word": 10, "puzzle": 14, "dictation": 18, "writing": 22, "quiz": 26}
+
+
+def create_learning_report(
+    student_info: StudentInfo,
+    comments: str,
+    dir="/",
+    template: "ReportTemplate | None" = None,
+    filename: str | None = None,
+):
+    student = student_info.basic_info.name
+    with span("render.build", student=student):
+        values = report_values(student_info, comments)
+        wb = build_report(values) if template is None else template.render(values)
+    with span("render.save", student=student):
+        wb.save(dir / (filename or report_filename(student_info)))
+
+
+def report_filename(student_info: StudentInfo) -> str:
+    basic_info = student_info.basic_info
+    return f"{basic_info.time_start[2:]}_{basic_info.time_end[2:]}_{basic_info.name}_통신문.xlsx"
+
+
+def report_values(student_info: StudentInfo, comments: str) -> dict[str, object]:
+    # Every cell that differs from one student's report to the next, by
+    # coordinate. Everything else is layout and comes from build_report.
+    basic_info = student_info.basic_info
+    values = {
+        "B2": f"{basic_info.time_start[:4]}년 {basic_info.time_start[4:]}월 ~ "
+        f"{basic_info.time_end[:4]}년 {basic_info.time_end[4:]}월",
+        "F2": f"{basic_info.lexile}L",
+        "B3": basic_info.name,
+        "D3": basic_info.school,
+        "F3": basic_info.grade,
+        "B4": basic_info.count,
+        "D4": level_text(student_info),
+        "A30": comments,
+    }
+    current, previous = window_labels(basic_info.time_start, basic_info.time_end)
+    for _, headings, start_row, _ in SECTIONS:
+        for col, heading in zip(DATA_COLUMNS, headings):
+            if "{" in heading:
+                values[f"{col}{start_row}"] = heading.format(
+                    current=current, previous=previous
+                )
+
+    book_info = student_info.book_info
+    rows = {
+        6: [
+            book_info[0].intensive,
+            book_info[0].extensive,
+            book_info[0].classics,
+            book_info[0].curr_month,
+            book_info[1].curr_month,
+            book_info[0].total,
+        ]
+    }
+    for kind, start_row in STUDY_SECTIONS.items():
+        study_info = getattr(student_info, f"{kind}_info")
+        rows[start_row] = [
+            study_info[0].curr_count,
+            study_info[0].curr_rate,
+            study_info[1].curr_count,
+            study_info[1].curr_rate,
+            study_info[0].total_count,
+            study_info[0].total_rate,
+        ]
+    for start_row, row in rows.items():
+        for col, value in zip(DATA_COLUMNS, row):
+            values[f"{col}{start_row+1}"] = value
+    return values
+
+
+def level_text(student_info: StudentInfo) -> str:
+    # The level, and where the quiz rate stands among the students of the
+    # same level and grade when cohort statistics were computed.
+    level = student_info.basic_info.level
+    cohort = student_info.cohort
+    if cohort is None or cohort.size < 2:
+        return level
+    percentile = cohort.metrics["quiz_rate"].percentile
+    if percentile is None:
+        return level
+    return f"{level} (같은 단계·학년 {cohort.size}명 중 Quiz 정답률 상위 {max(100 - percentile, 1)}%)"
+
+
+def section_row(values: dict[str, object], start_row: int) -> list:
+    return [values[f"{col}{start_row+1}"] for col in DATA_COLUMNS]
+
+
+def section_headings(
+    values: dict[str, object], headings: list[str], start_row: int
+) -> list[str]:
+    # The template is built without a student and keeps the placeholders.
+    return [
+        values.get(f"{col}{start_row}", heading)
+        for col, heading in zip(DATA_COLUMNS, headings)
+    ]
+
+
+def build_report(values: dict[str, object]) -> Workbook:
     wb = Workbook()
     ws = wb.active
     ws.title = "Report"
@@ -34,7 +233,7 @@ def create_learning_report(student_info: StudentInfo, comments: str, dir="/"):
     # ---------- HEADER ----------
     ws.merge_cells("A1:G1")
     ws["A1"] = "Individual Learning Reports"
-    ws["A1"].font = Font(bold=True, size=18)
+    ws["A1"].font = title_font
     ws["A1"].alignment = center
 
     # --------- Basic Info ---------
@@ -42,206 +241,133 @@ def create_learning_report(student_info: StudentInfo, comments: str, dir="/"):
     apply_grey(ws["A2"])
 
     ws.merge_cells("B2:D2")
-    set_default(
-        ws["B2"],
-        student_info.basic_info.time_start[:4]
-        + "년 "
-        + student_info.basic_info.time_start[4:]
-        + "월 ~ "
-        + student_info.basic_info.time_end[:4]
-        + "년 "
-        + student_info.basic_info.time_end[4:]
-        + "월",
-    )
+    set_default(ws["B2"], values["B2"])
 
     ws["E2"] = "예상 Lexile"
     apply_grey(ws["E2"])
 
     ws.merge_cells("F2:G2")
-    set_default(ws["F2"], str(student_info.basic_info.lexile) + "L")
+    set_default(ws["F2"], values["F2"])
 
     ws["A3"] = "이름"
     apply_grey(ws["A3"])
 
-    set_default(ws["B3"], student_info.basic_info.name)
+    set_default(ws["B3"], values["B3"])
 
     ws["C3"] = "학교"
     apply_grey(ws["C3"])
 
-    set_default(ws["D3"], student_info.basic_info.school)
+    set_default(ws["D3"], values["D3"])
 
     ws["E3"] = "학년"
     apply_grey(ws["E3"])
 
     ws.merge_cells("F3:G3")
-    set_default(ws["F3"], student_info.basic_info.grade)
+    set_default(ws["F3"], values["F3"])
 
     ws["A4"] = "수업차수"
     apply_grey(ws["A4"])
 
-    set_default(ws["B4"], student_info.basic_info.count)
+    set_default(ws["B4"], values["B4"])
 
     ws["C4"] = "학습단계"
     apply_grey(ws["C4"])
 
     ws.merge_cells("D4:G4")
-    set_default(ws["D4"], student_info.basic_info.level)
+    set_default(ws["D4"], values["D4"])
 
     apply_thick_border(ws, row_start=2, row_end=4, column_start=1, column_end=7)
 
     # ----- Sections ------
-    create_section(
-        ws,
-        title="원서 학습량",
-        headings=[
-            "정독(권)",
-            "다독(권)",
-            "인문고전(권)",
-            "당분기권)",
-            "전분기(권)",
-            "총 학습량(권)",
-        ],
-        data=[
-            student_info.book_info[0].intensive,
-            student_info.book_info[0].extensive,
-            student_info.book_info[0].classics,
-            student_info.book_info[0].curr_month,
-            student_info.book_info[1].curr_month,
-            student_info.book_info[0].total,
-        ],
-        start_row=6,
-        flag=True,
-    )
-
-    create_section(
-        ws,
-        title="Word 학습량\n정답률",
-        headings=[
-            "당분기(개)",
-            "정답률(%)",
-            "전분기(개)",
-            "정답률(%)",
-            "총학습량(개)",
-            "정답률(%)",
-        ],
-        data=[
-            student_info.word_info[0].curr_count,
-            student_info.word_info[0].curr_rate,
-            student_info.word_info[1].curr_count,
-            student_info.word_info[1].curr_rate,
-            student_info.word_info[0].total_count,
-            student_info.word_info[0].total_rate,
-        ],
-        start_row=10,
-    )
-
-    create_section(
-        ws,
-        title="Puzzle 학습량\n정답률",
-        headings=[
-            "당분기(문장)",
-            "정답률(%)",
-            "전분기(문장)",
-            "정답률(%)",
-            "총학습량(문장)",
-            "정답률(%)",
-        ],
-        data=[
-            student_info.puzzle_info[0].curr_count,
-            student_info.puzzle_info[0].curr_rate,
-            student_info.puzzle_info[1].curr_count,
-            student_info.puzzle_info[1].curr_rate,
-            student_info.puzzle_info[0].total_count,
-            student_info.puzzle_info[0].total_rate,
-        ],
-        start_row=14,
-    )
-
-    create_section(
-        ws,
-        title="Dictation 학습량\n정답률",
-        headings=[
-            "당분기(문장)",
-            "정답률(%)",
-            "전분기(문장)",
-            "정답률(%)",
-            "총학습량(문장)",
-            "정답률(%)",
-        ],
-        data=[
-            student_info.dictation_info[0].curr_count,
-            student_info.dictation_info[0].curr_rate,
-            student_info.dictation_info[1].curr_count,
-            student_info.dictation_info[1].curr_rate,
-            student_info.dictation_info[0].total_count,
-            student_info.dictation_info[0].total_rate,
-        ],
-        start_row=18,
-    )
-
-    create_section(
-        ws,
-        title="Writing 학습량\n정답률",
-        headings=[
-            "당분기(문장)",
-            "정답률(%)",
-            "전분기(문장)",
-            "정답률(%)",
-            "총학습량(문장)",
-            "정답률(%)",
-        ],
-        data=[
-            student_info.writing_info[0].curr_count,
-            student_info.writing_info[0].curr_rate,
-            student_info.writing_info[1].curr_count,
-            student_info.writing_info[1].curr_rate,
-            student_info.writing_info[0].total_count,
-            student_info.writing_info[0].total_rate,
-        ],
-        start_row=22,
-    )
-
-    create_section(
-        ws,
-        title="Quiz 학습량\n정답률",
-        headings=[
-            "당분기(문제)",
-            "정답률(%)",
-            "전분기(문제)",
-            "정답률(%)",
-            "총학습량(문제)",
-            "정답률(%)",
-        ],
-        data=[
-            student_info.quiz_info[0].curr_count,
-            student_info.quiz_info[0].curr_rate,
-            student_info.quiz_info[1].curr_count,
-            student_info.quiz_info[1].curr_rate,
-            student_info.quiz_info[0].total_count,
-            student_info.quiz_info[0].total_rate,
-        ],
-        start_row=26,
-    )
+    for title, headings, start_row, flag in SECTIONS:
+        create_section(
+            ws,
+            title=title,
+            headings=section_headings(values, headings, start_row),
+            data=section_row(values, start_row),
+            start_row=start_row,
+            flag=flag,
+        )
 
     # ----- Footer -------
     ws.merge_cells("A29:G29")
     apply_grey(ws["A29"])
-    ws["A29"].font = Font(bold=True, size=18)
+    ws["A29"].font = title_font
     ws["A29"].alignment = center
     ws["A29"] = "Teacher's Comments"
     ws.row_dimensions[29].height = 70
     apply_thick_border(ws, row_start=29, row_end=29, column_start=1, column_end=7)
 
     ws.merge_cells("A30:G35")
-    set_default(ws["A30"], comments)
-    ws["A30"].alignment = Alignment(
-        horizontal="left", vertical="center", wrap_text=True
-    )
-
-    wb.save(
-        dir
-        / f"{student_info.basic_info.time_start[2:]}_{student_info.basic_info.time_end[2:]}_{student_info.basic_info.name}_통신문.xlsx"
-    )
+    set_default(ws["A30"], values["A30"])
+    ws["A30"].alignment = comment_alignment
+
+    return wb
+
+
+class ReportTemplate:
+    # The layout of build_report, built once. Rendering a student copies the
+    # template's cells with their already-resolved style ids and fills in
+    # report_values, instead of restyling and re-merging every cell. This
+    # reaches into openpyxl's private style tables and cells, hence the 3.1
+    # pin in pyproject.toml and the XML comparison in tests/test_report.py.
+    def __init__(self):
+        self.wb = build_report(defaultdict(int))
+        self.ws = self.wb.active
+        # The charts only reference cells, so their XML is the same for every
+        # student and is generated once.
+        self.charts = [
+            (chart._write(), chart.anchor, chart.width, chart.height)
+            for chart in self.ws._charts
+        ]
+
+    def render(self, values: dict[str, object]) -> Workbook:
+        wb = Workbook()
+        for table in (
+            "_fonts",
+            "_fills",
+            "_borders",
+            "_alignments",
+            "_protections",
+            "_number_formats",
+            "_cell_styles",
+        ):
+            setattr(wb, table, IndexedList(getattr(self.wb, table)))
+
+        ws = wb.active
+        ws.title = self.ws.title
+        for merged in self.ws.merged_cells.ranges:
+            ws.merged_cells.add(MergedCellRange(ws, merged.coord))
+        for (row, column), cell in self.ws._cells.items():
+            if isinstance(cell, MergedCell):
+                new_cell = MergedCell(ws, row, column)
+                new_cell._style = copy(cell._style)
+            else:
+                new_cell = Cell(ws, row, column, cell._value, copy(cell._style))
+                new_cell.data_type = cell.data_type
+            ws._cells[row, column] = new_cell
+
+        for key, dimension in self.ws.column_dimensions.items():
+            ws.column_dimensions[key].width = dimension.width
+        for key, dimension in self.ws.row_dimensions.items():
+            ws.row_dimensions[key].height = dimension.height
+        for chart in self.charts:
+            ws.add_chart(PrebuiltChart(*chart))
+
+        for coord, value in values.items():
+            ws[coord].value = value
+        return wb
+
+
+class PrebuiltChart(ChartBase):
+    def __init__(self, tree, anchor: str, width: float, height: float):
+        self._tree = tree
+        self.anchor = anchor
+        self.width = width
+        self.height = height
+
+    def _write(self):
+        return self._tree
 
 
 def create_section(
@@ -253,7 +379,7 @@ def create_section(
     ws[f"A{start_row}"] = title
     apply_grey(ws[f"A{start_row}"])
 
-    for i, col in enumerate(["B", "C", "D", "E", "F", "G"]):
+    for i, col in enumerate(DATA_COLUMNS):
         ws[f"{col}{start_row}"] = headings[i]
         apply_grey(ws[f"{col}{start_row}"])
         ws[f"{col}{start_row+1}"] = data[i]
@@ -319,7 +445,7 @@ def create_section(
 
 
 def set_default(cell, value):
-    cell.font = Font(size=10)
+    cell.font = default_font
     cell.alignment = center
     cell.border = thin_border
     cell.value = value
@@ -327,21 +453,21 @@ def set_default(cell, value):
 
 def apply_grey(cell):
     cell.fill = grey_fill
-    cell.font = Font(size=10)
+    cell.font = default_font
     cell.alignment = center
     cell.border = thin_border
 
 
 def apply_blue(cell):
     cell.fill = blue_fill
-    cell.font = Font(bold=True, size=10, color="FFFFFF")
+    cell.font = highlight_font
     cell.alignment = center
     cell.border = thin_border
 
 
 def apply_orange(cell):
     cell.fill = orange_fill
-    cell.font = Font(bold=True, size=10, color="FFFFFF")
+    cell.font = highlight_font
     cell.alignment = center
     cell.border = thin_border
 
@@ -354,25 +480,20 @@ def apply_thick_border(
 
             current_cell = ws.cell(row=r, column=c)
 
-            # Create a new Border object for each cell
-            # We MUST do this, or we will modify the border of other cells
-            new_border = Border()
-
-            # Apply TOP border
-            if r == row_start:
-                new_border.top = thick_side
-
-            # Apply BOTTOM border
-            if r == row_end:
-                new_border.bottom = thick_side
-
-            # Apply LEFT border
-            if c == column_start:
-                new_border.left = thick_side
-
-            # Apply RIGHT border
-            if c == column_end:
-                new_border.right = thick_side
-
-            # Assign the new border to the cell
-            current_cell.border = new_border
+            current_cell.border = thick_border(
+                top=r == row_start,
+                bottom=r == row_end,
+                left=c == column_start,
+                right=c == column_end,
+            )
+
+
+@lru_cache
+def thick_border(top: bool, bottom: bool, left: bool, right: bool) -> Border:
+    # Only nine combinations occur, so each is built once and shared.
+    return Border(
+        top=thick_side if top else None,
+        bottom=thick_side if bottom else None,
+        left=thick_side if left else None,
+        right=thick_side if right else None,
+    )
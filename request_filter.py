@@ -0,0 +1,79 @@
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from playwright.sync_api import BrowserContext, Request, Route
+
+# The crawler only reads table text, so anything that does not build the
+# DOM can be dropped.
+BLOCKED_RESOURCE_TYPES = {"image", "stylesheet", "font", "media", "texttrack"}
+
+
+class RequestFilter:
+    # Aborts images, styles, fonts and third-party requests (e.g. the Google
+    # Charts loader behind #chart_div1) and counts what was saved. With
+    # block=False it only counts, to get a baseline to compare against. One
+    # instance can be shared by every worker context.
+    def __init__(self, allowed_host: str, block: bool = True):
+        self.allowed_host = allowed_host
+        self.block = block
+        self.lock = threading.Lock()
+        self.pages = 0
+        self.page_seconds = 0.0
+        self.allowed = 0
+        self.bytes_received = 0
+        self.bytes_by_type = Counter()
+        self.blocked = Counter()
+
+    def install(self, context: BrowserContext) -> None:
+        context.route("**/*", self._handle)
+        context.on("requestfinished", self._record_finished)
+
+    def _handle(self, route: Route) -> None:
+        request = route.request
+        if self.block and (
+            request.resource_type in BLOCKED_RESOURCE_TYPES
+            or urlsplit(request.url).hostname != self.allowed_host
+        ):
+            with self.lock:
+                self.blocked[request.resource_type] += 1
+            route.abort()
+        else:
+            with self.lock:
+                self.allowed += 1
+            route.continue_()
+
+    def _record_finished(self, request: Request) -> None:
+        # Body bytes as they came over the wire, so chunked and compressed
+        # responses without a Content-Length count too. Chromium reports a
+        # negative size when it has none, e.g. for a 404 without a body.
+        size = max(request.sizes()["responseBodySize"], 0)
+        with self.lock:
+            self.bytes_received += size
+            self.bytes_by_type[request.resource_type] += size
+
+    def record_page(self, started: float) -> None:
+        with self.lock:
+            self.pages += 1
+            self.page_seconds += time.perf_counter() - started
+
+    def summary(self) -> str:
+        pages = max(self.pages, 1)
+        blocked = sum(self.blocked.values())
+        by_type = ", ".join(f"{k}={v}" for k, v in self.blocked.most_common())
+        received = ", ".join(
+            f"{k}={v / pages / 1024:.1f}" for k, v in self.bytes_by_type.most_common()
+        )
+        line = (
+            f"{self.pages} pages, {self.page_seconds / pages:.2f}s/page, "
+            f"{self.allowed / pages:.1f} requests/page allowed, "
+            f"{blocked / pages:.1f} requests/page blocked ({by_type}), "
+            f"{self.bytes_received / pages / 1024:.1f} KiB/page received "
+            f"({received})"
+        )
+        if blocked:
+            # Aborted requests never download, so their size is unknown; a
+            # READANDTALK_REQUEST_STATS=1 run shows it by resource type.
+            line += ", blocked KiB unknown (see READANDTALK_REQUEST_STATS=1)"
+        return line
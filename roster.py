@@ -0,0 +1,180 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from typing import Callable
+from urllib.parse import parse_qs, parse_qsl, urlencode, urlsplit, urlunsplit
+
+from dotenv import load_dotenv
+from pydantic import BaseModel
+
+from crawling import ADMIN_URL
+
+load_dotenv()
+
+ROSTER_WORKERS = int(os.getenv("READANDTALK_ROSTER_WORKERS", "4"))
+# Also list each branch and teacher filter offered on the member list, for
+# accounts whose unfiltered list does not show everyone.
+ROSTER_FILTERS = os.getenv("READANDTALK_ROSTER_FILTERS", "1") != "0"
+FILTER_FIELDS = ("branid", "teaid")
+# Attempts per member list page after the first; a page that still fails
+# aborts the run, since a partial roster would silently drop students.
+ROSTER_RETRIES = int(os.getenv("READANDTALK_ROSTER_RETRIES", "3"))
+
+
+class RosterRow(BaseModel):
+    s_id: str
+    name: str = ""
+    last_activity: str = ""
+    branch: str = ""
+    teacher: str = ""
+    # Every td[headers] cell of the row, keyed by its headers attribute.
+    columns: dict[str, str] = {}
+
+
+class RosterPage(BaseModel):
+    rows: list[RosterRow]
+    last_page: int
+    # Option values of the branch/teacher <select>s, by field name.
+    filters: dict[str, list[str]]
+
+
+class _RosterParser(HTMLParser):
+    # "tbody > tr" rows keyed by td[headers], the pager's page=N links and
+    # the filter <select> options.
+    def __init__(self):
+        super().__init__()
+        self.rows: list[dict[str, str]] = []
+        self.last_page = 1
+        self.filters: dict[str, list[str]] = {}
+        self._tbody = 0
+        self._row = None
+        self._header = None
+        self._cell = None
+        self._select = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "tbody":
+            self._tbody += 1
+        elif tag == "tr" and self._tbody:
+            self._row = {}
+            self.rows.append(self._row)
+        elif tag == "td" and self._row is not None and attrs.get("headers"):
+            self._header = attrs["headers"]
+            self._cell = []
+        elif tag == "a" and attrs.get("href"):
+            page = parse_qs(urlsplit(attrs["href"]).query).get("page")
+            if page and page[0].isdigit():
+                self.last_page = max(self.last_page, int(page[0]))
+        elif tag == "select" and attrs.get("name") in FILTER_FIELDS:
+            self._select = attrs["name"]
+            self.filters[self._select] = []
+        elif tag == "option" and self._select is not None and attrs.get("value"):
+            self.filters[self._select].append(attrs["value"])
+
+    def handle_endtag(self, tag):
+        if tag == "tbody":
+            self._tbody -= 1
+        elif tag == "tr":
+            self._row = None
+        elif tag == "td" and self._cell is not None:
+            self._row[self._header] = " ".join("".join(self._cell).split())
+            self._cell = None
+        elif tag == "select":
+            self._select = None
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell.append(data)
+
+
+def parse_roster_page(html: str) -> RosterPage:
+    parser = _RosterParser()
+    parser.feed(html)
+    parser.close()
+
+    rows = []
+    for cells in parser.rows:
+        if cells.get("mb_list_id"):
+            rows.append(
+                RosterRow(
+                    s_id=cells["mb_list_id"],
+                    name=cells.get("mb_list_name", ""),
+                    last_activity=cells.get("mb_list_lastcall", ""),
+                    columns=cells,
+                )
+            )
+        elif rows and cells:
+            # A member spanning two <tr>s: the second one has no id cell.
+            rows[-1].columns.update(cells)
+    return RosterPage(rows=rows, last_page=parser.last_page, filters=parser.filters)
+
+
+def roster_url(page: int = 1, **filters: str) -> str:
+    parts = urlsplit(ADMIN_URL)
+    query = dict(parse_qsl(parts.query, keep_blank_values=True))
+    query.update(filters)
+    if page > 1:
+        query["page"] = str(page)
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def retrying(get: Callable[[str], str], retries: int) -> Callable[[str], str]:
+    def get_with_retries(url: str) -> str:
+        for attempt in range(retries + 1):
+            try:
+                return get(url)
+            except Exception as e:
+                if attempt == retries:
+                    raise
+                print(f"Retrying {url}: {e}")
+                time.sleep(min(2**attempt, 10))
+
+    return get_with_retries
+
+
+def enumerate_roster(
+    get: Callable[[str], str],
+    workers: int = ROSTER_WORKERS,
+    filters: bool = ROSTER_FILTERS,
+    retries: int = ROSTER_RETRIES,
+) -> list[RosterRow]:
+    # Every page of the member list, and of each branch/teacher filter,
+    # fetched `workers` at a time. Students listed more than once keep their
+    # first row, plus the branch/teacher they were found under.
+    get = retrying(get, retries)
+    first = parse_roster_page(get(roster_url()))
+    queries = [{}]
+    if filters:
+        queries += [
+            {field: value}
+            for field in FILTER_FIELDS
+            for value in first.filters.get(field, [])
+        ]
+
+    def fetch(job: tuple[int, int]) -> RosterPage:
+        query, page = job
+        return parse_roster_page(get(roster_url(page, **queries[query])))
+
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        firsts = [first] + list(
+            executor.map(fetch, [(query, 1) for query in range(1, len(queries))])
+        )
+        rest = [
+            (query, page)
+            for query, roster_page in enumerate(firsts)
+            for page in range(2, roster_page.last_page + 1)
+        ]
+        pages = dict(zip(rest, executor.map(fetch, rest)))
+    pages.update({(query, 1): roster_page for query, roster_page in enumerate(firsts)})
+
+    roster: dict[str, RosterRow] = {}
+    for query, page in sorted(pages):
+        for row in pages[query, page].rows:
+            row = roster.setdefault(row.s_id, row)
+            if "branid" in queries[query]:
+                row.branch = row.branch or queries[query]["branid"]
+            if "teaid" in queries[query]:
+                row.teacher = row.teacher or queries[query]["teaid"]
+    return list(roster.values())
@@ -0,0 +1,183 @@
+import json
+import os
+from collections import Counter
+from pathlib import Path
+
+from dotenv import load_dotenv
+from pydantic import BaseModel
+
+from models import StudentInfo
+from roster import RosterRow
+from site_config import CACHE_DIR
+
+load_dotenv()
+
+SNAPSHOT_PATH = CACHE_DIR / "roster_snapshot.json"
+# Roster cells that say nothing about the student's activity.
+IGNORED_COLUMNS = ("mb_list_chk",)
+
+
+class StudentSnapshot(BaseModel):
+    # The student's roster row and report basics when last crawled.
+    period: str
+    signature: dict[str, str]
+    level: str = ""
+    count: int = 0
+
+
+def roster_signature(row: RosterRow) -> dict[str, str]:
+    return {
+        header: value
+        for header, value in sorted(row.columns.items())
+        if header not in IGNORED_COLUMNS
+    }
+
+
+def _level(level: str) -> str:
+    # "RG 3", "rg3" and "RG  3" are the same level.
+    return "".join(level.split()).casefold()
+
+
+class CrawlSelection:
+    # Which roster students a run crawls. IDs, branches and teachers narrow
+    # the roster directly; levels come from the last crawl's snapshot, and
+    # students without one are crawled and then kept only if their level
+    # matches. With changed_only, students whose roster row is unchanged
+    # since they were last crawled for the same period are skipped.
+    def __init__(
+        self,
+        period: str,
+        student_ids: list[str] = [],
+        levels: list[str] = [],
+        branches: list[str] = [],
+        teachers: list[str] = [],
+        changed_only: bool = False,
+        path: Path = SNAPSHOT_PATH,
+    ):
+        self.period = period
+        self.student_ids = set(student_ids)
+        self.levels = {_level(level) for level in levels}
+        self.branches = set(branches)
+        self.teachers = set(teachers)
+        self.changed_only = changed_only
+        self.path = Path(path)
+        self.snapshot = self._load()
+        self.rows: dict[str, RosterRow] = {}
+        self.skipped = Counter()
+        self.missing: list[str] = []
+
+    def select(self, roster: list[RosterRow]) -> list[RosterRow]:
+        selected = []
+        for row in roster:
+            reason = self._skip_reason(row)
+            if reason is None:
+                selected.append(row)
+            else:
+                self.skipped[reason] += 1
+        self.rows = {row.s_id: row for row in selected}
+        self.missing = sorted(self.student_ids - {row.s_id for row in roster})
+        return selected
+
+    def _skip_reason(self, row: RosterRow) -> str | None:
+        if self.student_ids and row.s_id not in self.student_ids:
+            return "id"
+        if self.branches and row.branch not in self.branches:
+            return "branch"
+        if self.teachers and row.teacher not in self.teachers:
+            return "teacher"
+        previous = self.snapshot.get(row.s_id)
+        if self.levels and previous is not None and previous.level:
+            if _level(previous.level) not in self.levels:
+                return "level"
+        if self.changed_only and self.unchanged(row, previous):
+            return "unchanged"
+        return None
+
+    def unchanged(self, row: RosterRow, previous: StudentSnapshot | None) -> bool:
+        # A row without a last-activity cell cannot show activity, so such
+        # students are crawled every time.
+        return (
+            previous is not None
+            and previous.period == self.period
+            and bool(row.last_activity)
+            and previous.signature == roster_signature(row)
+        )
+
+    def stale(self, s_id: str) -> bool:
+        # Changed since it was crawled, so this period's journal entry for
+        # the student is out of date too.
+        row = self.rows.get(s_id)
+        previous = self.snapshot.get(s_id)
+        return (
+            self.changed_only
+            and row is not None
+            and previous is not None
+            and previous.period == self.period
+            and not self.unchanged(row, previous)
+        )
+
+    def keep(self, student_info: StudentInfo) -> bool:
+        return not self.levels or _level(student_info.basic_info.level) in self.levels
+
+    def record(self, s_id: str, student_infos: list[StudentInfo] | None) -> None:
+        # Only students crawled in this run are recorded, with the roster row
+        # they were crawled under: a failed or journal-restored one keeps its
+        # old entry and so still shows up as changed.
+        row = self.rows.get(s_id)
+        if row is None or not student_infos:
+            return
+        basic_info = student_infos[0].basic_info
+        self.snapshot[s_id] = StudentSnapshot(
+            period=self.period,
+            signature=roster_signature(row),
+            level=basic_info.level,
+            count=basic_info.count,
+        )
+
+    def summary(self) -> str:
+        line = f"Crawling {len(self.rows)} of {len(self.rows) + self.skipped.total()} students"
+        if self.skipped:
+            skipped = ", ".join(
+                f"{count} {reason}" for reason, count in self.skipped.items()
+            )
+            line += f" (skipped: {skipped})"
+        if self.missing:
+            line += f"; not on the roster: {', '.join(self.missing)}"
+        return line
+
+    def _load(self) -> dict[str, StudentSnapshot]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                entries = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        return {
+            s_id: StudentSnapshot.model_validate(entry)
+            for s_id, entry in entries.items()
+        }
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(
+                {s_id: entry.model_dump() for s_id, entry in self.snapshot.items()},
+                f,
+                ensure_ascii=False,
+            )
+        os.replace(tmp, self.path)
+
+
+def _env_list(name: str) -> list[str]:
+    return [value.strip() for value in os.getenv(name, "").split(",") if value.strip()]
+
+
+def default_selection(period: str) -> CrawlSelection:
+    return CrawlSelection(
+        period,
+        student_ids=_env_list("READANDTALK_STUDENTS"),
+        levels=_env_list("READANDTALK_LEVELS"),
+        branches=_env_list("READANDTALK_BRANCHES"),
+        teachers=_env_list("READANDTALK_TEACHERS"),
+        changed_only=os.getenv("READANDTALK_CHANGED_ONLY", "0") == "1",
+    )
@@ -0,0 +1,385 @@
+import argparse
+import json
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from queue import Queue
+
+from dotenv import load_dotenv
+from google import genai
+from playwright.sync_api import sync_playwright
+from pydantic import BaseModel, ValidationError
+
+import tracing
+from archive import default_archive
+from cohort import attach_cohorts
+from comments import CommentGenerator
+from crawling import (
+    crawl_period,
+    default_request_filter,
+    get_student_infos,
+    new_session_context,
+    page_fetcher,
+    session_is_valid,
+)
+from journal import CrawlJournal
+from models import StudentInfo
+from month_cache import default_month_cache
+from pdf_export import export_pdfs, print_pdfs
+from rendering import render_reports
+from windows import ReportWindow, default_windows, parse_windows
+
+load_dotenv()
+
+# Local only by default: the service acts with the site and Gemini accounts.
+SERVICE_HOST = os.getenv("READANDTALK_SERVICE_HOST", "127.0.0.1")
+SERVICE_PORT = int(os.getenv("READANDTALK_SERVICE_PORT", "8766"))
+
+
+class Job(BaseModel):
+    students: list[str]
+    # READANDTALK_WINDOWS syntax, e.g. "monthly" or "202503-202508";
+    # None uses READANDTALK_WINDOWS.
+    windows: str | None = None
+    # Skip the site and render from this period's journal.
+    render_only: bool = False
+    # Also print each xlsx as a PDF next to it.
+    pdf: bool = False
+
+
+class JobReport(BaseModel):
+    s_id: str
+    name: str | None = None
+    path: Path | None = None
+    error: str | None = None
+    pdf: Path | None = None
+    pdf_error: str | None = None
+
+
+class JobResult(BaseModel):
+    reports: list[JobReport]
+    seconds: float
+
+
+class ReportService:
+    # What every main.py run pays for before its first page, kept alive
+    # between jobs: the browser with a logged-in context (or the HTTP
+    # session), the Gemini client, the report template and the caches.
+    # Jobs run one at a time on a single thread, since Playwright's sync API
+    # is bound to the thread that started it.
+    def __init__(
+        self,
+        reports_dir: Path,
+        backend: str = os.getenv("READANDTALK_BACKEND", "browser"),
+        workers: int = int(os.getenv("READANDTALK_WORKERS", "1")),
+        client: genai.Client | None = None,
+    ):
+        self.reports_dir = Path(reports_dir)
+        self.backend = backend
+        self.workers = workers
+        self.cache = default_month_cache()
+        self.archive = default_archive()
+        self.cohorts = os.getenv("COHORT_STATS", "0") == "1"
+        self.client = client or genai.Client(api_key=os.getenv("GEMINI_KEY"))
+        # One generator for the service's lifetime; it keeps its own Gemini
+        # context cache extended between jobs.
+        self.comment_generator = CommentGenerator(self.client)
+        self.jobs: Queue = Queue()
+        self.completed = 0
+        self.ready = threading.Event()
+        self.error: Exception | None = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> None:
+        self.thread.start()
+        self.ready.wait()
+        if self.error is not None:
+            raise self.error
+
+    def stop(self) -> None:
+        self.jobs.put(None)
+        self.thread.join()
+        self.comment_generator.close()
+
+    def submit(self, job: Job) -> Future:
+        future = Future()
+        self.jobs.put((job, future))
+        return future
+
+    def _run(self) -> None:
+        try:
+            if self.backend == "http":
+                from http_fetch import HttpSession
+
+                self.session = HttpSession()
+                with tracing.span("login"):
+                    self.session.login()
+                self.fetch_tables = self.session.fetch_tables
+            else:
+                self.playwright = sync_playwright().start()
+                self.browser = self.playwright.chromium.launch(headless=True)
+                self.request_filter = default_request_filter()
+                self._open_context()
+        except Exception as e:
+            self.error = e
+            return
+        finally:
+            self.ready.set()
+
+        while (item := self.jobs.get()) is not None:
+            job, future = item
+            try:
+                with tracing.span("job", students=len(job.students)):
+                    future.set_result(self.process(job))
+            except Exception as e:
+                future.set_exception(e)
+            self.completed += 1
+            if tracing.ENABLED:
+                # One trace per job, e.g. trace.job3.json next to trace.json.
+                path = Path(tracing.TRACE_PATH)
+                tracing.flush(
+                    path.with_name(f"{path.stem}.job{self.completed}{path.suffix}")
+                )
+
+        if self.backend != "http":
+            self.browser.close()
+            self.playwright.stop()
+
+    def _open_context(self) -> None:
+        with tracing.span("login"):
+            self.context = new_session_context(self.browser)
+        if self.request_filter is not None:
+            self.request_filter.install(self.context)
+        self.page = self.context.new_page()
+        self.fetch_tables = page_fetcher(self.page, self.request_filter)
+
+    def _relogin(self) -> bool:
+        # After a failed page: log in again if the session was the cause.
+        if self.backend == "http":
+            if self.session.is_logged_in():
+                return False
+            self.session.login()
+            return True
+        if session_is_valid(self.context):
+            return False
+        self.context.close()
+        self._open_context()
+        return True
+
+    def process(self, job: Job) -> JobResult:
+        start = time.perf_counter()
+        windows = parse_windows(job.windows) if job.windows else default_windows()
+        journal = None
+        if os.getenv("READANDTALK_JOURNAL", "1") != "0":
+            # Not default_journal: READANDTALK_RESET_JOURNAL would wipe the
+            # period on every job.
+            journal = CrawlJournal(crawl_period(windows))
+
+        errors: dict[str, str] = {}
+        if job.render_only:
+            completed = journal.completed() if journal is not None else {}
+            crawled = {s_id: completed.get(s_id) for s_id in job.students}
+            for s_id, student_infos in crawled.items():
+                if student_infos is None:
+                    errors[s_id] = (
+                        "Not crawled for this period; run without render_only"
+                    )
+        else:
+            crawled = self._crawl_all(job.students, windows, journal, errors)
+
+        student_infos = [
+            (s_id, student_info)
+            for s_id in dict.fromkeys(job.students)
+            for student_info in crawled.get(s_id) or []
+        ]
+        if self.cohorts and student_infos:
+            population = None
+            if journal is not None:
+                population = [
+                    s for infos in journal.completed().values() for s in infos
+                ]
+            with tracing.span("cohort"):
+                attached = attach_cohorts([s for _, s in student_infos], population)
+            student_infos = list(zip([s_id for s_id, _ in student_infos], attached))
+
+        comments, failures = self.comment_generator.generate_all(
+            [student_info for _, student_info in student_infos]
+        )
+        # Failures come in input order, one for each None comment.
+        failed = iter(failures)
+        commented = [
+            (s_id, student_info, comment)
+            for (s_id, student_info), comment in zip(student_infos, comments)
+            if comment is not None
+        ]
+        rendered = render_reports(
+            [(student_info, comment) for _, student_info, comment in commented],
+            self.reports_dir,
+            workers=1,
+            template=os.getenv("REPORT_TEMPLATE", "1") != "0",
+        )
+
+        reports = [JobReport(s_id=s_id, error=error) for s_id, error in errors.items()]
+        for (s_id, student_info), comment in zip(student_infos, comments):
+            if comment is None:
+                reports.append(
+                    JobReport(
+                        s_id=s_id,
+                        name=student_info.basic_info.name,
+                        error=str(next(failed)),
+                    )
+                )
+        printed = {}
+        if job.pdf:
+            written = [
+                (student_info, comment, result.path.with_suffix(".pdf"))
+                for (_, student_info, comment), result in zip(commented, rendered)
+                if result.error is None
+            ]
+            with tracing.span("pdf", reports=len(written)):
+                if self.backend == "http":
+                    # No browser to reuse: launch one for this job.
+                    pdfs = export_pdfs(written)
+                else:
+                    pdfs = print_pdfs(self.browser, written)
+            printed = {path: pdf for (_, _, path), pdf in zip(written, pdfs)}
+        for (s_id, _, _), result in zip(commented, rendered):
+            pdf = printed.get(result.path and result.path.with_suffix(".pdf"))
+            reports.append(
+                JobReport(
+                    s_id=s_id,
+                    name=result.name,
+                    path=result.path,
+                    error=result.error,
+                    pdf=pdf and pdf.path,
+                    pdf_error=pdf and pdf.error,
+                )
+            )
+        return JobResult(reports=reports, seconds=time.perf_counter() - start)
+
+    def _crawl_all(
+        self,
+        student_ids: list[str],
+        windows: list[ReportWindow],
+        journal: CrawlJournal | None,
+        errors: dict[str, str],
+    ) -> dict[str, list[StudentInfo]]:
+        crawled: dict[str, list[StudentInfo]] = {}
+        pending = list(dict.fromkeys(student_ids))
+        # A second round only if the first failures were an expired login.
+        for attempt in range(2):
+            failures = {}
+            if self.backend == "http" and self.workers > 1:
+                with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                    results = list(
+                        executor.map(
+                            lambda s_id: self._crawl(s_id, windows, journal), pending
+                        )
+                    )
+            else:
+                results = [self._crawl(s_id, windows, journal) for s_id in pending]
+            for s_id, (student_infos, error) in zip(pending, results):
+                if error is None:
+                    crawled[s_id] = student_infos
+                else:
+                    failures[s_id] = error
+            if not failures or attempt == 1 or not self._relogin():
+                break
+            pending = list(failures)
+        errors.update(failures)
+        return crawled
+
+    def _crawl(
+        self, s_id: str, windows: list[ReportWindow], journal: CrawlJournal | None
+    ) -> tuple[list[StudentInfo] | None, str | None]:
+        # Like crawling.crawl_student, but keeps the error for the job result.
+        try:
+            with tracing.span("student", s_id=s_id):
+                student_infos = get_student_infos(
+                    self.fetch_tables, s_id, self.cache, windows, self.archive
+                )
+        except Exception as e:
+            if journal is not None:
+                journal.record_failure(s_id, e)
+            return None, "".join(traceback.format_exception_only(e)).strip()
+        if journal is not None:
+            journal.record(s_id, student_infos)
+        return student_infos, None
+
+
+def _handler(service: ReportService) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, body: str):
+            data = body.encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path != "/health":
+                return self._send(404, '{"error": "not found"}')
+            status = {
+                "backend": service.backend,
+                "queued": service.jobs.qsize(),
+                "completed": service.completed,
+            }
+            self._send(200, json.dumps(status))
+
+        def do_POST(self):
+            if self.path != "/jobs":
+                return self._send(404, '{"error": "not found"}')
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                job = Job.model_validate_json(self.rfile.read(length))
+                parse_windows(job.windows or "")
+            except (ValidationError, ValueError) as e:
+                return self._send(400, json.dumps({"error": str(e)}))
+            try:
+                result = service.submit(job).result()
+            except Exception as e:
+                error = "".join(traceback.format_exception_only(e)).strip()
+                return self._send(500, json.dumps({"error": error}))
+            self._send(200, result.model_dump_json())
+
+    return Handler
+
+
+if __name__ == "__main__":
+    # python service.py [--port 8766]
+    # curl -d '{"students": ["s_id"]}' http://127.0.0.1:8766/jobs
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default=SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    args = parser.parse_args()
+
+    reports_dir = Path.cwd() / "reports"
+    reports_dir.mkdir(exist_ok=True)
+    service = ReportService(reports_dir)
+    if service.cohorts:
+        print(
+            "COHORT_STATS=1: comments are only reused while no student of the "
+            "same level and grade changed"
+        )
+    service.start()
+    server = ThreadingHTTPServer((args.host, args.port), _handler(service))
+    server.daemon_threads = True
+    print(f"Listening on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+    service.stop()
+    tracing.finish()
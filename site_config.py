@@ -0,0 +1,27 @@
+import os
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SITE_URL = "https://www.englishplatform.co.kr"
+# Point this at emulator.py to crawl a local stand-in instead of the site.
+BASE_URL = os.getenv("READANDTALK_BASE_URL", SITE_URL).rstrip("/")
+BASE_HOST = urlsplit(BASE_URL).netloc
+
+
+def default_cache_dir() -> Path:
+    # Every other site (the emulator, a staging copy) gets its own directory
+    # under .cache, so its months, journal, archive and session never mix
+    # with the real site's.
+    directory = os.getenv("READANDTALK_CACHE_DIR")
+    if directory:
+        return Path(directory)
+    if BASE_HOST == urlsplit(SITE_URL).netloc:
+        return Path(".cache")
+    return Path(".cache") / BASE_HOST.replace(":", "_")
+
+
+CACHE_DIR = default_cache_dir()
@@ -0,0 +1,116 @@
+from pathlib import Path
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font, PatternFill
+
+from models import StudentInfo
+from report import SECTIONS, report_values, section_row
+from windows import window_labels
+
+# The report's own labels; 학습 기간 is the period the row covers.
+BASIC_HEADERS = [
+    "이름",
+    "학교",
+    "학년",
+    "학습 기간",
+    "예상 Lexile",
+    "수업차수",
+    "학습단계",
+]
+GR_COUNT = 5
+
+header_font = Font(bold=True, size=10)
+header_fill = PatternFill(fill_type="solid", start_color="D9D9D9", end_color="D9D9D9")
+header_alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
+PERCENT_FORMAT = "0%"
+
+
+def summary_headers(current: str = "당기", previous: str = "전기") -> list[str]:
+    # The report sections' headings, prefixed with the section, e.g.
+    # "Quiz 당분기(문제)" and "Quiz 당분기 정답률(%)".
+    headers = list(BASIC_HEADERS)
+    for title, headings, _, _ in SECTIONS:
+        section = title.split()[0]
+        amount = ""
+        for heading in headings:
+            heading = heading.format(current=current, previous=previous)
+            if heading.startswith("정답률"):
+                heading = f"{amount} {heading}"
+            else:
+                amount = heading.split("(")[0]
+            headers.append(f"{section} {heading}")
+    headers += [f"GR{i + 1} 정답률" for i in range(GR_COUNT)]
+    return headers
+
+
+def summary_row(student_info: StudentInfo) -> list:
+    # The numbers of the student's report, in summary_headers order.
+    values = report_values(student_info, "")
+    basic_info = student_info.basic_info
+    row = [
+        basic_info.name,
+        basic_info.school,
+        basic_info.grade,
+        values["B2"],
+        basic_info.lexile,
+        basic_info.count,
+        basic_info.level,
+    ]
+    for _, _, start_row, _ in SECTIONS:
+        row += section_row(values, start_row)
+    gr_list = student_info.GR_list[:GR_COUNT]
+    row += [gr.right / gr.total if gr.total else None for gr in gr_list]
+    row += [None] * (GR_COUNT - len(gr_list))
+    return row
+
+
+class RosterSummary:
+    # One row per student in a single workbook. openpyxl's write-only mode
+    # streams rows to a temporary file, so memory does not grow with the
+    # roster; rows can only be appended, and the file exists after close().
+    # Each report window gets its own sheet, named and headed by its labels
+    # (당분기/전분기, 금년/전년, ...).
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.wb = Workbook(write_only=True)
+        self.sheets = {}
+        columns = len(summary_headers())
+        self.gr_columns = range(columns - GR_COUNT, columns)
+        self.count = 0
+
+    def _sheet(self, labels: tuple[str, str]):
+        ws = self.sheets.get(labels)
+        if ws is None:
+            ws = self.wb.create_sheet(labels[0])
+            ws.freeze_panes = "B2"
+            ws.column_dimensions["A"].width = 13
+            ws.column_dimensions["D"].width = 26
+            ws.append([self._header(ws, header) for header in summary_headers(*labels)])
+            self.sheets[labels] = ws
+        return ws
+
+    def _header(self, ws, value: str) -> WriteOnlyCell:
+        cell = WriteOnlyCell(ws, value=value)
+        cell.font = header_font
+        cell.fill = header_fill
+        cell.alignment = header_alignment
+        return cell
+
+    def add(self, student_info: StudentInfo) -> None:
+        basic_info = student_info.basic_info
+        ws = self._sheet(window_labels(basic_info.time_start, basic_info.time_end))
+        row = summary_row(student_info)
+        for i in self.gr_columns:
+            cell = WriteOnlyCell(ws, value=row[i])
+            cell.number_format = PERCENT_FORMAT
+            row[i] = cell
+        ws.append(row)
+        self.count += 1
+
+    def close(self) -> None:
+        if not self.sheets:
+            # No student: still a valid workbook with the headers.
+            self._sheet(("당기", "전기"))
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.wb.save(self.path)
@@ -0,0 +1,97 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+from playwright.sync_api import sync_playwright
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from emulator import Emulator, EmulatorConfig
+from models import GR, BasicInfo, BookInfo, StudentInfo, StudyInfo
+
+# The crawler reads its URLs and cache directory from the environment on
+# import, so the emulator has to be up before any test module imports it.
+EMULATOR = Emulator(EmulatorConfig(students=40, page_size=15, branches=2, teachers=2))
+os.environ["READANDTALK_BASE_URL"] = EMULATOR.start()
+os.environ["READANDTALK_CACHE_DIR"] = tempfile.mkdtemp(prefix="readandtalk-")
+
+FIXTURES = ROOT / "benchmarks" / "fixtures"
+
+
+def pytest_unconfigure(config):
+    EMULATOR.stop()
+
+
+@pytest.fixture
+def emulator():
+    yield EMULATOR
+    EMULATOR.config.error_rate = 0.0
+    EMULATOR.expire_sessions()
+
+
+@pytest.fixture(scope="module")
+def browser():
+    # Tests that need a real Chromium are skipped where none is installed.
+    # Per module, since the sync API's loop blocks asyncio.run on this thread.
+    playwright = sync_playwright().start()
+    try:
+        browser = playwright.chromium.launch(headless=True)
+    except Exception as e:
+        playwright.stop()
+        pytest.skip(f"no Chromium: {str(e).splitlines()[0]}")
+    yield browser
+    browser.close()
+    playwright.stop()
+
+
+@pytest.fixture
+def fixture_html():
+    def read(name: str) -> str:
+        return (FIXTURES / name).read_text(encoding="utf-8")
+
+    return read
+
+
+def sample_student(**basic_info) -> StudentInfo:
+    def study(count: int, rate: int) -> list[StudyInfo]:
+        return [
+            StudyInfo(
+                curr_count=count, curr_rate=rate, total_count=count * 8, total_rate=rate
+            ),
+            StudyInfo(
+                curr_count=count // 2, curr_rate=rate - 5, total_count=0, total_rate=0
+            ),
+        ]
+
+    fields = dict(
+        time_end="202609",
+        time_start="202607",
+        lexile=850,
+        name="홍길동",
+        school="서울초",
+        grade=5,
+        count=42,
+        level="RG 3",
+    )
+    fields.update(basic_info)
+    return StudentInfo(
+        basic_info=BasicInfo(**fields),
+        book_info=[
+            BookInfo(intensive=12, extensive=30, classics=2, curr_month=9, total=1234),
+            BookInfo(intensive=1, extensive=2, classics=3, curr_month=7, total=0),
+        ],
+        word_info=study(1500, 88),
+        puzzle_info=study(300, 70),
+        dictation_info=study(250, 91),
+        writing_info=study(100, 66),
+        quiz_info=study(40, 92),
+        GR_list=[GR(GR_num=f"GR{i}", right=i, total=10) for i in range(1, 6)],
+    )
+
+
+@pytest.fixture
+def make_student():
+    return sample_student
@@ -0,0 +1,59 @@
+import copy
+import sqlite3
+
+from archive import SCHEMA, MonthArchive
+from crawling import get_student_infos, report_month, tables_from_html
+from windows import QUARTERLY
+
+
+def fetcher(tables, broken: set[str]):
+    # The saved report page for every month; the months in `broken` lack
+    # the book total, the grade and a GR score.
+    def fetch_tables(url):
+        month_tables = copy.deepcopy(tables)
+        if any(f"mb_date1={month}" in url for month in broken):
+            month_tables[3][1][5] = ""
+            month_tables[2][0][5] = "-"
+            month_tables[15][1][1] = ""
+        return month_tables
+
+    return fetch_tables
+
+
+def test_archive_only_fields_are_parsed_best_effort(tmp_path, fixture_html):
+    tables = tables_from_html(fixture_html("report_mini.php.html"))
+    current = QUARTERLY.current(report_month())
+    # Inside the window: the report reads neither of the broken fields.
+    middle = current[1]
+
+    archive = MonthArchive(tmp_path / "archive.sqlite3")
+    broken = get_student_infos(
+        fetcher(tables, {middle}), "s1", windows=[QUARTERLY], archive=archive
+    )
+    intact = get_student_infos(fetcher(tables, set()), "s2", windows=[QUARTERLY])
+    assert broken == intact
+
+    months = {entry.month: entry for entry in archive.history("s1")}
+    assert (months[middle].totals, months[middle].basic_info) == (False, None)
+    assert months[middle].GR_list == []
+    assert months[middle].book_info.curr_month == 9
+    assert months[current[0]].totals
+    assert archive.series("total")["s1"][middle] is None
+    assert archive.series("total")["s1"][current[0]] == 1234
+
+
+def test_archive_from_before_nullable_totals_is_migrated(tmp_path):
+    path = tmp_path / "archive.sqlite3"
+    connection = sqlite3.connect(path)
+    connection.executescript(SCHEMA.replace("INTEGER,", "INTEGER NOT NULL,"))
+    columns = len(connection.execute("PRAGMA table_info(months)").fetchall())
+    connection.execute(
+        f"INSERT INTO months VALUES ('s1', '202601', 1{', 0' * (columns - 3)})"
+    )
+    connection.commit()
+    connection.close()
+
+    archive = MonthArchive(path)
+    assert [entry.month for entry in archive.history("s1")] == ["202601"]
+    nullable = archive.connection.execute("PRAGMA table_info(months)").fetchall()
+    assert not any(name == "total" and notnull for _, name, _, notnull, *_ in nullable)
@@ -0,0 +1,101 @@
+import random
+
+import numpy as np
+import pytest
+
+from cohort import COHORT_METRICS, attach_cohorts, cohort_key, cohort_matrix
+from models import GR, BasicInfo, BookInfo, StudentInfo, StudyInfo
+
+
+def student(rng: random.Random, i: int) -> StudentInfo:
+    def study() -> list[StudyInfo]:
+        count = rng.choice([0, 5, 10, 10, 20])
+        current = StudyInfo(
+            curr_count=count,
+            curr_rate=rng.randint(50, 100),
+            total_count=count * 4,
+            total_rate=rng.randint(50, 100),
+        )
+        return [current, current]
+
+    book_info = BookInfo(intensive=1, extensive=2, classics=0, curr_month=3, total=9)
+    return StudentInfo(
+        basic_info=BasicInfo(
+            time_end="202609",
+            time_start="202607",
+            lexile=500,
+            name=f"s{i}",
+            school="",
+            grade=rng.randint(1, 2),
+            count=1,
+            level=f"RG {rng.randint(1, 3)}",
+        ),
+        book_info=[book_info, book_info],
+        word_info=study(),
+        puzzle_info=study(),
+        dictation_info=study(),
+        writing_info=study(),
+        quiz_info=study(),
+        GR_list=[
+            GR(GR_num=f"GR{k + 1}", right=rng.randint(0, 5), total=rng.choice([0, 5]))
+            for k in range(5)
+        ],
+    )
+
+
+def brute_force(target: StudentInfo, population: list[StudentInfo]) -> dict:
+    peers = [s for s in population if cohort_key(s) == cohort_key(target)]
+    matrix = cohort_matrix(peers)
+    value = cohort_matrix([target])[0]
+    expected = {}
+    for m, metric in enumerate(COHORT_METRICS):
+        column = matrix[:, m][~np.isnan(matrix[:, m])]
+        if not len(column):
+            expected[metric] = (None, None, None)
+            continue
+        percentile = None
+        if not np.isnan(value[m]):
+            rank = (column < value[m]).sum() + (column == value[m]).sum() / 2
+            percentile = round(rank / len(column) * 100)
+        expected[metric] = (
+            round(float(column.mean()), 1),
+            round(float(np.median(column)), 1),
+            percentile,
+        )
+    return expected
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_attach_cohorts_matches_brute_force(seed):
+    rng = random.Random(seed)
+    population = [student(rng, i) for i in range(200)]
+    students = population[:40] + [student(rng, 200)]
+
+    attached = attach_cohorts(students, population)
+
+    assert [s.basic_info.name for s in attached] == [
+        s.basic_info.name for s in students
+    ]
+    for student_info, target in zip(attached, students):
+        cohort = student_info.cohort
+        peers = [s for s in population if cohort_key(s) == cohort_key(target)]
+        assert (cohort.level, cohort.grade, cohort.size) == (
+            target.basic_info.level,
+            target.basic_info.grade,
+            len(peers),
+        )
+        expected = brute_force(target, population)
+        for metric, (mean, median, percentile) in expected.items():
+            actual = cohort.metrics[metric]
+            # Summed in another order, an x.x5 mean may round either way.
+            assert actual.mean == pytest.approx(mean, abs=0.1), metric
+            assert actual.median == pytest.approx(median, abs=0.1), metric
+            assert actual.percentile == percentile, metric
+
+
+def test_attach_cohorts_defaults_to_the_students_themselves():
+    rng = random.Random(3)
+    students = [student(rng, i) for i in range(30)]
+
+    assert attach_cohorts(students) == attach_cohorts(students, students)
+    assert attach_cohorts([]) == []
@@ -0,0 +1,71 @@
+import os
+import time
+from types import SimpleNamespace
+
+from comment_cache import CommentCache
+from comments import CommentGenerator
+
+
+def test_key_covers_model_config_and_prompt():
+    key = CommentCache.key("model", "{}", "prompt")
+
+    assert key == CommentCache.key("model", "{}", "prompt")
+    assert key != CommentCache.key("other", "{}", "prompt")
+    assert key != CommentCache.key("model", '{"temperature": 1}', "prompt")
+    assert key != CommentCache.key("model", "{}", "prompt ")
+
+
+def test_refresh_misses_but_still_stores(tmp_path):
+    key = CommentCache.key("model", "{}", "prompt")
+    CommentCache(tmp_path, refresh=True).put(key, "코멘트")
+
+    assert CommentCache(tmp_path, refresh=True).get(key) is None
+    assert CommentCache(tmp_path).get(key) == "코멘트"
+
+
+def test_evict_drops_old_and_least_recently_used(tmp_path):
+    cache = CommentCache(tmp_path)
+    keys = [CommentCache.key("model", "{}", str(i)) for i in range(4)]
+    now = time.time()
+    for age, key in enumerate(keys):
+        cache.put(key, key)
+        os.utime(cache._path(key), (now - age * 60, now - age * 60))
+    old = CommentCache.key("model", "{}", "old")
+    cache.put(old, old)
+    os.utime(cache._path(old), (now - 100 * 86400, now - 100 * 86400))
+    # A hit makes the oldest recent entry the most recently used.
+    assert cache.get(keys[3]) == keys[3]
+
+    assert cache.evict(max_age_days=90, max_entries=3) == 2
+    assert cache.get(old) is None
+    assert cache.get(keys[2]) is None
+    assert [cache.get(key) for key in (keys[0], keys[1], keys[3])] == [
+        keys[0],
+        keys[1],
+        keys[3],
+    ]
+
+
+def test_generator_reuses_comments_until_the_student_changes(tmp_path, make_student):
+    calls = []
+
+    async def generate_content(model, contents, config):
+        calls.append(contents)
+        return SimpleNamespace(text=f"comment {len(calls)}", usage_metadata=None)
+
+    client = SimpleNamespace(
+        aio=SimpleNamespace(models=SimpleNamespace(generate_content=generate_content))
+    )
+    generator = CommentGenerator(
+        client, context_cache=False, comment_cache=CommentCache(tmp_path)
+    )
+    try:
+        first = generator.generate(make_student())
+        again = generator.generate(make_student())
+        changed = generator.generate(make_student(lexile=900))
+    finally:
+        generator.close()
+
+    assert (first, again, changed) == ("comment 1", "comment 1", "comment 2")
+    assert len(calls) == 2
+    assert generator.cache_hits == 1
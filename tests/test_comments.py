@@ -0,0 +1,54 @@
+from types import SimpleNamespace
+
+from comments import GEMINI_CACHE_MIN_TOKENS, CommentGenerator
+
+
+class FakeClient:
+    # Just enough of genai.Client.aio for CommentGenerator.
+    def __init__(self, prompt_tokens: int):
+        self.prompt_tokens = prompt_tokens
+        self.created = []
+        self.configs = []
+        self.aio = SimpleNamespace(
+            models=SimpleNamespace(
+                count_tokens=self.count_tokens, generate_content=self.generate_content
+            ),
+            caches=SimpleNamespace(create=self.create),
+        )
+        self.caches = SimpleNamespace(delete=lambda name: None)
+
+    async def count_tokens(self, model, contents):
+        return SimpleNamespace(total_tokens=self.prompt_tokens)
+
+    async def create(self, model, config):
+        self.created.append(config)
+        return SimpleNamespace(name="cachedContents/1")
+
+    async def generate_content(self, model, contents, config):
+        self.configs.append(config)
+        return SimpleNamespace(text="코멘트", usage_metadata=None)
+
+
+def generate(client, student_info):
+    generator = CommentGenerator(client, context_cache=True)
+    generator.comment_cache = None
+    try:
+        return generator.generate(student_info)
+    finally:
+        generator.close()
+
+
+def test_short_static_prompt_skips_the_context_cache(make_student):
+    client = FakeClient(prompt_tokens=1500)
+
+    assert generate(client, make_student()) == "코멘트"
+    assert client.created == []
+    assert client.configs[0].cached_content is None
+
+
+def test_long_static_prompt_is_cached(make_student):
+    client = FakeClient(prompt_tokens=GEMINI_CACHE_MIN_TOKENS)
+
+    generate(client, make_student())
+    assert len(client.created) == 1
+    assert client.configs[0].cached_content == "cachedContents/1"
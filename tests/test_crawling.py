@@ -0,0 +1,63 @@
+import crawling
+from crawling import (
+    crawl_concurrently,
+    parse_basic_info,
+    parse_book_info,
+    parse_gr_info,
+    parse_quiz_info,
+    parse_word_info,
+    tables_from_html,
+)
+from journal import CrawlJournal
+from models import GR
+
+
+def test_tables_from_saved_report_page(fixture_html):
+    tables = tables_from_html(fixture_html("report_mini.php.html"))
+
+    assert len(tables) == 16
+    assert tables[1][0] == ["리포트 기간", "202609"]
+    assert tables[2][1] == ["수업차수", "42", "학습단계", "RG 3"]
+    assert tables[13][1][:2] == ["1,234개", "87%"]
+
+
+def test_parse_saved_report_page(fixture_html):
+    tables = tables_from_html(fixture_html("report_mini.php.html"))
+
+    basic_info = parse_basic_info(tables)
+    assert (basic_info.time_end, basic_info.name, basic_info.level) == (
+        "202609",
+        "홍길동",
+        "RG 3",
+    )
+    assert (basic_info.lexile, basic_info.grade, basic_info.count) == (850, 5, 42)
+
+    book_info = parse_book_info(tables, current=True)
+    assert (book_info.intensive, book_info.curr_month, book_info.total) == (12, 9, 1234)
+
+    quiz_info = parse_quiz_info(tables, current=True)
+    assert (quiz_info.curr_count, quiz_info.curr_rate) == (1234, 87)
+    assert (quiz_info.total_count, quiz_info.total_rate) == (15400, 90)
+    assert parse_word_info(tables).curr_count == 1234
+
+    assert parse_gr_info(tables)[:2] == [
+        GR(GR_num="GR1", right=12, total=15),
+        GR(GR_num="GR2", right=8, total=10),
+    ]
+
+
+def test_students_left_by_failed_browsers_are_reported(monkeypatch, tmp_path):
+    def no_browser():
+        raise RuntimeError("Chromium failed to launch")
+
+    monkeypatch.setattr(crawling, "sync_playwright", no_browser)
+    journal = CrawlJournal("test", tmp_path)
+
+    crawled = list(
+        crawl_concurrently(["s1", "s2", "s3"], {}, workers=2, journal=journal)
+    )
+
+    assert sorted(crawled) == [("s1", None), ("s2", None), ("s3", None)]
+    failures = journal.failures()
+    assert sorted(failures) == ["s1", "s2", "s3"]
+    assert "Chromium failed to launch" in failures["s1"].error
@@ -0,0 +1,67 @@
+from crawling import REPORT_URL_TEMPLATE, parse_basic_info
+from emulator import student_name
+from http_fetch import HttpSession
+
+
+def test_login_and_fetch_tables(emulator):
+    session = HttpSession()
+    session.login()
+    assert session.is_logged_in()
+
+    s_id = emulator.student_ids[0]
+    tables = session.fetch_tables(REPORT_URL_TEMPLATE.format(date="202609", s_id=s_id))
+    basic_info = parse_basic_info(tables)
+    assert basic_info.name == student_name(emulator.config.seed, s_id)
+    assert basic_info.time_end == "202609"
+
+
+def test_login_reuses_saved_session(emulator):
+    HttpSession().login()
+    sessions = len(emulator.sessions)
+
+    session = HttpSession()
+    session.login()
+    assert session.is_logged_in()
+    assert len(emulator.sessions) == sessions
+
+
+def test_expired_session_logs_in_again(emulator):
+    HttpSession().login()
+    emulator.expire_sessions()
+
+    session = HttpSession()
+    session.login()
+    assert session.is_logged_in()
+
+
+def test_storage_state_cookies_filtered_by_domain():
+    session = HttpSession("http://127.0.0.1:8765/elp_login.php")
+    session.load_storage_state(
+        {
+            "cookies": [
+                {
+                    "name": "PHPSESSID",
+                    "value": "site",
+                    "domain": ".englishplatform.co.kr",
+                },
+                {"name": "local", "value": "1", "domain": "127.0.0.1"},
+            ]
+        }
+    )
+    assert {name: morsel.value for name, morsel in session.cookies.items()} == {
+        "local": "1"
+    }
+
+    session = HttpSession("https://www.englishplatform.co.kr/elp_login.php")
+    session.load_storage_state(
+        {
+            "cookies": [
+                {
+                    "name": "PHPSESSID",
+                    "value": "site",
+                    "domain": ".englishplatform.co.kr",
+                }
+            ]
+        }
+    )
+    assert session.cookies["PHPSESSID"].value == "site"
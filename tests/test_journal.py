@@ -0,0 +1,49 @@
+import crawling
+from crawling import iter_readandtalk
+from journal import CrawlJournal
+from selection import CrawlSelection
+from windows import parse_windows
+
+
+def crawl(journal, tmp_path):
+    selection = CrawlSelection("test", path=tmp_path / "snapshot.json")
+    return list(
+        iter_readandtalk(
+            backend="http",
+            journal=journal,
+            windows=parse_windows("monthly"),
+            selection=selection,
+        )
+    )
+
+
+def test_resumed_crawl_redoes_only_failed_students(emulator, monkeypatch, tmp_path):
+    get_student_infos = crawling.get_student_infos
+    calls = []
+    failing = {"student0001", "student0002"}
+
+    def flaky(fetch_tables, s_id, *args):
+        calls.append(s_id)
+        if s_id in failing:
+            raise RuntimeError("page timed out")
+        return get_student_infos(fetch_tables, s_id, *args)
+
+    monkeypatch.setattr(crawling, "get_student_infos", flaky)
+    journal = CrawlJournal("test", tmp_path)
+
+    first = crawl(journal, tmp_path)
+    first_calls = list(calls)
+    assert sorted(journal.failures()) == sorted(failing)
+    assert len(first) == len(first_calls) - len(failing)
+
+    # A crash mid-write leaves a cut-off line, which the next run skips.
+    with open(journal.path, "a", encoding="utf-8") as f:
+        f.write('{"s_id": "student0001", "student_in')
+    failing.clear()
+    calls.clear()
+    journal = CrawlJournal("test", tmp_path)
+    second = crawl(journal, tmp_path)
+
+    assert sorted(calls) == ["student0001", "student0002"]
+    assert len(second) == len(first_calls)
+    assert sorted(journal.completed()) == sorted(first_calls)
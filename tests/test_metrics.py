@@ -0,0 +1,48 @@
+import numpy as np
+
+from metrics import INDEX, MetricsStore, month_row
+from models import BookInfo, StudyInfo
+
+
+def row(books: int, quiz: tuple[int, int], total: int = 0) -> np.ndarray:
+    return month_row(
+        BookInfo(intensive=0, extensive=0, classics=0, curr_month=books, total=total),
+        {
+            "quiz": StudyInfo(
+                curr_count=quiz[0], curr_rate=quiz[1], total_count=total, total_rate=90
+            )
+        },
+    )
+
+
+def store() -> MetricsStore:
+    months = ["202607", "202608", "202609"]
+    store = MetricsStore(["s1", "s2"], months)
+    store.set("s1", "202607", row(2, (10, 80), total=90))
+    store.set("s1", "202608", row(3, (30, 60), total=95))
+    store.set("s1", "202609", row(1, (0, 0), total=100))
+    return store
+
+
+def test_window_sums_months_and_keeps_the_last_snapshot():
+    sums = store().window(["202607", "202608", "202609"])
+
+    assert sums.shape == (2, len(INDEX))
+    assert sums[0, INDEX["curr_month"]] == 6
+    assert sums[0, INDEX["quiz_curr_count"]] == 40
+    # Running totals are the last month's, not a sum.
+    assert sums[0, INDEX["total"]] == 100
+    assert sums[0, INDEX["quiz_total_count"]] == 100
+    assert not sums[1].any()
+
+
+def test_windowed_rates_are_weighted_by_count():
+    s1, s2 = store().windowed([["202607", "202608", "202609"], ["202609"]])
+
+    quarter, month = s1["quiz_info"]
+    # (10 * 80 + 30 * 60) // 40, not the mean of 80, 60 and 0.
+    assert (quarter.curr_count, quarter.curr_rate) == (40, 65)
+    assert (quarter.total_count, quarter.total_rate) == (100, 90)
+    assert (month.curr_count, month.curr_rate) == (0, 0)
+    assert [book.curr_month for book in s1["book_info"]] == [6, 1]
+    assert [info.curr_count for info in s2["word_info"]] == [0, 0]
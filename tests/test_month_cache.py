@@ -0,0 +1,62 @@
+from crawling import fetch_month
+from month_cache import MonthCache
+
+
+def counting_fetcher(urls):
+    def fetch_tables(url):
+        urls.append(url)
+        return [[["page", str(len(urls))]]]
+
+    return fetch_tables
+
+
+def test_closed_months_are_fetched_once(tmp_path):
+    cache = MonthCache(tmp_path)
+    urls = []
+    fetch_tables = counting_fetcher(urls)
+
+    first = fetch_month(fetch_tables, "s/1", "202607", cache, closed=True)
+    again = fetch_month(fetch_tables, "s/1", "202607", cache, closed=True)
+
+    assert first == again == [[["page", "1"]]]
+    assert len(urls) == 1
+    assert MonthCache(tmp_path).get("s/1", "202607") == first
+
+
+def test_open_month_is_always_refetched_and_never_cached(tmp_path):
+    cache = MonthCache(tmp_path)
+    urls = []
+    fetch_tables = counting_fetcher(urls)
+
+    fetch_month(fetch_tables, "s1", "202609", cache, closed=False)
+    fetch_month(fetch_tables, "s1", "202609", cache, closed=False)
+
+    assert len(urls) == 2
+    assert cache.get("s1", "202609") is None
+
+
+def test_invalidate(tmp_path):
+    cache = MonthCache(tmp_path)
+    for s_id in ("s1", "s2"):
+        for month in ("202607", "202608"):
+            cache.put(s_id, month, [[[s_id, month]]])
+
+    cache.invalidate("s1", "202607")
+    assert cache.get("s1", "202607") is None
+    assert cache.get("s1", "202608") is not None
+
+    cache.invalidate(month="202608")
+    assert cache.get("s1", "202608") is None
+    assert cache.get("s2", "202608") is None
+    assert cache.get("s2", "202607") is not None
+
+    cache.invalidate("s2")
+    assert cache.get("s2", "202607") is None
+
+
+def test_unreadable_entry_is_a_miss(tmp_path):
+    cache = MonthCache(tmp_path)
+    cache.put("s1", "202607", [[["a"]]])
+    cache._path("s1", "202607").write_text("{", encoding="utf-8")
+
+    assert cache.get("s1", "202607") is None
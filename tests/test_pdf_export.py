@@ -0,0 +1,60 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from crawling import crawl_period
+from journal import CrawlJournal
+from pdf_export import export_pdfs, print_pdfs
+from service import Job, ReportService
+from windows import parse_windows
+
+
+def page_count(path) -> int:
+    return len(re.findall(rb"/Type\s*/Page\b", path.read_bytes()))
+
+
+def test_print_pdfs_writes_one_page_per_report(browser, tmp_path, make_student):
+    comment = "책을 꾸준히 읽었습니다. " * 40
+    reports = [
+        (make_student(), comment, tmp_path / "a.pdf"),
+        (make_student(name="김철수"), comment, tmp_path / "b.pdf"),
+    ]
+    results = print_pdfs(browser, reports)
+
+    assert [result.error for result in results] == [None, None]
+    for _, _, path in reports:
+        assert path.read_bytes().startswith(b"%PDF")
+        assert page_count(path) == 1
+
+
+def test_export_pdfs_launches_its_own_browser(browser, tmp_path, make_student):
+    # Its own thread: asyncio.run can't start under the fixture's sync API loop.
+    path = tmp_path / "a.pdf"
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(
+            export_pdfs, [(make_student(), "comment", path)], pages=2
+        )
+    [result] = future.result()
+
+    assert result.error is None
+    assert result.path == path
+    assert page_count(path) == 1
+
+
+def test_service_prints_with_its_browser(browser, tmp_path, make_student):
+    windows = "monthly"
+    journal = CrawlJournal(crawl_period(parse_windows(windows)))
+    journal.reset()
+    journal.record("s1", [make_student()])
+
+    service = ReportService(tmp_path, backend="browser", client=object())
+    service.comment_generator.close()
+    service.comment_generator.generate_all = lambda infos: (["comment"], [])
+    service.browser = browser
+    result = service.process(
+        Job(students=["s1"], windows=windows, render_only=True, pdf=True)
+    )
+
+    [report] = result.reports
+    assert report.pdf_error is None
+    assert report.pdf == report.path.with_suffix(".pdf")
+    assert page_count(report.pdf) == 1
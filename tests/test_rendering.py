@@ -0,0 +1,21 @@
+from rendering import render_reports
+
+
+def test_identical_reports_of_namesakes_get_their_own_files(tmp_path, make_student):
+    reports = [(make_student(), "comment"), (make_student(), "comment")]
+    reports.append((make_student(lexile=400), "comment"))
+
+    results = render_reports(reports, tmp_path, workers=1)
+
+    paths = [result.path for result in results]
+    assert all(result.error is None for result in results)
+    assert len(set(paths)) == 3
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted(
+        path.name for path in paths
+    )
+
+
+def test_unique_name_keeps_the_plain_filename(tmp_path, make_student):
+    (result,) = render_reports([(make_student(), "comment")], tmp_path, workers=1)
+
+    assert result.path.name == "2607_2609_홍길동_통신문.xlsx"
@@ -0,0 +1,53 @@
+import io
+import xml.etree.ElementTree as ET
+import zipfile
+
+from report import ReportTemplate, build_report, report_values
+
+SHEET = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+
+
+def parts(wb) -> dict[str, bytes]:
+    # Everything under xl/: sheet, styles, shared strings, drawing and charts.
+    # docProps only holds the save time.
+    data = io.BytesIO()
+    wb.save(data)
+    with zipfile.ZipFile(data) as archive:
+        return {
+            name: archive.read(name)
+            for name in archive.namelist()
+            if name.startswith("xl/")
+        }
+
+
+def normalized_sheet(xml: bytes) -> bytes:
+    # Merged ranges are written in set order, which differs between runs.
+    root = ET.fromstring(xml)
+    merges = root.find(f"{SHEET}mergeCells")
+    merges[:] = sorted(merges, key=lambda merge: merge.get("ref"))
+    return ET.tostring(root)
+
+
+def test_template_renders_the_same_workbook_as_build_report(make_student):
+    values = report_values(make_student(), "책을 꾸준히 읽었습니다.")
+
+    built = parts(build_report(values))
+    rendered = parts(ReportTemplate().render(values))
+
+    assert sorted(rendered) == sorted(built)
+    assert any(name.startswith("xl/charts/chart") for name in built)
+    sheet = "xl/worksheets/sheet1.xml"
+    assert normalized_sheet(rendered.pop(sheet)) == normalized_sheet(built.pop(sheet))
+    for name in built:
+        assert rendered[name] == built[name], name
+
+
+def test_template_is_reusable_across_students(make_student):
+    template = ReportTemplate()
+    for student_info in (make_student(), make_student(name="김철수", lexile=900)):
+        values = report_values(student_info, "코멘트")
+        rendered = template.render(values)
+        built = build_report(values)
+        assert [
+            [cell.value for cell in row] for row in rendered.active.iter_rows()
+        ] == [[cell.value for cell in row] for row in built.active.iter_rows()]
@@ -0,0 +1,49 @@
+import pytest
+
+from crawling import REPORT_URL_TEMPLATE, login, page_fetcher
+from request_filter import RequestFilter
+from site_config import BASE_HOST
+
+
+@pytest.fixture
+def report_page(browser, emulator, monkeypatch):
+    # The emulator takes any account.
+    monkeypatch.setenv("READANDTALK_ID", "teacher")
+    monkeypatch.setenv("READANDTALK_PW", "secret")
+
+    def fetch(request_filter: RequestFilter) -> list:
+        context = browser.new_context()
+        request_filter.install(context)
+        page = context.new_page()
+        try:
+            login(page)
+            fetch_tables = page_fetcher(page, request_filter)
+            url = REPORT_URL_TEMPLATE.format(date="202609", s_id="student0001")
+            tables = fetch_tables(url)
+            body = page.request.get(url).body()
+        finally:
+            context.close()
+        return tables, body
+
+    return fetch
+
+
+def test_counts_body_bytes_received(report_page):
+    request_filter = RequestFilter(BASE_HOST.split(":")[0], block=False)
+    tables, body = report_page(request_filter)
+
+    assert tables
+    assert request_filter.bytes_by_type["document"] >= len(body)
+    assert request_filter.bytes_received >= request_filter.bytes_by_type["document"]
+    assert "blocked KiB unknown" not in request_filter.summary()
+
+
+def test_blocks_assets_and_third_party_requests(report_page):
+    request_filter = RequestFilter(BASE_HOST.split(":")[0])
+    tables, _ = report_page(request_filter)
+
+    assert tables
+    assert request_filter.blocked["image"] >= 1
+    assert request_filter.blocked["script"] >= 1
+    assert request_filter.bytes_by_type["image"] == 0
+    assert "blocked KiB unknown" in request_filter.summary()
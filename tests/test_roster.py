@@ -0,0 +1,69 @@
+import pytest
+
+import roster
+from http_fetch import HttpSession
+from roster import enumerate_roster, parse_roster_page, roster_url
+
+PAGE = """
+<select name="branid"><option value="">전체</option><option value="b0">A</option></select>
+<select name="teaid"><option value="t1">Kim</option></select>
+<table><tbody>
+<tr><td headers="mb_list_chk"><input type="checkbox"></td>
+<td headers="mb_list_id"> s1 </td><td headers="mb_list_name">홍 길동</td></tr>
+<tr><td headers="mb_list_lastcall">2026-09-01 10:00:00</td></tr>
+<tr><td headers="mb_list_id">s2</td></tr>
+</tbody></table>
+<a href="?page=2">2</a><a href="?page=7">마지막</a>
+"""
+
+
+def test_parse_roster_page():
+    page = parse_roster_page(PAGE)
+
+    assert [row.s_id for row in page.rows] == ["s1", "s2"]
+    assert page.rows[0].name == "홍 길동"
+    # The second <tr> of a member belongs to the row above it.
+    assert page.rows[0].columns["mb_list_lastcall"] == "2026-09-01 10:00:00"
+    assert page.last_page == 7
+    assert page.filters == {"branid": ["b0"], "teaid": ["t1"]}
+
+
+def test_parse_saved_member_list(fixture_html):
+    page = parse_roster_page(fixture_html("member_list.php.html"))
+
+    assert [row.s_id for row in page.rows] == [
+        "student0001",
+        "student0002",
+        "student0003",
+    ]
+    assert page.rows[0].columns["mb_list_tel"] == "010-0000-0001"
+
+
+def test_enumerate_roster(emulator):
+    session = HttpSession()
+    session.login()
+    rows = enumerate_roster(session.get, workers=4)
+
+    assert sorted(row.s_id for row in rows) == emulator.student_ids
+    first = next(row for row in rows if row.s_id == emulator.student_ids[0])
+    assert (first.branch, first.teacher) == ("b0", "t0")
+
+
+def test_enumerate_roster_retries_failed_pages(monkeypatch):
+    monkeypatch.setattr(roster.time, "sleep", lambda seconds: None)
+    single_page = PAGE.replace("?page=", "?p=")
+    failures = {}
+
+    def get(url: str) -> str:
+        if failures.get(url):
+            failures[url] -= 1
+            raise RuntimeError(f"GET {url} returned 500")
+        return single_page
+
+    failures[roster_url()] = 2
+    rows = enumerate_roster(get, workers=1, filters=False, retries=2)
+    assert [row.s_id for row in rows] == ["s1", "s2"]
+
+    failures[roster_url()] = 3
+    with pytest.raises(RuntimeError):
+        enumerate_roster(get, workers=1, filters=False, retries=2)
@@ -0,0 +1,92 @@
+from crawling import iter_readandtalk
+from journal import CrawlJournal
+from roster import RosterRow
+from selection import CrawlSelection
+from windows import parse_windows
+
+
+def row(s_id: str, last_activity: str = "2026-09-01 10:00:00") -> RosterRow:
+    return RosterRow(
+        s_id=s_id,
+        last_activity=last_activity,
+        columns={
+            "mb_list_chk": "",
+            "mb_list_id": s_id,
+            "mb_list_lastcall": last_activity,
+        },
+    )
+
+
+def crawled_once(path, make_student, rows) -> None:
+    selection = CrawlSelection("202609_quarterly", changed_only=True, path=path)
+    for roster_row in selection.select(rows):
+        selection.record(roster_row.s_id, [make_student()])
+    selection.save()
+
+
+def test_changed_only_skips_unchanged_rows(tmp_path, make_student):
+    path = tmp_path / "snapshot.json"
+    crawled_once(path, make_student, [row("s1"), row("s2"), row("s3", "")])
+
+    selection = CrawlSelection("202609_quarterly", changed_only=True, path=path)
+    selected = selection.select(
+        [row("s1"), row("s2", "2026-09-02 08:00:00"), row("s3", ""), row("s4")]
+    )
+
+    # s2 logged in since, s3 shows no activity to compare, s4 is new.
+    assert [r.s_id for r in selected] == ["s2", "s3", "s4"]
+    assert selection.skipped == {"unchanged": 1}
+    # s2's journal entry from the last crawl is out of date.
+    assert selection.stale("s2")
+    assert not selection.stale("s4")
+
+
+def test_changed_only_is_per_period(tmp_path, make_student):
+    path = tmp_path / "snapshot.json"
+    crawled_once(path, make_student, [row("s1")])
+
+    selection = CrawlSelection("202610_quarterly", changed_only=True, path=path)
+    assert [r.s_id for r in selection.select([row("s1")])] == ["s1"]
+
+
+def test_levels_use_the_snapshot_and_the_crawled_level(tmp_path, make_student):
+    path = tmp_path / "snapshot.json"
+    crawled_once(path, make_student, [row("s1")])
+
+    selection = CrawlSelection("202609_quarterly", levels=["rg3"], path=path)
+    assert [r.s_id for r in selection.select([row("s1"), row("s2")])] == ["s1", "s2"]
+    # s2 has no snapshot yet, so it is crawled and then kept by its level.
+    assert selection.keep(make_student(level="RG  3"))
+    assert not selection.keep(make_student(level="RG 4"))
+
+    selection = CrawlSelection("202609_quarterly", levels=["RG 4"], path=path)
+    assert [r.s_id for r in selection.select([row("s1")])] == []
+    assert selection.skipped == {"level": 1}
+
+
+def test_changed_only_crawl_refetches_touched_students(emulator, tmp_path):
+    journal = CrawlJournal("test", tmp_path)
+    windows = parse_windows("monthly")
+
+    def crawl():
+        selection = CrawlSelection(
+            "test", changed_only=True, path=tmp_path / "snapshot.json"
+        )
+        student_infos = list(
+            iter_readandtalk(
+                backend="http", journal=journal, windows=windows, selection=selection
+            )
+        )
+        return selection, student_infos
+
+    _, first = crawl()
+    assert len(first) == len(emulator.student_ids)
+
+    emulator.touch("student0007")
+    try:
+        selection, second = crawl()
+    finally:
+        emulator.activity.clear()
+
+    assert list(selection.rows) == ["student0007"]
+    assert len(second) == 1
@@ -0,0 +1,52 @@
+from comments import CommentError
+from crawling import crawl_period
+from journal import CrawlJournal
+from service import Job, ReportService
+from windows import parse_windows
+
+
+class FailingGenerator:
+    # Fails the comments at the given input positions.
+    def __init__(self, fail: set[int]):
+        self.fail = fail
+
+    def generate_all(self, student_infos):
+        comments, failures = [], []
+        for i, student_info in enumerate(student_infos):
+            if i in self.fail:
+                comments.append(None)
+                failures.append(
+                    CommentError(student_info.basic_info.name, RuntimeError("quota"))
+                )
+            else:
+                comments.append(f"comment {i}")
+        return comments, failures
+
+    def close(self):
+        pass
+
+
+def test_comment_failure_is_reported_for_its_own_student_info(tmp_path, make_student):
+    windows = "monthly,quarterly"
+    journal = CrawlJournal(crawl_period(parse_windows(windows)))
+    journal.reset()
+    # Two windows of one student, and another student of the same name.
+    journal.record(
+        "s1",
+        [make_student(time_start="202609"), make_student(time_start="202607")],
+    )
+    journal.record("s2", [make_student(lexile=400)])
+
+    service = ReportService(tmp_path, backend="http", client=object())
+    service.comment_generator.close()
+    service.comment_generator = FailingGenerator({0})
+    result = service.process(
+        Job(students=["s1", "s2"], windows=windows, render_only=True)
+    )
+
+    reports = sorted(
+        (report.s_id, report.path is not None, report.error is not None)
+        for report in result.reports
+    )
+    assert reports == [("s1", False, True), ("s1", True, False), ("s2", True, False)]
+    assert len({report.path for report in result.reports if report.path}) == 2
@@ -0,0 +1,47 @@
+from openpyxl import load_workbook
+
+from report import report_values, section_row
+from summary import RosterSummary
+
+
+def test_summary_has_a_sheet_per_window_with_report_headings(tmp_path, make_student):
+    path = tmp_path / "summary.xlsx"
+    summary = RosterSummary(path)
+    quarter = make_student()
+    summary.add(quarter)
+    summary.add(make_student(time_start="202609"))
+    summary.add(make_student(name="김철수"))
+    summary.close()
+
+    wb = load_workbook(path)
+    assert wb.sheetnames == ["당분기", "당월"]
+    header, *rows = wb["당분기"].iter_rows(values_only=True)
+    assert header[:7] == (
+        "이름",
+        "학교",
+        "학년",
+        "학습 기간",
+        "예상 Lexile",
+        "수업차수",
+        "학습단계",
+    )
+    assert "Quiz 당분기(문제)" in header
+    assert "Quiz 전분기 정답률(%)" in header
+    assert [row[0] for row in rows] == ["홍길동", "김철수"]
+    assert rows[0][3] == "2026년 07월 ~ 2026년 09월"
+
+    quiz = header.index("Quiz 당분기(문제)")
+    assert list(rows[0][quiz : quiz + 6]) == section_row(report_values(quarter, ""), 26)
+    assert rows[0][-5] == quarter.GR_list[0].right / quarter.GR_list[0].total
+
+    header, row = wb["당월"].iter_rows(values_only=True)
+    assert "Word 전월(개)" in header
+    assert row[3] == "2026년 09월 ~ 2026년 09월"
+
+
+def test_empty_summary_is_a_valid_workbook(tmp_path):
+    path = tmp_path / "summary.xlsx"
+    RosterSummary(path).close()
+
+    (header,) = load_workbook(path).active.iter_rows(values_only=True)
+    assert "Quiz 당기(문제)" in header
@@ -0,0 +1,37 @@
+import json
+
+import tracing
+from crawling import crawl_period
+from journal import CrawlJournal
+from service import Job, ReportService
+from windows import parse_windows
+
+
+def test_service_writes_and_forgets_each_jobs_spans(
+    emulator, monkeypatch, tmp_path, make_student
+):
+    monkeypatch.setattr(tracing, "ENABLED", True)
+    monkeypatch.setattr(tracing, "TRACE_PATH", str(tmp_path / "trace.json"))
+    windows = "monthly"
+    journal = CrawlJournal(crawl_period(parse_windows(windows)))
+    journal.reset()
+    journal.record("s1", [make_student()])
+
+    service = ReportService(tmp_path / "reports", backend="http", client=object())
+    service.comment_generator.close()
+    service.comment_generator.generate_all = lambda infos: (["comment"], [])
+    service.start()
+    try:
+        for _ in range(2):
+            job = Job(students=["s1"], windows=windows, render_only=True)
+            service.submit(job).result()
+    finally:
+        service.stop()
+        leftover = tracing.drain()
+
+    for i in (1, 2):
+        trace = json.loads((tmp_path / f"trace.job{i}.json").read_text("utf-8"))
+        names = [event["name"] for event in trace["traceEvents"]]
+        assert names.count("job") == 1
+        assert "render.build" in names
+    assert leftover == []
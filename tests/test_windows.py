@@ -0,0 +1,102 @@
+import copy
+from datetime import datetime
+
+import pytest
+
+from crawling import get_student_infos, report_month, tables_from_html
+from windows import parse_windows, window_labels
+
+
+def test_presets():
+    windows = parse_windows("monthly, quarterly,yearly")
+
+    assert [(window.name, window.length, window.end) for window in windows] == [
+        ("monthly", 1, None),
+        ("quarterly", 3, None),
+        ("yearly", 12, None),
+    ]
+
+
+def test_custom_range():
+    (window,) = parse_windows("202503-202508")
+
+    assert (window.length, window.end) == (6, "202508")
+    # A fixed range ignores the report month.
+    report_month = datetime(2026, 9, 1)
+    assert window.current(report_month) == [
+        "202508",
+        "202507",
+        "202506",
+        "202505",
+        "202504",
+        "202503",
+    ]
+    assert window.previous(report_month)[0] == "202502"
+    assert window.previous(report_month)[-1] == "202409"
+
+
+def test_single_month_and_year_boundary():
+    (window,) = parse_windows("202601")
+    assert (window.length, window.end) == (1, "202601")
+
+    (window,) = parse_windows("quarterly")
+    report_month = datetime(2026, 2, 1)
+    assert window.current(report_month) == ["202602", "202601", "202512"]
+    assert window.previous(report_month) == ["202511", "202510", "202509"]
+
+
+def test_empty_parts_are_skipped():
+    assert parse_windows("") == []
+    assert [window.name for window in parse_windows("monthly,,")] == ["monthly"]
+
+
+@pytest.mark.parametrize("spec", ["202508-202503", "2025-03", "weekly"])
+def test_invalid_windows(spec):
+    with pytest.raises(ValueError):
+        parse_windows(spec)
+
+
+def test_window_labels():
+    assert window_labels("202609", "202609") == ("당월", "전월")
+    assert window_labels("202607", "202609") == ("당분기", "전분기")
+    assert window_labels("202512", "202611") == ("금년", "전년")
+    assert window_labels("202605", "202609") == ("당기", "전기")
+
+
+def test_student_infos_are_summed_per_window(fixture_html):
+    tables = tables_from_html(fixture_html("report_mini.php.html"))
+    monthly, quarterly = parse_windows("monthly,quarterly")
+    current = quarterly.current(report_month())
+    previous = quarterly.previous(report_month())
+    # Month i of the six: i books, 10 * i quizzes at 50 + i %, total 1000 + i.
+    months = {month: i for i, month in enumerate(sorted(current + previous), 1)}
+    fetched = []
+
+    def fetch_tables(url):
+        month = url.split("mb_date1=")[1][:6]
+        fetched.append(month)
+        i = months[month]
+        page = copy.deepcopy(tables)
+        page[3][1][4] = f"당월 {i}권"
+        page[3][1][5] = f"총 {1000 + i}권"
+        page[13][1][:2] = [f"{10 * i}개", f"{50 + i}%"]
+        return page
+
+    month_info, quarter_info = get_student_infos(
+        fetch_tables, "s1", windows=[monthly, quarterly]
+    )
+
+    # Every month once, although the monthly window's months overlap.
+    assert sorted(fetched) == sorted(months)
+    assert [book.curr_month for book in quarter_info.book_info] == [15, 6]
+    # Running totals are only read for the current window.
+    assert [book.total for book in quarter_info.book_info] == [1006, 0]
+    quiz = quarter_info.quiz_info[0]
+    assert (quiz.curr_count, quiz.curr_rate) == (
+        150,
+        (40 * 54 + 50 * 55 + 60 * 56) // 150,
+    )
+    assert quarter_info.basic_info.time_start == current[-1]
+
+    assert [book.curr_month for book in month_info.book_info] == [6, 5]
+    assert month_info.basic_info.time_start == current[0]
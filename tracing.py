@@ -0,0 +1,155 @@
+import itertools
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Where to write the Chrome trace (open in https://ui.perfetto.dev); unset
+# disables tracing and span() costs one branch.
+TRACE_PATH = os.getenv("READANDTALK_TRACE")
+ENABLED = bool(TRACE_PATH)
+
+_events: list[dict] = []
+_local = threading.local()
+_async_ids = itertools.count(1)
+
+
+class _NoSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+class _Span:
+    # Spans nest per thread, and inner spans inherit the outer spans' tags,
+    # so a parse span inside a month span carries its s_id and month.
+    # Overlapping spans on one thread (coroutines) must be is_async.
+    def __init__(self, name: str, tags: dict, is_async: bool):
+        self.name = name
+        self.tags = tags
+        self.is_async = is_async
+
+    def __enter__(self):
+        if not self.is_async:
+            stack = getattr(_local, "stack", None)
+            if stack is None:
+                stack = _local.stack = []
+            if stack:
+                self.tags = {**stack[-1], **self.tags}
+            stack.append(self.tags)
+        self.wall = time.time_ns()
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        duration = time.perf_counter_ns() - self.start
+        if not self.is_async:
+            _local.stack.pop()
+        _events.append(
+            {
+                "name": self.name,
+                # Wall clock, so spans from render worker processes line up.
+                "ts": self.wall / 1000,
+                "dur": duration / 1000,
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": self.tags,
+                "async": self.is_async,
+            }
+        )
+        return False
+
+
+def span(name: str, is_async: bool = False, **tags):
+    if not ENABLED:
+        return _NO_SPAN
+    return _Span(name, tags, is_async)
+
+
+def drain() -> list[dict]:
+    # Hands this process's spans over, e.g. from a render worker to main.
+    events = _events[:]
+    del _events[: len(events)]
+    return events
+
+
+def extend(events: list[dict]) -> None:
+    _events.extend(events)
+
+
+def export(path: Path, events: list[dict] | None = None) -> None:
+    trace = []
+    for event in _events if events is None else events:
+        common = {
+            "name": event["name"],
+            "cat": event["name"].split(".")[0],
+            "pid": event["pid"],
+            "tid": event["tid"],
+            "args": event["args"],
+        }
+        if event["async"]:
+            async_id = next(_async_ids)
+            trace.append({**common, "ph": "b", "id": async_id, "ts": event["ts"]})
+            trace.append(
+                {
+                    **common,
+                    "ph": "e",
+                    "id": async_id,
+                    "ts": event["ts"] + event["dur"],
+                }
+            )
+        else:
+            trace.append({**common, "ph": "X", "ts": event["ts"], "dur": event["dur"]})
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(
+            {"traceEvents": trace, "displayTimeUnit": "ms"}, f, ensure_ascii=False
+        )
+
+
+def summary(events: list[dict] | None = None) -> str:
+    durations: dict[str, list[float]] = {}
+    for event in _events if events is None else events:
+        durations.setdefault(event["name"], []).append(event["dur"] / 1000)
+
+    lines = [
+        f"{'stage':<24}{'count':>8}{'total ms':>12}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}"
+    ]
+    for name, values in sorted(durations.items(), key=lambda item: -sum(item[1])):
+        values.sort()
+        p50 = values[len(values) // 2]
+        p95 = values[min(len(values) - 1, int(len(values) * 0.95))]
+        lines.append(
+            f"{name:<24}{len(values):>8}{sum(values):>12.1f}"
+            f"{p50:>10.2f}{p95:>10.2f}{values[-1]:>10.2f}"
+        )
+    return "\n".join(lines)
+
+
+def flush(path: Path) -> None:
+    # Writes the spans recorded so far and forgets them, so a long-running
+    # process (service.py) keeps one job's spans at a time, not all of them.
+    if not ENABLED:
+        return
+    export(path, drain())
+    print(f"Trace written to {path}")
+
+
+def finish() -> None:
+    if not ENABLED:
+        return
+    export(Path(TRACE_PATH))
+    print(summary())
+    print(f"Trace written to {TRACE_PATH}")
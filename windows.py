@@ -0,0 +1,80 @@
+import os
+from datetime import datetime
+
+from dateutil.relativedelta import relativedelta
+from dotenv import load_dotenv
+from pydantic import BaseModel
+
+load_dotenv()
+
+PRESETS = {"monthly": 1, "quarterly": 3, "half": 6, "yearly": 12}
+
+
+class ReportWindow(BaseModel):
+    # A reporting period of `length` months ending at `end` (YYYYMM), or at
+    # the report month when end is None. Each report compares it with the
+    # period of the same length right before it.
+    name: str
+    length: int
+    end: str | None = None
+
+    def current(self, report_month: datetime) -> list[str]:
+        end = datetime.strptime(self.end, "%Y%m") if self.end else report_month
+        return _months_back(end, 0, self.length)
+
+    def previous(self, report_month: datetime) -> list[str]:
+        end = datetime.strptime(self.end, "%Y%m") if self.end else report_month
+        return _months_back(end, self.length, self.length)
+
+
+def _months_back(end: datetime, skip: int, length: int) -> list[str]:
+    # Newest month first, like the original months_list.
+    return [
+        (end - relativedelta(months=i)).strftime("%Y%m")
+        for i in range(skip, skip + length)
+    ]
+
+
+QUARTERLY = ReportWindow(name="quarterly", length=PRESETS["quarterly"])
+# Report headings for the current and previous window by length in months;
+# other lengths get the generic ones summary.py uses.
+LABELS = {
+    1: ("당월", "전월"),
+    3: ("당분기", "전분기"),
+    6: ("당반기", "전반기"),
+    12: ("금년", "전년"),
+}
+
+
+def window_labels(start: str, end: str) -> tuple[str, str]:
+    # start and end are the window's first and last month (YYYYMM).
+    delta = relativedelta(
+        datetime.strptime(end, "%Y%m"), datetime.strptime(start, "%Y%m")
+    )
+    return LABELS.get(delta.years * 12 + delta.months + 1, ("당기", "전기"))
+
+
+def parse_windows(spec: str) -> list[ReportWindow]:
+    # "quarterly,yearly" or a custom "YYYYMM-YYYYMM" range, comma separated.
+    windows = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if part in PRESETS:
+            windows.append(ReportWindow(name=part, length=PRESETS[part]))
+            continue
+
+        start, _, end = part.partition("-")
+        start_month = datetime.strptime(start, "%Y%m")
+        end_month = datetime.strptime(end or start, "%Y%m")
+        delta = relativedelta(end_month, start_month)
+        length = delta.years * 12 + delta.months + 1
+        if length < 1:
+            raise ValueError(f"Report window {part} ends before it starts")
+        windows.append(ReportWindow(name=part, length=length, end=end or start))
+    return windows
+
+
+def default_windows() -> list[ReportWindow]:
+    return parse_windows(os.getenv("READANDTALK_WINDOWS", "quarterly"))